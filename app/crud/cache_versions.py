@@ -0,0 +1,177 @@
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import bindparam, text
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Set
+import logging
+import time
+
+from core.etag import make_etag
+
+logger = logging.getLogger(__name__)
+
+# Contadores de versión almacenados en la tabla `versiones_cache` (ver sql/001_versiones_cache.sql).
+# Permiten que varios workers detecten con una consulta por clave primaria que un
+# conjunto de datos cacheado en memoria cambió y debe recargarse.
+
+
+def get_version(db: Session, nombre: str) -> Optional[int]:
+    """
+    Obtiene la versión actual de un conjunto de datos.
+
+    Returns:
+        int | None: La versión, 0 si aún no existe la fila o None si la tabla no está disponible.
+    """
+    try:
+        query = text("""
+            SELECT version
+            FROM versiones_cache
+            WHERE nombre = :nombre
+        """)
+        version = db.execute(query, {"nombre": nombre}).scalar()
+        return int(version) if version is not None else 0
+    except SQLAlchemyError as e:
+        logger.warning(f"No se pudo leer la versión de caché '{nombre}': {e}")
+        return None
+
+
+def get_versions(db: Session, nombres: List[str]) -> Optional[Dict[str, int]]:
+    """
+    Obtiene en una sola consulta las versiones de varios conjuntos de datos.
+
+    Returns:
+        dict | None: {nombre: versión} (0 para los que no existen) o None si la tabla no está disponible.
+    """
+    try:
+        query = text("""
+            SELECT nombre, version
+            FROM versiones_cache
+            WHERE nombre IN :nombres
+        """).bindparams(bindparam("nombres", expanding=True))
+        rows = db.execute(query, {"nombres": list(nombres)}).all()
+        versiones = {nombre: 0 for nombre in nombres}
+        versiones.update({nombre: int(version) for nombre, version in rows})
+        return versiones
+    except SQLAlchemyError as e:
+        logger.warning(f"No se pudieron leer las versiones de caché {nombres}: {e}")
+        return None
+
+
+# Una sola sentencia: crea la fila si no existe (por ejemplo 'usuarios_estado', sin fila inicial)
+# sin la carrera de UPDATE + INSERT entre dos workers que incrementan el mismo nombre a la vez
+_BUMP_MYSQL = text("""
+    INSERT INTO versiones_cache (nombre, version)
+    VALUES (:nombre, 1)
+    ON DUPLICATE KEY UPDATE version = version + 1
+""")
+
+_BUMP_ANSI = text("""
+    INSERT INTO versiones_cache (nombre, version)
+    VALUES (:nombre, 1)
+    ON CONFLICT (nombre) DO UPDATE SET version = versiones_cache.version + 1
+""")
+
+
+def bump_version(db: Session, nombre: str) -> None:
+    """
+    Incrementa la versión de un conjunto de datos dentro de la transacción actual.
+
+    No hace commit: debe ejecutarse junto con la escritura que invalida la caché
+    para que ambas se confirmen (o se reviertan) a la vez.
+    """
+    upsert = _BUMP_MYSQL if db.get_bind().dialect.name == "mysql" else _BUMP_ANSI
+    db.execute(upsert, {"nombre": nombre})
+
+
+# Versiones que este proceso no pudo incrementar tras confirmar una escritura. Mientras alguna
+# siga pendiente, get_tables_etag no genera ETag para esas tablas: un ETag con la versión vieja
+# respondería 304 con datos desactualizados hasta la siguiente escritura.
+_bumps_pendientes: Set[str] = set()
+_bumps_lock = Lock()
+
+
+def bump_versions_after_commit(db: Session, *nombres: str) -> None:
+    """
+    Incrementa las versiones en una transacción corta propia; se llama justo después del commit
+    de la escritura. Así las escrituras frecuentes (salvamentos, ingresos) no retienen el bloqueo
+    de la fila de `versiones_cache` durante su transacción ni se serializan entre sí por ella.
+
+    Si falla se reintenta una vez. Si vuelve a fallar, la escritura ya está confirmada: las
+    versiones quedan pendientes en este proceso y sus listados se sirven sin ETag hasta que un
+    incremento posterior de la misma versión funcione.
+    """
+    # Orden fijo para que dos llamadas concurrentes tomen los bloqueos en el mismo orden
+    nombres = sorted(set(nombres))
+    for intento in (1, 2):
+        try:
+            for nombre in nombres:
+                bump_version(db, nombre)
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.warning(f"No se pudieron incrementar las versiones de caché {nombres} (intento {intento}): {e}")
+            continue
+        with _bumps_lock:
+            _bumps_pendientes.difference_update(nombres)
+        return
+    with _bumps_lock:
+        _bumps_pendientes.update(nombres)
+
+
+def get_tables_etag(db: Session, tablas: List[str], *extra) -> Optional[str]:
+    """
+    ETag de un listado construido a partir de las versiones de `tablas` y de los
+    parámetros adicionales de la consulta (página, filtros...).
+
+    Returns:
+        str | None: El ETag, o None si las versiones no están disponibles o alguna quedó
+            pendiente de incrementar (ver bump_versions_after_commit).
+    """
+    if _bumps_pendientes and not _bumps_pendientes.isdisjoint(tablas):
+        return None
+    versiones = get_versions(db, tablas)
+    if versiones is None:
+        return None
+    return make_etag(*(f"{tabla}={versiones[tabla]}" for tabla in tablas), *extra)
+
+
+class VersionedCache:
+    """
+    Valor leído de la BD (por ejemplo, una tabla de referencia completa) que se reutiliza en
+    memoria mientras no cambie la versión `nombre` de `versiones_cache`. La versión se revisa
+    como máximo cada `ttl` segundos, con la misma estrategia que la matriz de permisos.
+
+    Las consultas se hacen fuera del lock (pueden correr dentro de run_sync); el lock solo
+    protege el reemplazo del valor.
+    """
+
+    def __init__(self, nombre: str, loader: Callable[[Session], Any], ttl: float):
+        self.nombre = nombre
+        self.loader = loader
+        self.ttl = ttl
+        self._valor: Any = None
+        self._version: Optional[int] = None
+        self._expira_en = 0.0
+        self._lock = Lock()
+
+    def get(self, db: Session) -> Any:
+        if self._valor is not None and time.monotonic() < self._expira_en:
+            return self._valor
+
+        version = get_version(db, self.nombre)
+        valor = self._valor
+        if valor is None or version is None or version != self._version:
+            valor = self.loader(db)
+
+        with self._lock:
+            self._valor = valor
+            self._version = version
+            self._expira_en = time.monotonic() + self.ttl
+        return valor
+
+    def invalidate(self) -> None:
+        """Descarta el valor de este proceso; los demás lo recargan al ver la nueva versión."""
+        with self._lock:
+            self._valor = None
+            self._version = None
+            self._expira_en = 0.0
@@ -0,0 +1,111 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, text
+from sqlalchemy.sql.elements import TextClause
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import logging
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Consultas por lotes de ids y actualizaciones parciales compartidas por los módulos de app/crud.
+
+
+def fetch_by_ids(db: Session, sql: str, key: str, ids: Iterable[int]) -> Dict[int, Any]:
+    """
+    Ejecuta `sql` (que debe contener `IN :ids`) para los ids recibidos y devuelve {id: fila}.
+
+    Los ids repetidos se consultan una vez y la lista se divide en bloques de
+    BY_IDS_CHUNK_SIZE para no superar el límite de parámetros del motor ni generar
+    sentencias enormes; cada bloque es una sola consulta.
+    """
+    unicos = list(dict.fromkeys(ids))
+    query = text(sql).bindparams(bindparam("ids", expanding=True))
+    chunk_size = max(1, settings.BY_IDS_CHUNK_SIZE)
+    filas = {}
+    for inicio in range(0, len(unicos), chunk_size):
+        result = db.execute(query, {"ids": unicos[inicio:inicio + chunk_size]}).mappings().all()
+        filas.update({row[key]: row for row in result})
+    return filas
+
+
+def order_by_ids(ids: List[int], filas: Dict[int, Any]) -> Dict[str, List]:
+    """
+    Ordena las filas según los ids pedidos: `items` tiene una posición por id (None si no existe)
+    y `missing` lista los ids no encontrados, sin repetir.
+    """
+    return {
+        "items": [filas.get(id) for id in ids],
+        "missing": [id for id in dict.fromkeys(ids) if id not in filas],
+    }
+
+
+class PartialUpdate:
+    """
+    UPDATE parcial de una tabla: solo se escriben los campos enviados por el cliente.
+
+    `columnas` es la lista blanca {campo del esquema: columna de la tabla}; ningún otro nombre
+    llega al SQL. `omitir` son los valores que la entidad trata como "no enviado" (por ejemplo
+    0, "" o el "string" que deja Swagger); la comparación no confunde False con 0.
+    La sentencia se arma y se guarda una sola vez por combinación de campos.
+    """
+
+    def __init__(self, tabla: str, clave: str, columnas: Dict[str, str], omitir: Sequence[Any] = ()):
+        self.tabla = tabla
+        self.clave = clave
+        self.columnas = columnas
+        self.omitir = tuple(omitir)
+        self._sentencias: Dict[Tuple[str, ...], TextClause] = {}
+
+    def _omitido(self, value: Any) -> bool:
+        if value is None:
+            return True
+        if isinstance(value, bool):
+            return False
+        return any(not isinstance(valor, bool) and value == valor for valor in self.omitir)
+
+    def values(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Campos a escribir ya traducidos a columnas; lanza ValueError ante un campo fuera de la lista blanca."""
+        desconocidos = set(data) - set(self.columnas)
+        if desconocidos:
+            raise ValueError(f"Campos no actualizables en {self.tabla}: {', '.join(sorted(desconocidos))}")
+        return {self.columnas[campo]: value for campo, value in data.items() if not self._omitido(value)}
+
+    def statement(self, columnas: Tuple[str, ...]) -> TextClause:
+        sentencia = self._sentencias.get(columnas)
+        if sentencia is None:
+            set_clauses = ", ".join(f"{columna} = :{columna}" for columna in columnas)
+            sentencia = text(f"UPDATE {self.tabla} SET {set_clauses} WHERE {self.clave} = :{self.clave}")
+            self._sentencias[columnas] = sentencia
+        return sentencia
+
+    def execute(self, db: Session, id: int, data: Dict[str, Any]) -> Optional[int]:
+        """
+        Actualiza una fila y devuelve el número de filas afectadas, o None si no había nada
+        que escribir. No hace commit.
+        """
+        valores = self.values(data)
+        if not valores:
+            return None
+        result = db.execute(self.statement(tuple(sorted(valores))), {**valores, self.clave: id})
+        return result.rowcount
+
+    def execute_many(self, db: Session, filas: Iterable[Dict[str, Any]]) -> int:
+        """
+        Actualiza varias filas; cada dict trae la clave (`self.clave`) y los campos a cambiar.
+        Las filas se agrupan por combinación de campos y cada grupo es un solo executemany;
+        las que no tienen nada que escribir se ignoran. Devuelve las filas afectadas según el
+        driver; no hace commit.
+        """
+        grupos: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for fila in filas:
+            data = dict(fila)
+            id = data.pop(self.clave)
+            valores = self.values(data)
+            if valores:
+                grupos.setdefault(tuple(sorted(valores)), []).append({**valores, self.clave: id})
+
+        afectadas = 0
+        for columnas, parametros in grupos.items():
+            afectadas += db.execute(self.statement(columnas), parametros).rowcount
+        return afectadas
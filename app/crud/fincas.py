@@ -1,13 +1,22 @@
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy import text
-from typing import Optional
+from datetime import date
+from typing import Dict, List, Optional
 import logging
 
+from app.crud.common import PartialUpdate
 from app.schemas.fincas import FincasCreate, FincasUpdate
 
 logger = logging.getLogger(__name__)
 
+# El esquema expone nombre_finca y estado_finca; en la tabla son nombre y estado
+_finca_update = PartialUpdate(
+    "fincas", "id_finca",
+    {"nombre_finca": "nombre", "longitud": "longitud", "latitud": "latitud", "estado_finca": "estado"},
+    omitir=(0,)
+)
+
 
 def create_fincas(db: Session, finca: FincasCreate) -> Optional[bool]:
     try:
@@ -18,7 +27,13 @@ def create_fincas(db: Session, finca: FincasCreate) -> Optional[bool]:
                 :nombre, :longitud, :latitud, :estado
             )
         """)
-        db.execute(query, finca.model_dump())
+        finca_data = finca.model_dump()
+        db.execute(query, {
+            "nombre": finca_data["nombre_finca"],
+            "longitud": finca_data["longitud"],
+            "latitud": finca_data["latitud"],
+            "estado": finca_data["estado_finca"],
+        })
         db.commit()
         return True
     except SQLAlchemyError as e:
@@ -42,31 +57,86 @@ def get_finca_by_id(db: Session, id_finca: int):
 def update_finca_by_id(db: Session, finca_id: int, finca:FincasUpdate) -> Optional[bool]:
     try:
         # Solo los campos enviados por el cliente
-        finca_data = finca.model_dump(exclude_unset=True, exclude_none=True)
-
-        finca_data = {key: value for key, value in finca_data.items() if value != 0}
-        
-        if not finca_data:
+        rowcount = _finca_update.execute(db, finca_id, finca.model_dump(exclude_unset=True))
+        if rowcount is None:
             return False  # nada que actualizar
-        
-        logger.info(f"Actualizando finca {finca_id} con datos: {finca_data}")
-
-        # Construir dinámicamente la sentencia UPDATE
-        set_clauses = ", ".join([f"{key} = :{key}" for key in finca_data.keys()])
-        sentencia = text(f"""
-            UPDATE fincas 
-            SET {set_clauses}
-            WHERE id_finca = :id_finca
-        """)
 
-        # Agregar el id_usuario
-        finca_data["id_finca"] = finca_id
-
-        result = db.execute(sentencia, finca_data)
+        logger.info(f"Finca {finca_id} actualizada")
         db.commit()
-        return result.rowcount > 0
+        return rowcount > 0
     except SQLAlchemyError as e:
         db.rollback()
         logger.error(f"Error al actualizar finca {finca_id}: {e}")
         raise Exception("Error de base de datos al actualizar la finca")
+
+
+def update_fincas_bulk(db: Session, fincas: List[Dict]) -> int:
+    """
+    Actualiza varias fincas en una transacción; `fincas` son dicts con id_finca y los campos a cambiar.
+    Devuelve las filas afectadas.
+    """
+    try:
+        updated = _finca_update.execute_many(db, fincas)
+        db.commit()
+        return updated
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error al actualizar fincas en lote: {e}")
+        raise Exception("Error de base de datos al actualizar las fincas")
     
+
+
+# Consultas del tablero de una finca (ver app.crud.fincas_async.get_finca_dashboard).
+# Cada una resuelve un conjunto completo con una sola sentencia, sin importar cuántos galpones tenga la finca.
+
+def get_finca_sheds(db: Session, id_finca: int):
+    try:
+        query = text("""
+            SELECT id_galpon, nombre, capacidad, cant_actual, estado
+            FROM galpones
+            WHERE id_finca = :id_finca
+            ORDER BY id_galpon
+        """)
+        return db.execute(query, {"id_finca": id_finca}).mappings().all()
+    except SQLAlchemyError as e:
+        logger.error(f"Error al obtener los galpones de la finca {id_finca}: {e}")
+        raise Exception("Error de base de datos al obtener los galpones de la finca")
+
+
+def get_finca_mortality(db: Session, id_finca: int, fecha_inicio: date, fecha_fin: date):
+    """Gallinas salvadas por galpón de la finca en el rango, leídas del acumulado diario."""
+    try:
+        query = text("""
+            SELECT salvamento_diario.id_galpon,
+                   SUM(salvamento_diario.total_gallinas) AS total_gallinas,
+                   SUM(salvamento_diario.registros) AS registros
+            FROM salvamento_diario
+            JOIN galpones ON salvamento_diario.id_galpon = galpones.id_galpon
+            WHERE galpones.id_finca = :id_finca
+              AND salvamento_diario.fecha BETWEEN :fecha_inicio AND :fecha_fin
+            GROUP BY salvamento_diario.id_galpon
+        """)
+        params = {"id_finca": id_finca, "fecha_inicio": fecha_inicio, "fecha_fin": fecha_fin}
+        return db.execute(query, params).mappings().all()
+    except SQLAlchemyError as e:
+        logger.error(f"Error al obtener la mortalidad de la finca {id_finca}: {e}")
+        raise Exception("Error de base de datos al obtener la mortalidad de la finca")
+
+
+def get_finca_arrivals(db: Session, id_finca: int, fecha_inicio: date, fecha_fin: date):
+    """Gallinas ingresadas por galpón de la finca en el rango."""
+    try:
+        query = text("""
+            SELECT ingreso_gallinas.id_galpon,
+                   SUM(ingreso_gallinas.cantidad_gallinas) AS total_gallinas
+            FROM ingreso_gallinas
+            JOIN galpones ON ingreso_gallinas.id_galpon = galpones.id_galpon
+            WHERE galpones.id_finca = :id_finca
+              AND ingreso_gallinas.fecha BETWEEN :fecha_inicio AND :fecha_fin
+            GROUP BY ingreso_gallinas.id_galpon
+        """)
+        params = {"id_finca": id_finca, "fecha_inicio": fecha_inicio, "fecha_fin": fecha_fin}
+        return db.execute(query, params).mappings().all()
+    except SQLAlchemyError as e:
+        logger.error(f"Error al obtener los ingresos de la finca {id_finca}: {e}")
+        raise Exception("Error de base de datos al obtener los ingresos de la finca")
@@ -0,0 +1,107 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+import asyncio
+
+from app.crud import fincas as crud_fincas
+from core.cache import TTLCache
+from core.config import settings
+from core.database import open_async_read_session
+
+# Tablero de una finca: la finca, sus galpones con ocupación y los totales recientes de
+# mortalidad e ingresos, armado con cuatro consultas independientes que se ejecutan a la vez.
+
+_dashboard_cache = TTLCache(ttl=settings.DASHBOARD_CACHE_TTL_SECONDS, max_size=1024)
+
+# Tableros que se están calculando: las peticiones simultáneas de la misma finca esperan
+# el mismo resultado en lugar de repetir las consultas
+_en_curso: Dict[Tuple, asyncio.Future] = {}
+
+
+async def _run(func, *args):
+    # Una AsyncSession no admite consultas concurrentes, así que cada consulta usa la suya.
+    # El tablero se comparte entre peticiones, así que se lee de una réplica si hay alguna.
+    db = await open_async_read_session()
+    try:
+        return await db.run_sync(func, *args)
+    finally:
+        await db.close()
+
+
+def _porcentaje(parte: float, total: float) -> Optional[float]:
+    return round(parte * 100 / total, 2) if total else None
+
+
+async def _build_dashboard(id_finca: int, fecha_inicio: date, fecha_fin: date) -> Optional[Dict]:
+    finca, galpones, mortalidad, ingresos = await asyncio.gather(
+        _run(crud_fincas.get_finca_by_id, id_finca),
+        _run(crud_fincas.get_finca_sheds, id_finca),
+        _run(crud_fincas.get_finca_mortality, id_finca, fecha_inicio, fecha_fin),
+        _run(crud_fincas.get_finca_arrivals, id_finca, fecha_inicio, fecha_fin),
+    )
+    if finca is None:
+        return None
+
+    mortalidad_por_galpon = {row["id_galpon"]: row for row in mortalidad}
+    ingresos_por_galpon = {row["id_galpon"]: int(row["total_gallinas"] or 0) for row in ingresos}
+
+    items = []
+    for galpon in galpones:
+        salvamentos = mortalidad_por_galpon.get(galpon["id_galpon"])
+        items.append({
+            "id_galpon": galpon["id_galpon"],
+            "nombre": galpon["nombre"],
+            "capacidad": float(galpon["capacidad"]),
+            "cant_actual": float(galpon["cant_actual"]),
+            "estado": bool(galpon["estado"]),
+            "ocupacion_pct": _porcentaje(float(galpon["cant_actual"]), float(galpon["capacidad"])),
+            "mortalidad": int(salvamentos["total_gallinas"] or 0) if salvamentos else 0,
+            "registros_salvamento": int(salvamentos["registros"] or 0) if salvamentos else 0,
+            "ingresos": ingresos_por_galpon.get(galpon["id_galpon"], 0),
+        })
+
+    capacidad = sum(item["capacidad"] for item in items)
+    cant_actual = sum(item["cant_actual"] for item in items)
+    return {
+        "finca": dict(finca),
+        "fecha_inicio": fecha_inicio,
+        "fecha_fin": fecha_fin,
+        "generado_en": datetime.now(tz=timezone.utc),
+        "totales": {
+            "galpones": len(items),
+            "capacidad": capacidad,
+            "cant_actual": cant_actual,
+            "ocupacion_pct": _porcentaje(cant_actual, capacidad),
+            "mortalidad": sum(item["mortalidad"] for item in items),
+            "ingresos": sum(item["ingresos"] for item in items),
+        },
+        "galpones": items,
+    }
+
+
+async def get_finca_dashboard(id_finca: int, dias: int = 7) -> Optional[Dict]:
+    """
+    Devuelve el tablero de la finca para los últimos `dias` días (incluido hoy), o None si la
+    finca no existe. El resultado se reutiliza durante DASHBOARD_CACHE_TTL_SECONDS.
+    """
+    fecha_fin = date.today()
+    fecha_inicio = fecha_fin - timedelta(days=dias - 1)
+    key = (id_finca, fecha_inicio, fecha_fin)
+
+    dashboard = _dashboard_cache.get(key)
+    if dashboard is not None:
+        return dashboard
+
+    pendiente = _en_curso.get(key)
+    if pendiente is not None:
+        return await asyncio.shield(pendiente)
+
+    pendiente = asyncio.ensure_future(_build_dashboard(id_finca, fecha_inicio, fecha_fin))
+    _en_curso[key] = pendiente
+    try:
+        dashboard = await asyncio.shield(pendiente)
+    finally:
+        _en_curso.pop(key, None)
+
+    if dashboard is not None:
+        _dashboard_cache.set(key, dashboard)
+    return dashboard
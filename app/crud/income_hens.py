@@ -0,0 +1,318 @@
+from datetime import date
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import bindparam, text
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+from app.crud.cache_versions import bump_versions_after_commit
+from app.crud.common import PartialUpdate
+from app.crud.sheds import ShedCapacityError, adjust_shed_occupancy, occupancy_deltas
+from app.schemas.income_hens import IncomeHensCreate, IncomeHensUpdate
+from core.cache import TTLCache
+from core.config import settings
+from core.database import estimate_table_rows, for_update_clause
+
+logger = logging.getLogger(__name__)
+
+# Conteos de ingresos por filtro (rango de fechas). Se vacía con cada escritura de este proceso;
+# en los demás workers expira tras COUNT_CACHE_TTL_SECONDS.
+_count_cache = TTLCache(ttl=settings.COUNT_CACHE_TTL_SECONDS, max_size=256)
+
+_INSERT = text("""
+    INSERT INTO ingreso_gallinas (
+        id_galpon, fecha, id_tipo_gallina, cantidad_gallinas
+    ) VALUES (
+        :id_galpon, :fecha, :id_tipo_gallina, :cantidad_gallinas
+    )
+""")
+
+_income_update = PartialUpdate(
+    "ingreso_gallinas", "id_ingreso",
+    {"id_galpon": "id_galpon", "fecha": "fecha", "id_tipo_gallina": "id_tipo_gallina", "cantidad_gallinas": "cantidad_gallinas"}
+)
+
+_SELECT = """
+    SELECT ingreso_gallinas.id_ingreso, ingreso_gallinas.id_galpon, ingreso_gallinas.fecha,
+            ingreso_gallinas.id_tipo_gallina, ingreso_gallinas.cantidad_gallinas,
+            galpones.nombre as nombre,
+            tipo_gallinas.raza as raza
+    FROM ingreso_gallinas
+    JOIN galpones ON ingreso_gallinas.id_galpon = galpones.id_galpon
+    JOIN tipo_gallinas ON ingreso_gallinas.id_tipo_gallina = tipo_gallinas.id_tipo_gallinas
+"""
+
+
+def _get_income_for_update(db: Session, id_ingreso: int) -> Optional[Dict]:
+    # Lee y bloquea la fila para ajustar la ocupación del galpón con los valores previos
+    query = text(f"""
+        SELECT id_ingreso, id_galpon, fecha, id_tipo_gallina, cantidad_gallinas
+        FROM ingreso_gallinas
+        WHERE id_ingreso = :id_ingreso{for_update_clause(db)}
+    """)
+    row = db.execute(query, {"id_ingreso": id_ingreso}).mappings().first()
+    return dict(row) if row else None
+
+
+def create_income_hens(db: Session, ingreso: IncomeHensCreate) -> Optional[bool]:
+    try:
+        ingreso_data = ingreso.model_dump()
+        db.execute(_INSERT, ingreso_data)
+        adjust_shed_occupancy(db, occupancy_deltas([ingreso_data]))
+        db.commit()
+        bump_versions_after_commit(db, "ingreso_gallinas", "galpones")
+        _count_cache.clear()
+        return True
+    except ShedCapacityError:
+        db.rollback()
+        raise
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error al crear ingreso de gallinas: {e}")
+        raise Exception("Error de base de datos al crear el ingreso de gallinas")
+
+
+def create_income_hens_bulk(db: Session, ingresos: List[Dict]) -> Dict:
+    """
+    Registra un lote de ingresos (por ejemplo, un camión completo) en una sola transacción.
+
+    Las filas se insertan en bloques de BULK_BATCH_SIZE con executemany, que PyMySQL reescribe
+    como INSERT multi-fila, y la ocupación de los galpones se ajusta con un UPDATE por galpón
+    en lugar de uno por ingreso. Si algo falla (incluida la capacidad de un galpón, ver
+    ShedCapacityError) se revierte el lote completo.
+    """
+    if not ingresos:
+        return {"inserted": 0, "galpones": 0, "total_gallinas": 0}
+    try:
+        batch_size = max(1, settings.BULK_BATCH_SIZE)
+        for inicio in range(0, len(ingresos), batch_size):
+            db.execute(_INSERT, ingresos[inicio:inicio + batch_size])
+        deltas = occupancy_deltas(ingresos)
+        adjust_shed_occupancy(db, deltas)
+        db.commit()
+        bump_versions_after_commit(db, "ingreso_gallinas", "galpones")
+        _count_cache.clear()
+        return {
+            "inserted": len(ingresos),
+            "galpones": len(deltas),
+            "total_gallinas": sum(deltas.values())
+        }
+    except ShedCapacityError:
+        db.rollback()
+        raise
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error al crear lote de {len(ingresos)} ingresos de gallinas: {e}")
+        raise Exception("Error de base de datos al crear los ingresos de gallinas")
+
+
+def get_missing_references(
+    db: Session,
+    id_galpones: Iterable[int],
+    id_tipos: Iterable[int]
+) -> Tuple[List[int], List[int]]:
+    """
+    Devuelve los ids de galpones y tipos de gallina referenciados por un lote que no existen,
+    con una consulta por tabla limitada a los ids del lote.
+    """
+    try:
+        id_galpones, id_tipos = set(id_galpones), set(id_tipos)
+        existentes_galpones = set()
+        existentes_tipos = set()
+        if id_galpones:
+            query = text("SELECT id_galpon FROM galpones WHERE id_galpon IN :ids").bindparams(
+                bindparam("ids", expanding=True)
+            )
+            existentes_galpones = set(db.execute(query, {"ids": list(id_galpones)}).scalars().all())
+        if id_tipos:
+            query = text("SELECT id_tipo_gallinas FROM tipo_gallinas WHERE id_tipo_gallinas IN :ids").bindparams(
+                bindparam("ids", expanding=True)
+            )
+            existentes_tipos = set(db.execute(query, {"ids": list(id_tipos)}).scalars().all())
+        return sorted(id_galpones - existentes_galpones), sorted(id_tipos - existentes_tipos)
+    except SQLAlchemyError as e:
+        logger.error(f"Error al validar galpones y tipos de gallina: {e}")
+        raise Exception("Error de base de datos al validar galpones y tipos de gallina")
+
+
+def get_income_hens_by_id(db: Session, id_ingreso: int):
+    try:
+        query = text(f"""{_SELECT}
+            WHERE ingreso_gallinas.id_ingreso = :id_ingreso
+        """)
+        return db.execute(query, {"id_ingreso": id_ingreso}).mappings().first()
+    except SQLAlchemyError as e:
+        logger.error(f"Error al obtener ingreso de gallinas por id: {e}")
+        raise Exception("Error de base de datos al obtener el ingreso de gallinas")
+
+
+def update_income_hens_by_id(db: Session, id_ingreso: int, ingreso: IncomeHensUpdate) -> Optional[bool]:
+    try:
+        # Solo los campos enviados por el cliente
+        ingreso_data = _income_update.values(ingreso.model_dump(exclude_unset=True))
+        if not ingreso_data:
+            return False  # nada que actualizar
+
+        anterior = _get_income_for_update(db, id_ingreso)
+        if anterior is None:
+            db.rollback()
+            return False
+
+        rowcount = _income_update.execute(db, id_ingreso, ingreso_data)
+
+        # Sacar las aves del galpón anterior y sumarlas al nuevo (o ajustar la cantidad)
+        adjust_shed_occupancy(db, occupancy_deltas([{**anterior, **ingreso_data}], salen=[anterior]))
+        db.commit()
+        bump_versions_after_commit(db, "ingreso_gallinas", "galpones")
+        _count_cache.clear()
+        return rowcount > 0
+    except ShedCapacityError:
+        db.rollback()
+        raise
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error al actualizar ingreso de gallinas {id_ingreso}: {e}")
+        raise Exception("Error de base de datos al actualizar el ingreso de gallinas")
+
+
+def delete_income_hens_by_id(db: Session, id_ingreso: int) -> Optional[bool]:
+    try:
+        anterior = _get_income_for_update(db, id_ingreso)
+        if anterior is None:
+            db.rollback()
+            return False
+
+        result = db.execute(
+            text("DELETE FROM ingreso_gallinas WHERE id_ingreso = :id_ingreso"),
+            {"id_ingreso": id_ingreso}
+        )
+        adjust_shed_occupancy(db, occupancy_deltas([], salen=[anterior]))
+        db.commit()
+        bump_versions_after_commit(db, "ingreso_gallinas", "galpones")
+        _count_cache.clear()
+        return result.rowcount > 0
+    except ShedCapacityError:
+        db.rollback()
+        raise
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error al eliminar ingreso de gallinas {id_ingreso}: {e}")
+        raise Exception("Error de base de datos al eliminar el ingreso de gallinas")
+
+
+def count_income_hens(
+    db: Session,
+    fecha_inicio: Optional[date] = None,
+    fecha_fin: Optional[date] = None,
+    total_mode: str = "cached"
+) -> int:
+    """
+    Cuenta los ingresos, opcionalmente filtrados por rango de fechas.
+    total_mode funciona igual que en app.crud.rescue.count_rescues.
+    """
+    if total_mode == "estimated" and fecha_inicio is None:
+        estimado = estimate_table_rows(db, "ingreso_gallinas")
+        if estimado is not None:
+            return estimado
+
+    key = (fecha_inicio, fecha_fin)
+    if total_mode != "exact":
+        total = _count_cache.get(key)
+        if total is not None:
+            return total
+
+    if fecha_inicio is not None:
+        count_query = text("""
+            SELECT COUNT(id_ingreso) AS total
+            FROM ingreso_gallinas
+            WHERE fecha BETWEEN :fecha_inicio AND :fecha_fin
+        """)
+        total = db.execute(count_query, {"fecha_inicio": fecha_inicio, "fecha_fin": fecha_fin}).scalar() or 0
+    else:
+        total = db.execute(text("SELECT COUNT(id_ingreso) AS total FROM ingreso_gallinas")).scalar() or 0
+
+    _count_cache.set(key, total)
+    return total
+
+
+def get_income_hens_pag(
+    db: Session,
+    skip: int = 0,
+    limit: int = 10,
+    fecha_inicio: Optional[date] = None,
+    fecha_fin: Optional[date] = None,
+    include_total: bool = True,
+    total_mode: str = "cached"
+):
+    """
+    Obtiene los ingresos con paginación, opcionalmente filtrados por rango de fechas.
+    """
+    try:
+        total_result = None
+        if include_total:
+            total_result = count_income_hens(db, fecha_inicio, fecha_fin, total_mode)
+
+        where = ""
+        params = {"skip": skip, "limit": limit}
+        if fecha_inicio is not None and fecha_fin is not None:
+            where = "WHERE ingreso_gallinas.fecha BETWEEN :fecha_inicio AND :fecha_fin"
+            params.update({"fecha_inicio": fecha_inicio, "fecha_fin": fecha_fin})
+
+        data_query = text(f"""{_SELECT}
+            {where}
+            ORDER BY ingreso_gallinas.fecha DESC, ingreso_gallinas.id_ingreso DESC
+            LIMIT :limit OFFSET :skip
+        """)
+        result = db.execute(data_query, params).mappings().all()
+
+        return {
+            "total": total_result,
+            "ingresos": [dict(row) for row in result]
+        }
+    except SQLAlchemyError as e:
+        logger.error(f"Error al obtener los ingresos de gallinas: {e}", exc_info=True)
+        raise Exception(f"Error de base de datos al obtener los ingresos de gallinas: {str(e)}")
+
+
+def get_income_hens_keyset(
+    db: Session,
+    limit: int = 10,
+    after_fecha: Optional[date] = None,
+    after_id: Optional[int] = None,
+    fecha_inicio: Optional[date] = None,
+    fecha_fin: Optional[date] = None
+):
+    """
+    Obtiene los ingresos paginados por clave (fecha, id_ingreso) en orden descendente,
+    con el mismo esquema que app.crud.rescue.get_rescues_keyset.
+    """
+    try:
+        condiciones = []
+        params = {"limit": limit + 1}
+
+        if fecha_inicio is not None and fecha_fin is not None:
+            condiciones.append("ingreso_gallinas.fecha BETWEEN :fecha_inicio AND :fecha_fin")
+            params.update({"fecha_inicio": fecha_inicio, "fecha_fin": fecha_fin})
+
+        if after_fecha is not None and after_id is not None:
+            # Expandido en OR para que MySQL use el índice (fecha, id_ingreso)
+            condiciones.append("""(ingreso_gallinas.fecha < :after_fecha
+                    OR (ingreso_gallinas.fecha = :after_fecha AND ingreso_gallinas.id_ingreso < :after_id))""")
+            params.update({"after_fecha": after_fecha, "after_id": after_id})
+
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+
+        data_query = text(f"""{_SELECT}
+            {where}
+            ORDER BY ingreso_gallinas.fecha DESC, ingreso_gallinas.id_ingreso DESC
+            LIMIT :limit
+        """)
+        result = db.execute(data_query, params).mappings().all()
+
+        return {
+            "has_more": len(result) > limit,
+            "ingresos": [dict(row) for row in result[:limit]]
+        }
+    except SQLAlchemyError as e:
+        logger.error(f"Error al obtener los ingresos de gallinas por cursor: {e}", exc_info=True)
+        raise Exception(f"Error de base de datos al obtener los ingresos de gallinas: {str(e)}")
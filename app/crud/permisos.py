@@ -1,41 +1,116 @@
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError 
 from sqlalchemy import text
-from typing import Optional
+from typing import Dict, Optional, Tuple
+from threading import Lock
 import logging
+import time
+from core.config import settings
+from core.metrics import permission_checks, permission_matrix_loads
 from core.security import get_hashed_password
+from app.crud.cache_versions import bump_version, get_version
 
 from app.schemas.users import UserCreate, UserUpdate
 
 logger = logging.getLogger(__name__)
 
+# Matriz de permisos cacheada en memoria: {(id_rol, id_modulo): {accion: 0/1}}
+# Se carga completa desde la tabla `permisos` y se reutiliza durante PERMISSIONS_CACHE_TTL_SECONDS.
+# Al expirar, solo se consulta el contador `versiones_cache.permisos`; la tabla se vuelve a leer
+# únicamente si otro worker (o esta misma instancia) incrementó la versión.
+_PERMISOS_VERSION = "permisos"
+_ACCIONES = ("insertar", "actualizar", "seleccionar", "borrar")
+
+_matriz: Optional[Dict[Tuple[int, int], Dict[str, int]]] = None
+_version: Optional[int] = None
+_expira_en: float = 0.0
+_lock = Lock()
+
+
+def _load_permissions(db: Session) -> Dict[Tuple[int, int], Dict[str, int]]:
+    query = text(""" SELECT id_rol, id_modulo, insertar, actualizar, seleccionar, borrar
+                    FROM permisos
+            """)
+    rows = db.execute(query).mappings().all()
+    permission_matrix_loads.inc()
+    return {
+        (row["id_rol"], row["id_modulo"]): {accion: int(row[accion] or 0) for accion in _ACCIONES}
+        for row in rows
+    }
+
+
+def get_permissions_matrix(db: Session) -> Dict[Tuple[int, int], Dict[str, int]]:
+    """
+    Devuelve la matriz de permisos, recargándola solo cuando el TTL expiró y la versión cambió.
+    """
+    global _matriz, _version, _expira_en
+
+    if _matriz is not None and time.monotonic() < _expira_en:
+        return _matriz
+
+    # Las consultas se hacen fuera del lock: desde verify_permissions_async corren dentro de
+    # run_sync, que cede el event loop en cada consulta, y otra corrutina del mismo hilo que
+    # esperara el lock bloquearía el loop. Dos recargas simultáneas solo repiten la lectura.
+    version = get_version(db, _PERMISOS_VERSION)
+    matriz = _matriz
+    if matriz is None or version is None or version != _version:
+        matriz = _load_permissions(db)
+        logger.info(f"Matriz de permisos cargada ({len(matriz)} filas, versión {version})")
+
+    with _lock:
+        _matriz = matriz
+        _version = version
+        _expira_en = time.monotonic() + settings.PERMISSIONS_CACHE_TTL_SECONDS
+    return matriz
+
+
+def invalidate_permissions_cache(db: Optional[Session] = None) -> None:
+    """
+    Descarta la matriz de permisos de este proceso.
+
+    Si se recibe una sesión, además incrementa la versión en base de datos y hace commit,
+    de modo que los demás workers recarguen la matriz cuando expire su TTL.
+    """
+    global _matriz, _version, _expira_en
+
+    with _lock:
+        _matriz = None
+        _version = None
+        _expira_en = 0.0
+
+    if db is not None:
+        try:
+            bump_version(db, _PERMISOS_VERSION)
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Error al invalidar la caché de permisos: {e}")
+            raise Exception("Error de base de datos al invalidar la caché de permisos")
+
+
 def verify_permissions(db: Session, id_rol: int, id_modulo: int, accion: str):
     try:
-        query = text(""" SELECT insertar, actualizar, seleccionar, borrar
-                        FROM permisos
-                        WHERE id_rol = :rol AND id_modulo = :modulo 
-                """)
-        
-        result = db.execute(query, {"rol": id_rol, "modulo": id_modulo}).mappings().first()
-        
+        result = get_permissions_matrix(db).get((id_rol, id_modulo))
+
         if (result is None):
+            permission_checks.inc(str(id_modulo), accion, "sin_permisos")
             raise HTTPException(status_code=401, detail="Usuario no autorizado")
-        
+
         permiso = 0
 
-        if result.insertar == 1 and accion == 'insertar':
-            permiso =1
-        if result.actualizar == 1 and accion == 'actualizar':
+        if accion in _ACCIONES and result[accion] == 1:
             permiso = 1
-        if result.seleccionar == 1 and accion == 'seleccionar':
-            permiso = 1
-        if result.borrar == 1 and accion == 'borrar':
-            permiso = 1
-
 
+        permission_checks.inc(str(id_modulo), accion, "permitido" if permiso else "denegado")
         return permiso
 
     except SQLAlchemyError as e:
         logger.error(f"Error al obtener permisos: {e}")
         raise Exception("Error de base de datos al obtener permisos")
+
+
+async def verify_permissions_async(db: AsyncSession, id_rol: int, id_modulo: int, accion: str):
+    # Con la matriz en caché no hay consulta; run_sync solo carga la matriz cuando expira
+    return await db.run_sync(verify_permissions, id_rol, id_modulo, accion)
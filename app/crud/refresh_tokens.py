@@ -0,0 +1,127 @@
+from datetime import datetime, timezone
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import text
+from typing import Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Registro de refresh tokens por jti (ver sql/006_refresh_tokens.sql).
+# Rotación: cada uso marca el token como revocado y emite uno nuevo de la misma familia.
+# Si llega un token ya rotado, alguien más tiene una copia: se revoca la familia completa.
+
+
+class RefreshTokenReused(Exception):
+    """Se presentó un refresh token que ya había sido rotado; la familia quedó revocada."""
+
+
+def _utc(value: datetime) -> datetime:
+    # Las columnas DATETIME se guardan en UTC sin zona horaria
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def store_refresh_token(db: Session, id_usuario: int, claims: Dict) -> None:
+    """Registra un refresh token nuevo (login) y borra los vencidos del mismo usuario."""
+    try:
+        db.execute(text("""
+            DELETE FROM refresh_tokens
+            WHERE id_usuario = :id_usuario AND expira_en < :ahora
+        """), {"id_usuario": id_usuario, "ahora": _utc(datetime.now(tz=timezone.utc))})
+        db.execute(text("""
+            INSERT INTO refresh_tokens (jti, id_usuario, familia, expira_en)
+            VALUES (:jti, :id_usuario, :familia, :expira_en)
+        """), {
+            "jti": claims["jti"],
+            "id_usuario": id_usuario,
+            "familia": claims["fam"],
+            "expira_en": _utc(claims["exp"]),
+        })
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error al registrar el refresh token: {e}")
+        raise Exception("Error de base de datos al registrar el refresh token")
+
+
+def rotate_refresh_token(db: Session, claims: Dict, nuevo: Dict) -> Optional[Dict]:
+    """
+    Reemplaza el refresh token `claims` por `nuevo` (misma familia) y devuelve los datos del
+    usuario para emitir el access token, o None si el token no existe, fue revocado o el
+    usuario está inactivo. Lanza RefreshTokenReused si el token ya había sido rotado.
+    """
+    try:
+        actual = db.execute(text("""
+            SELECT refresh_tokens.revocado, refresh_tokens.reemplazado_por,
+                   usuarios.id_usuario, usuarios.id_rol, usuarios.email, usuarios.estado
+            FROM refresh_tokens
+            JOIN usuarios ON refresh_tokens.id_usuario = usuarios.id_usuario
+            WHERE refresh_tokens.jti = :jti
+        """), {"jti": claims["jti"]}).mappings().first()
+        if actual is None:
+            return None
+        if actual["reemplazado_por"] is not None:
+            _revoke_family(db, claims["fam"])
+            raise RefreshTokenReused()
+        if actual["revocado"] or not actual["estado"]:
+            return None
+
+        # La condición revocado = 0 hace que, de dos rotaciones simultáneas, solo una gane
+        result = db.execute(text("""
+            UPDATE refresh_tokens
+            SET revocado = 1, reemplazado_por = :nuevo_jti
+            WHERE jti = :jti AND revocado = 0
+        """), {"jti": claims["jti"], "nuevo_jti": nuevo["jti"]})
+        if result.rowcount == 0:
+            _revoke_family(db, claims["fam"])
+            raise RefreshTokenReused()
+
+        db.execute(text("""
+            INSERT INTO refresh_tokens (jti, id_usuario, familia, expira_en)
+            VALUES (:jti, :id_usuario, :familia, :expira_en)
+        """), {
+            "jti": nuevo["jti"],
+            "id_usuario": actual["id_usuario"],
+            "familia": claims["fam"],
+            "expira_en": _utc(nuevo["exp"]),
+        })
+        db.commit()
+        return dict(actual)
+    except RefreshTokenReused:
+        logger.warning(f"Refresh token reutilizado (usuario {claims['sub']}); se revocó la familia {claims['fam']}")
+        raise
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error al rotar el refresh token: {e}")
+        raise Exception("Error de base de datos al renovar la sesión")
+
+
+def _revoke_family(db: Session, familia: str) -> None:
+    db.execute(text("""
+        UPDATE refresh_tokens
+        SET revocado = 1
+        WHERE familia = :familia AND revocado = 0
+    """), {"familia": familia})
+    db.commit()
+
+
+def revoke_refresh_family(db: Session, familia: str) -> None:
+    """Revoca todos los refresh tokens de un login (logout)."""
+    try:
+        _revoke_family(db, familia)
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error al revocar la sesión: {e}")
+        raise Exception("Error de base de datos al cerrar la sesión")
+
+
+def revoke_user_refresh_tokens(db: Session, id_usuario: int) -> None:
+    """
+    Revoca todos los refresh tokens del usuario dentro de la transacción actual (sin commit),
+    para confirmarse junto con el cambio que lo motiva.
+    """
+    db.execute(text("""
+        UPDATE refresh_tokens
+        SET revocado = 1
+        WHERE id_usuario = :id_usuario AND revocado = 0
+    """), {"id_usuario": id_usuario})
@@ -2,13 +2,42 @@ from datetime import date
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy import text
-from typing import Optional
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 import logging
 
+from app.crud.cache_versions import bump_versions_after_commit
+from app.crud.common import PartialUpdate, fetch_by_ids, order_by_ids
+from app.crud.rescue_stats import apply_rescue_deltas
+from app.crud.sheds import ShedCapacityError, adjust_shed_occupancy, get_shed_ids, occupancy_deltas
+from app.crud.type_chickens import get_all_type_chickens
 from app.schemas.rescue import RescueCreate, RescueUpdate
+from core.cache import TTLCache
+from core.config import settings
+from core.database import estimate_table_rows, for_update_clause
 
 logger = logging.getLogger(__name__)
 
+# Conteos de salvamentos por filtro (rango de fechas). Se vacía con cada escritura de este proceso;
+# en los demás workers expira tras COUNT_CACHE_TTL_SECONDS.
+_count_cache = TTLCache(ttl=settings.COUNT_CACHE_TTL_SECONDS, max_size=256)
+
+_rescue_update = PartialUpdate(
+    "salvamento", "id_salvamento",
+    {"id_galpon": "id_galpon", "fecha": "fecha", "id_tipo_gallina": "id_tipo_gallina", "cantidad_gallinas": "cantidad_gallinas"},
+    omitir=(0,)
+)
+
+
+def _get_rescue_for_update(db: Session, id_salvamento: int) -> Optional[Dict]:
+    # Lee y bloquea la fila para ajustar el acumulado diario con los valores previos
+    query = text(f"""
+        SELECT id_salvamento, id_galpon, fecha, id_tipo_gallina, cantidad_gallinas
+        FROM salvamento
+        WHERE id_salvamento = :id_salvamento{for_update_clause(db)}
+    """)
+    row = db.execute(query, {"id_salvamento": id_salvamento}).mappings().first()
+    return dict(row) if row else None
+
 def create_rescue(db: Session, rescue: RescueCreate) -> Optional[bool]:
     try:
         query = text("""
@@ -18,15 +47,72 @@ def create_rescue(db: Session, rescue: RescueCreate) -> Optional[bool]:
                 :id_galpon, :fecha, :id_tipo_gallina, :cantidad_gallinas
             )
         """)
-        db.execute(query, rescue.model_dump())
+        rescue_data = rescue.model_dump()
+        db.execute(query, rescue_data)
+        apply_rescue_deltas(db, [rescue_data])
+        # Las gallinas salvadas salen del galpón
+        adjust_shed_occupancy(db, occupancy_deltas([], salen=[rescue_data]))
         db.commit()
+        bump_versions_after_commit(db, "salvamento", "galpones")
+        _count_cache.clear()
         return True
+    except ShedCapacityError:
+        db.rollback()
+        raise
     except SQLAlchemyError as e:
         db.rollback()
         logger.error(f"Error al crear salvamento: {e}")
         raise Exception("Error de base de datos al crear la salvamento")
 
 
+def create_rescues_bulk(db: Session, rescues: List[Dict]) -> int:
+    """
+    Inserta un lote de salvamentos en una sola transacción.
+
+    Con una lista de parámetros SQLAlchemy usa executemany, que PyMySQL reescribe como
+    un único INSERT multi-fila. Si falla (o algún galpón quedaría con ocupación negativa,
+    ver ShedCapacityError), se revierte el lote completo.
+    """
+    if not rescues:
+        return 0
+    try:
+        query = text("""
+            INSERT INTO salvamento (
+                id_galpon, fecha, id_tipo_gallina, cantidad_gallinas
+            ) VALUES (
+                :id_galpon, :fecha, :id_tipo_gallina, :cantidad_gallinas
+            )
+        """)
+        db.execute(query, rescues)
+        apply_rescue_deltas(db, rescues)
+        adjust_shed_occupancy(db, occupancy_deltas([], salen=rescues))
+        db.commit()
+        bump_versions_after_commit(db, "salvamento", "galpones")
+        _count_cache.clear()
+        return len(rescues)
+    except ShedCapacityError:
+        db.rollback()
+        raise
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error al crear lote de {len(rescues)} salvamentos: {e}")
+        raise Exception("Error de base de datos al crear los salvamentos")
+
+
+def get_rescue_reference_ids(db: Session) -> Tuple[Set[int], Set[int]]:
+    """
+    Devuelve los ids de galpones y tipos de gallina existentes, para validar
+    las filas de una importación masiva antes de insertarlas.
+    """
+    try:
+        # Tablas de referencia cacheadas: una importación no vuelve a leerlas completas
+        tipos = {tipo["id_tipo_gallinas"] for tipo in get_all_type_chickens(db)}
+        return get_shed_ids(db), tipos
+    except SQLAlchemyError as e:
+        logger.error(f"Error al obtener ids de referencia: {e}")
+        raise Exception("Error de base de datos al obtener galpones y tipos de gallina")
+
+
 def get_rescue_by_id(db: Session, id_salvamento: int):
     try:
         query = text("""SELECT salvamento.id_salvamento, salvamento.id_galpon, salvamento.fecha, salvamento.id_tipo_gallina, 
@@ -42,6 +128,23 @@ def get_rescue_by_id(db: Session, id_salvamento: int):
         logger.error(f"Error al obtener salvamento por id: {e}")
         raise Exception("Error de base de datos al obtener el salvamento")
 
+
+def get_rescues_by_ids(db: Session, ids: List[int]) -> Dict[str, List]:
+    """Salvamentos en el orden de `ids` (None en las posiciones inexistentes) y los ids no encontrados."""
+    try:
+        filas = fetch_by_ids(db, """
+            SELECT salvamento.id_salvamento, salvamento.id_galpon, salvamento.fecha, salvamento.id_tipo_gallina,
+                   salvamento.cantidad_gallinas, galpones.nombre, tipo_gallinas.raza
+            FROM salvamento
+            JOIN galpones ON salvamento.id_galpon = galpones.id_galpon
+            JOIN tipo_gallinas ON salvamento.id_tipo_gallina = tipo_gallinas.id_tipo_gallinas
+            WHERE salvamento.id_salvamento IN :ids
+        """, "id_salvamento", ids)
+        return order_by_ids(ids, filas)
+    except SQLAlchemyError as e:
+        logger.error(f"Error al obtener salvamentos por ids: {e}")
+        raise Exception("Error de base de datos al obtener los salvamentos")
+
 def get_all_rescues(db: Session):
     try:
         query = text("""SELECT salvamento.id_salvamento, salvamento.id_galpon, salvamento.fecha, 
@@ -59,32 +162,70 @@ def get_all_rescues(db: Session):
         logger.error(f"Error al obtener todos los salvamentos: {e}")
         raise Exception("Error de base de datos al obtener los salvamentos")
 
+def iter_rescues(
+    db: Session,
+    fecha_inicio: Optional[date] = None,
+    fecha_fin: Optional[date] = None,
+    batch_size: int = 1000
+) -> Iterator[List[Dict]]:
+    """
+    Recorre los salvamentos (opcionalmente por rango de fechas) en bloques de `batch_size` filas.
+
+    Usa un cursor del lado del servidor (stream_results) para que la memoria quede acotada
+    al tamaño del bloque, sin importar cuántas filas tenga la exportación.
+    """
+    where = ""
+    params = {}
+    if fecha_inicio is not None and fecha_fin is not None:
+        where = "WHERE salvamento.fecha BETWEEN :fecha_inicio AND :fecha_fin"
+        params = {"fecha_inicio": fecha_inicio, "fecha_fin": fecha_fin}
+
+    query = text(f"""
+        SELECT salvamento.id_salvamento, salvamento.id_galpon, salvamento.fecha, 
+                salvamento.id_tipo_gallina, salvamento.cantidad_gallinas,
+                galpones.nombre as nombre, 
+                tipo_gallinas.raza as raza
+        FROM salvamento
+        JOIN galpones ON salvamento.id_galpon = galpones.id_galpon
+        JOIN tipo_gallinas ON salvamento.id_tipo_gallina = tipo_gallinas.id_tipo_gallinas
+        {where}
+        ORDER BY salvamento.fecha DESC, salvamento.id_salvamento DESC
+    """).execution_options(stream_results=True, yield_per=batch_size)
+
+    try:
+        result = db.execute(query, params)
+        for partition in result.mappings().partitions():
+            yield [dict(row) for row in partition]
+    except SQLAlchemyError as e:
+        logger.error(f"Error al exportar los salvamentos: {e}", exc_info=True)
+        raise Exception(f"Error de base de datos al exportar los salvamentos: {str(e)}")
+
 def update_rescue_by_id(db: Session, id_salvamento: int, rescue:RescueUpdate) -> Optional[bool]:
     try:
         # Solo los campos enviados por el cliente
-        rescue_data = rescue.model_dump(exclude_unset=True, exclude_none=True)
-
-        rescue_data = {key: value for key, value in rescue_data.items() if value != 0}
-        
+        rescue_data = _rescue_update.values(rescue.model_dump(exclude_unset=True))
         if not rescue_data:
             return False  # nada que actualizar
-        
-        logger.info(f"Actualizando finca {id_salvamento} con datos: {rescue_data}")
-
-        # Construir dinámicamente la sentencia UPDATE
-        set_clauses = ", ".join([f"{key} = :{key}" for key in rescue_data.keys()])
-        sentencia = text(f"""
-            UPDATE salvamento 
-            SET {set_clauses}
-            WHERE id_salvamento = :id_salvamento
-        """)
 
-        # Agregar el id_usuario
-        rescue_data["id_salvamento"] = id_salvamento
+        logger.info(f"Actualizando salvamento {id_salvamento} con datos: {rescue_data}")
 
-        result = db.execute(sentencia, rescue_data)
+        anterior = _get_rescue_for_update(db, id_salvamento)
+        if anterior is None:
+            db.rollback()
+            return False
+
+        rowcount = _rescue_update.execute(db, id_salvamento, rescue_data)
+        # Mover el salvamento en el acumulado diario: restar los valores previos y sumar los nuevos
+        apply_rescue_deltas(db, [{**anterior, **rescue_data}], removed=[anterior])
+        # Devolver al galpón anterior las aves del registro previo y descontar las del nuevo
+        adjust_shed_occupancy(db, occupancy_deltas([anterior], salen=[{**anterior, **rescue_data}]))
         db.commit()
-        return result.rowcount > 0
+        bump_versions_after_commit(db, "salvamento", "galpones")
+        _count_cache.clear()
+        return rowcount > 0
+    except ShedCapacityError:
+        db.rollback()
+        raise
     except SQLAlchemyError as e:
         db.rollback()
         logger.error(f"Error al actualizar salvamento {id_salvamento}: {e}")
@@ -96,25 +237,84 @@ def delete_rescue_by_id(db: Session, id_salvamento: int) -> Optional[bool]:
             DELETE FROM salvamento 
             WHERE id_salvamento = :id_salvamento
         """)
+        anterior = _get_rescue_for_update(db, id_salvamento)
+        if anterior is None:
+            db.rollback()
+            return False
+
         result = db.execute(query, {"id_salvamento": id_salvamento})
+        apply_rescue_deltas(db, [], removed=[anterior])
+        adjust_shed_occupancy(db, occupancy_deltas([anterior]))
         db.commit()
+        bump_versions_after_commit(db, "salvamento", "galpones")
+        _count_cache.clear()
         return result.rowcount > 0
+    except ShedCapacityError:
+        db.rollback()
+        raise
     except SQLAlchemyError as e:
         db.rollback()
         logger.error(f"Error al eliminar salvamento {id_salvamento}: {e}")
         raise Exception("Error de base de datos al eliminar el salvamento")
     
-def get_all_rescues_pag(db: Session, skip: int = 0, limit: int = 10):
+def count_rescues(
+    db: Session,
+    fecha_inicio: Optional[date] = None,
+    fecha_fin: Optional[date] = None,
+    total_mode: str = "cached"
+) -> int:
     """
-    Obtiene los salvamentos con paginación.
+    Cuenta los salvamentos, opcionalmente filtrados por rango de fechas.
+
+    total_mode:
+        - "exact": ejecuta siempre COUNT.
+        - "cached": reutiliza el conteo del mismo filtro durante COUNT_CACHE_TTL_SECONDS.
+        - "estimated": usa las estadísticas de la tabla si no hay filtro; si no, se comporta como "cached".
     """
-    try:
-        # 1. Contar total de salvamentos
+    if total_mode == "estimated" and fecha_inicio is None:
+        estimado = estimate_table_rows(db, "salvamento")
+        if estimado is not None:
+            return estimado
+
+    key = (fecha_inicio, fecha_fin)
+    if total_mode != "exact":
+        total = _count_cache.get(key)
+        if total is not None:
+            return total
+
+    if fecha_inicio is not None:
         count_query = text("""
             SELECT COUNT(id_salvamento) AS total
             FROM salvamento
+            WHERE fecha BETWEEN :fecha_inicio AND :fecha_fin
         """)
-        total_result = db.execute(count_query).scalar()
+        total = db.execute(
+            count_query, 
+            {"fecha_inicio": fecha_inicio, "fecha_fin": fecha_fin}
+        ).scalar() or 0
+    else:
+        count_query = text("""
+            SELECT COUNT(id_salvamento) AS total
+            FROM salvamento
+        """)
+        total = db.execute(count_query).scalar() or 0
+
+    _count_cache.set(key, total)
+    return total
+
+def get_all_rescues_pag(
+    db: Session,
+    skip: int = 0,
+    limit: int = 10,
+    include_total: bool = True,
+    total_mode: str = "cached"
+):
+    """
+    Obtiene los salvamentos con paginación.
+    """
+    try:
+        # 1. Contar total de salvamentos (opcional, ver count_rescues)
+        total_result = count_rescues(db, total_mode=total_mode) if include_total else None
     
         # 2. Consultar salvamentos paginados - CON NOMBRES REALES DE COLUMNAS
         data_query = text("""
@@ -133,7 +333,7 @@ def get_all_rescues_pag(db: Session, skip: int = 0, limit: int = 10):
 
         # 3. Retornar resultados
         return {
-            "total": total_result or 0,
+            "total": total_result,
             "rescues": [dict(row) for row in result]
         }
     
@@ -146,22 +346,18 @@ def get_rescues_by_date_range_pag(
     fecha_inicio: date, 
     fecha_fin: date, 
     skip: int = 0, 
-    limit: int = 10
+    limit: int = 10,
+    include_total: bool = True,
+    total_mode: str = "cached"
 ):
     """
     Obtiene los salvamentos con paginación filtrados por rango de fechas.
     """
     try:
-        # 1. Contar total de salvamentos en el rango de fechas
-        count_query = text("""
-            SELECT COUNT(id_salvamento) AS total
-            FROM salvamento
-            WHERE fecha BETWEEN :fecha_inicio AND :fecha_fin
-        """)
-        total_result = db.execute(
-            count_query, 
-            {"fecha_inicio": fecha_inicio, "fecha_fin": fecha_fin}
-        ).scalar()
+        # 1. Contar total de salvamentos en el rango de fechas (opcional, ver count_rescues)
+        total_result = None
+        if include_total:
+            total_result = count_rescues(db, fecha_inicio, fecha_fin, total_mode)
     
         # 2. Consultar salvamentos paginados en el rango de fechas
         data_query = text("""
@@ -189,10 +385,64 @@ def get_rescues_by_date_range_pag(
 
         # 3. Retornar resultados
         return {
-            "total": total_result or 0,
+            "total": total_result,
             "rescues": [dict(row) for row in result]
         }
     
     except SQLAlchemyError as e:
         logger.error(f"Error al obtener los salvamentos por rango de fechas: {e}", exc_info=True)
-        raise Exception(f"Error de base de datos al obtener los salvamentos: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Error de base de datos al obtener los salvamentos: {str(e)}")
+
+def get_rescues_keyset(
+    db: Session,
+    limit: int = 10,
+    after_fecha: Optional[date] = None,
+    after_id: Optional[int] = None,
+    fecha_inicio: Optional[date] = None,
+    fecha_fin: Optional[date] = None
+):
+    """
+    Obtiene los salvamentos paginados por clave (fecha, id_salvamento) en orden descendente.
+
+    En lugar de OFFSET se continúa a partir de la última fila entregada, por lo que el
+    costo es el mismo para cualquier página. Se pide una fila extra para saber si hay más.
+    """
+    try:
+        condiciones = []
+        params = {"limit": limit + 1}
+
+        if fecha_inicio is not None and fecha_fin is not None:
+            condiciones.append("salvamento.fecha BETWEEN :fecha_inicio AND :fecha_fin")
+            params.update({"fecha_inicio": fecha_inicio, "fecha_fin": fecha_fin})
+
+        if after_fecha is not None and after_id is not None:
+            # Expandido en OR para que MySQL use el índice (fecha, id_salvamento)
+            condiciones.append("""(salvamento.fecha < :after_fecha
+                    OR (salvamento.fecha = :after_fecha AND salvamento.id_salvamento < :after_id))""")
+            params.update({"after_fecha": after_fecha, "after_id": after_id})
+
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+
+        data_query = text(f"""
+            SELECT salvamento.id_salvamento, salvamento.id_galpon, salvamento.fecha, 
+                    salvamento.id_tipo_gallina, salvamento.cantidad_gallinas,
+                    galpones.nombre as nombre, 
+                    tipo_gallinas.raza as raza
+            FROM salvamento
+            JOIN galpones ON salvamento.id_galpon = galpones.id_galpon
+            JOIN tipo_gallinas ON salvamento.id_tipo_gallina = tipo_gallinas.id_tipo_gallinas
+            {where}
+            ORDER BY salvamento.fecha DESC, salvamento.id_salvamento DESC
+            LIMIT :limit
+        """)
+
+        result = db.execute(data_query, params).mappings().all()
+
+        return {
+            "has_more": len(result) > limit,
+            "rescues": [dict(row) for row in result[:limit]]
+        }
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error al obtener los salvamentos por cursor: {e}", exc_info=True)
+        raise Exception(f"Error de base de datos al obtener los salvamentos: {str(e)}")
@@ -0,0 +1,78 @@
+from datetime import date
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.crud import rescue as crud_rescue
+from app.schemas.rescue import RescueCreate, RescueUpdate
+
+# Variantes asíncronas de app.crud.rescue.
+# Cada función ejecuta la versión síncrona mediante AsyncSession.run_sync: con un driver async
+# (aiomysql / aiosqlite) la espera de red ocurre en el event loop, sin ocupar un hilo, y las
+# sentencias SQL, validaciones e invalidaciones de caché siguen definidas en un solo lugar.
+
+
+async def create_rescue(db: AsyncSession, rescue: RescueCreate) -> Optional[bool]:
+    return await db.run_sync(crud_rescue.create_rescue, rescue)
+
+
+async def create_rescues_bulk(db: AsyncSession, rescues: List[Dict]) -> int:
+    return await db.run_sync(crud_rescue.create_rescues_bulk, rescues)
+
+
+async def get_rescue_reference_ids(db: AsyncSession) -> Tuple[Set[int], Set[int]]:
+    return await db.run_sync(crud_rescue.get_rescue_reference_ids)
+
+
+async def get_rescue_by_id(db: AsyncSession, id_salvamento: int):
+    return await db.run_sync(crud_rescue.get_rescue_by_id, id_salvamento)
+
+
+async def update_rescue_by_id(db: AsyncSession, id_salvamento: int, rescue: RescueUpdate) -> Optional[bool]:
+    return await db.run_sync(crud_rescue.update_rescue_by_id, id_salvamento, rescue)
+
+
+async def delete_rescue_by_id(db: AsyncSession, id_salvamento: int) -> Optional[bool]:
+    return await db.run_sync(crud_rescue.delete_rescue_by_id, id_salvamento)
+
+
+async def get_all_rescues_pag(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 10,
+    include_total: bool = True,
+    total_mode: str = "cached"
+):
+    return await db.run_sync(
+        lambda session: crud_rescue.get_all_rescues_pag(session, skip, limit, include_total, total_mode)
+    )
+
+
+async def get_rescues_by_date_range_pag(
+    db: AsyncSession,
+    fecha_inicio: date,
+    fecha_fin: date,
+    skip: int = 0,
+    limit: int = 10,
+    include_total: bool = True,
+    total_mode: str = "cached"
+):
+    return await db.run_sync(
+        lambda session: crud_rescue.get_rescues_by_date_range_pag(
+            session, fecha_inicio, fecha_fin, skip, limit, include_total, total_mode
+        )
+    )
+
+
+async def get_rescues_keyset(
+    db: AsyncSession,
+    limit: int = 10,
+    after_fecha: Optional[date] = None,
+    after_id: Optional[int] = None,
+    fecha_inicio: Optional[date] = None,
+    fecha_fin: Optional[date] = None
+):
+    return await db.run_sync(
+        lambda session: crud_rescue.get_rescues_keyset(
+            session, limit, after_fecha, after_id, fecha_inicio, fecha_fin
+        )
+    )
@@ -0,0 +1,172 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import text
+from typing import Dict, Iterable, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Tabla `salvamento_diario` (ver sql/003_salvamento_diario.sql): totales por
+# (fecha, id_galpon, id_tipo_gallina). Las funciones de escritura no hacen commit; se llaman
+# desde app.crud.rescue dentro de la misma transacción que modifica `salvamento`.
+
+_UPSERT_MYSQL = text("""
+    INSERT INTO salvamento_diario (fecha, id_galpon, id_tipo_gallina, total_gallinas, registros)
+    VALUES (:fecha, :id_galpon, :id_tipo_gallina, :cantidad, :registros)
+    ON DUPLICATE KEY UPDATE
+        total_gallinas = total_gallinas + VALUES(total_gallinas),
+        registros = registros + VALUES(registros)
+""")
+
+_UPSERT_ANSI = text("""
+    INSERT INTO salvamento_diario (fecha, id_galpon, id_tipo_gallina, total_gallinas, registros)
+    VALUES (:fecha, :id_galpon, :id_tipo_gallina, :cantidad, :registros)
+    ON CONFLICT (fecha, id_galpon, id_tipo_gallina) DO UPDATE SET
+        total_gallinas = salvamento_diario.total_gallinas + excluded.total_gallinas,
+        registros = salvamento_diario.registros + excluded.registros
+""")
+
+_CAMPOS_AGRUPACION = {"galpon": "id_galpon", "tipo_gallina": "id_tipo_gallina"}
+
+
+def apply_rescue_deltas(db: Session, added: Iterable[Dict], removed: Iterable[Dict] = ()) -> None:
+    """
+    Suma al acumulado diario los salvamentos de `added` y resta los de `removed`.
+
+    Las filas se agrupan por clave antes de escribir: un lote de la importación masiva
+    produce una fila por combinación de día, galpón y raza, y una actualización que no
+    cambia la clave se reduce a un único ajuste.
+    """
+    deltas = defaultdict(lambda: [0, 0])
+    for signo, rescues in ((1, added), (-1, removed)):
+        for rescue in rescues:
+            fecha = rescue["fecha"]
+            if isinstance(fecha, str):  # SQLite devuelve las fechas como texto
+                fecha = date.fromisoformat(fecha)
+            key = (fecha, rescue["id_galpon"], rescue["id_tipo_gallina"])
+            deltas[key][0] += signo * rescue["cantidad_gallinas"]
+            deltas[key][1] += signo
+
+    params = [
+        {"fecha": f, "id_galpon": g, "id_tipo_gallina": t, "cantidad": cantidad, "registros": registros}
+        for (f, g, t), (cantidad, registros) in deltas.items()
+        if cantidad or registros
+    ]
+    if not params:
+        return
+
+    upsert = _UPSERT_MYSQL if db.get_bind().dialect.name == "mysql" else _UPSERT_ANSI
+    db.execute(upsert, params)
+
+    # Eliminar los días que quedaron sin salvamentos
+    vacias = [p for p in params if p["registros"] < 0]
+    if vacias:
+        db.execute(text("""
+            DELETE FROM salvamento_diario
+            WHERE fecha = :fecha AND id_galpon = :id_galpon
+              AND id_tipo_gallina = :id_tipo_gallina AND registros <= 0
+        """), vacias)
+
+
+def rebuild_rescue_rollup(
+    db: Session,
+    fecha_inicio: Optional[date] = None,
+    fecha_fin: Optional[date] = None
+) -> int:
+    """
+    Recalcula el acumulado diario a partir de `salvamento`, completo o para un rango de fechas.
+
+    Returns:
+        int: Número de filas del acumulado generadas.
+    """
+    try:
+        where = ""
+        params = {}
+        if fecha_inicio is not None and fecha_fin is not None:
+            where = "WHERE fecha BETWEEN :fecha_inicio AND :fecha_fin"
+            params = {"fecha_inicio": fecha_inicio, "fecha_fin": fecha_fin}
+
+        db.execute(text(f"DELETE FROM salvamento_diario {where}"), params)
+        result = db.execute(text(f"""
+            INSERT INTO salvamento_diario (fecha, id_galpon, id_tipo_gallina, total_gallinas, registros)
+            SELECT fecha, id_galpon, id_tipo_gallina, SUM(cantidad_gallinas), COUNT(*)
+            FROM salvamento
+            {where}
+            GROUP BY fecha, id_galpon, id_tipo_gallina
+        """), params)
+        db.commit()
+        return result.rowcount
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error al reconstruir el acumulado de salvamentos: {e}")
+        raise Exception("Error de base de datos al reconstruir el acumulado de salvamentos")
+
+
+def _inicio_periodo(fecha: date, periodo: str) -> date:
+    if periodo == "semana":
+        return fecha - timedelta(days=fecha.weekday())  # lunes (semana ISO)
+    if periodo == "mes":
+        return fecha.replace(day=1)
+    return fecha
+
+
+def get_rescue_stats(
+    db: Session,
+    fecha_inicio: date,
+    fecha_fin: date,
+    periodo: str = "dia",
+    id_galpon: Optional[int] = None,
+    id_tipo_gallina: Optional[int] = None,
+    agrupar_por: Optional[str] = None
+) -> List[Dict]:
+    """
+    Totales de salvamentos por día, semana o mes desde el acumulado diario.
+
+    La consulta agrega por día (pocas filas por día) y los días se agrupan en
+    semanas o meses en Python, lo que mantiene el SQL igual en MySQL y SQLite.
+    """
+    try:
+        campo = _CAMPOS_AGRUPACION.get(agrupar_por)
+        condiciones = ["fecha BETWEEN :fecha_inicio AND :fecha_fin"]
+        params = {"fecha_inicio": fecha_inicio, "fecha_fin": fecha_fin}
+        if id_galpon is not None:
+            condiciones.append("id_galpon = :id_galpon")
+            params["id_galpon"] = id_galpon
+        if id_tipo_gallina is not None:
+            condiciones.append("id_tipo_gallina = :id_tipo_gallina")
+            params["id_tipo_gallina"] = id_tipo_gallina
+
+        columnas = f"fecha, {campo}" if campo else "fecha"
+        query = text(f"""
+            SELECT {columnas}, SUM(total_gallinas) AS total_gallinas, SUM(registros) AS registros
+            FROM salvamento_diario
+            WHERE {' AND '.join(condiciones)}
+            GROUP BY {columnas}
+            ORDER BY fecha
+        """)
+        rows = db.execute(query, params).mappings().all()
+    except SQLAlchemyError as e:
+        logger.error(f"Error al obtener estadísticas de salvamentos: {e}")
+        raise Exception("Error de base de datos al obtener las estadísticas de salvamentos")
+
+    buckets = {}
+    for row in rows:
+        fecha = row["fecha"]
+        if isinstance(fecha, str):  # SQLite devuelve las fechas como texto
+            fecha = date.fromisoformat(fecha)
+        key = (_inicio_periodo(fecha, periodo), row[campo] if campo else None)
+        bucket = buckets.setdefault(key, {"total_gallinas": 0, "registros": 0})
+        bucket["total_gallinas"] += int(row["total_gallinas"] or 0)
+        bucket["registros"] += int(row["registros"] or 0)
+
+    return [
+        {
+            "periodo_inicio": inicio,
+            "id_galpon": valor if campo == "id_galpon" else id_galpon,
+            "id_tipo_gallina": valor if campo == "id_tipo_gallina" else id_tipo_gallina,
+            **totales
+        }
+        for (inicio, valor), totales in sorted(buckets.items(), key=lambda item: (item[0][0], item[0][1] or 0))
+    ]
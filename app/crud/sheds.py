@@ -1,13 +1,50 @@
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import text
-from typing import Optional
+from sqlalchemy import bindparam, text
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set
 import logging
 
+from app.crud.cache_versions import VersionedCache, bump_version
+from app.crud.common import PartialUpdate, fetch_by_ids, order_by_ids
 from app.schemas.sheds import ShedCreate, ShedUpdate
+from core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Campos editables con PUT /sheds/by-id y PATCH /sheds/bulk; el estado tiene su propio endpoint y
+# cant_actual solo cambia con los ingresos y salvamentos (adjust_shed_occupancy)
+_shed_update = PartialUpdate(
+    "galpones", "id_galpon",
+    {"nombre": "nombre", "capacidad": "capacidad"}
+)
+
+
+def _load_shed_references(db: Session) -> List[Dict]:
+    # Sin cant_actual: la ocupación cambia con cada ingreso o salvamento y se lee siempre de la BD
+    rows = db.execute(text("""
+        SELECT id_galpon, id_finca, nombre, capacidad, estado
+        FROM galpones
+    """)).mappings().all()
+    return [dict(row) for row in rows]
+
+
+# Datos de referencia de los galpones en memoria (se precargan al arrancar, ver main.lifespan)
+_shed_references = VersionedCache("galpones", _load_shed_references, settings.REFERENCE_CACHE_TTL_SECONDS)
+
+
+def _check_capacity(db: Session, ids: List[int]) -> None:
+    # Se ejecuta después del UPDATE: las filas ya están bloqueadas por esta transacción, así que
+    # ningún ingreso concurrente puede cambiar su ocupación entre el cambio y la comprobación
+    query = text("""
+        SELECT id_galpon
+        FROM galpones
+        WHERE id_galpon IN :ids AND capacidad < cant_actual
+    """).bindparams(bindparam("ids", expanding=True))
+    excedidos = db.execute(query, {"ids": ids}).scalars().all()
+    if excedidos:
+        raise ShedBelowOccupancyError(sorted(excedidos))
+
 def create_shed(db: Session, shed: ShedCreate) -> Optional[bool]:
     try:
         sentencia = text("""
@@ -22,7 +59,9 @@ def create_shed(db: Session, shed: ShedCreate) -> Optional[bool]:
             )
         """)
         db.execute(sentencia, shed.model_dump())
+        bump_version(db, "galpones")
         db.commit()
+        _shed_references.invalidate()
         return True
     except SQLAlchemyError as e:
         db.rollback()
@@ -41,6 +80,20 @@ def get_shed_by_id(db: Session, id: int):
     except SQLAlchemyError as e:
         logger.error(f"Error al obtener galpón por el id: {e}")
         raise Exception("Error de base de datos al obtener el galpón")
+
+
+def get_sheds_by_ids(db: Session, ids: List[int]) -> Dict[str, List]:
+    """Galpones en el orden de `ids` (None en las posiciones inexistentes) y los ids no encontrados."""
+    try:
+        filas = fetch_by_ids(db, """
+            SELECT id_galpon, id_finca, nombre, capacidad, cant_actual, estado
+            FROM galpones
+            WHERE id_galpon IN :ids
+        """, "id_galpon", ids)
+        return order_by_ids(ids, filas)
+    except SQLAlchemyError as e:
+        logger.error(f"Error al obtener galpones por ids: {e}")
+        raise Exception("Error de base de datos al obtener los galpones")
     
 def get_all_sheds(db: Session):
     try:
@@ -55,31 +108,69 @@ def get_all_sheds(db: Session):
         logger.error(f"Error al obtener tipos de galpones: {e}")
         raise Exception("Error de base de datos al obtener los galpones")
 
+def get_active_sheds(db: Session) -> List[Dict]:
+    """Galpones activos (id, finca, nombre y capacidad) desde la caché de referencia."""
+    try:
+        return [galpon for galpon in _shed_references.get(db) if galpon["estado"]]
+    except SQLAlchemyError as e:
+        logger.error(f"Error al obtener los galpones activos: {e}")
+        raise Exception("Error de base de datos al obtener los galpones")
+
+
+def get_shed_ids(db: Session) -> Set[int]:
+    """Ids de todos los galpones existentes, desde la caché de referencia."""
+    try:
+        return {galpon["id_galpon"] for galpon in _shed_references.get(db)}
+    except SQLAlchemyError as e:
+        logger.error(f"Error al obtener los ids de galpones: {e}")
+        raise Exception("Error de base de datos al obtener los galpones")
+
 def update_shed_by_id(db: Session, shed_id: int, shed: ShedUpdate) -> Optional[bool]:
     try:
         shed_data = shed.model_dump(exclude_unset=True)
-        if not shed_data:
+        rowcount = _shed_update.execute(db, shed_id, shed_data)
+        if rowcount is None:
             return False  # nada que actualizar
+        if rowcount and shed_data.get("capacidad") is not None:
+            _check_capacity(db, [shed_id])
 
-        set_clauses = ", ".join([f"{key} = :{key}" for key in shed_data.keys()])
-        sentencia = text(f"""
-            UPDATE galpones 
-            SET {set_clauses}
-            WHERE id_galpon = :id_galpon
-        """)
-
-        # Agregar el id_galpon
-        shed_data["id_galpon"] = shed_id
-
-        result = db.execute(sentencia, shed_data)
+        bump_version(db, "galpones")
         db.commit()
+        _shed_references.invalidate()
 
-        return result.rowcount > 0
-    
+        return rowcount > 0
+
+    except ShedBelowOccupancyError:
+        db.rollback()
+        raise
     except SQLAlchemyError as e:
         db.rollback()
         logger.error(f"Error al actualizar galpón {shed_id}: {e}")
         raise Exception("Error de base de datos al actualizar el galpón")
+
+
+def update_sheds_bulk(db: Session, sheds: List[Dict]) -> int:
+    """
+    Actualiza varios galpones en una transacción; `sheds` son dicts con id_galpon y los campos a cambiar.
+    Devuelve las filas afectadas.
+    """
+    try:
+        updated = _shed_update.execute_many(db, sheds)
+        con_capacidad = [shed["id_galpon"] for shed in sheds if shed.get("capacidad") is not None]
+        if updated and con_capacidad:
+            _check_capacity(db, con_capacidad)
+        if updated:
+            bump_version(db, "galpones")
+        db.commit()
+        _shed_references.invalidate()
+        return updated
+    except ShedBelowOccupancyError:
+        db.rollback()
+        raise
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error al actualizar galpones en lote: {e}")
+        raise Exception("Error de base de datos al actualizar los galpones")
     
 def change_shed_status(db: Session, id_galpon: int, nuevo_estado: bool) -> bool:
     try:
@@ -89,7 +180,9 @@ def change_shed_status(db: Session, id_galpon: int, nuevo_estado: bool) -> bool:
             WHERE id_galpon = :id_galpon
         """)
         result = db.execute(sentencia, {"estado": nuevo_estado, "id_galpon": id_galpon})
+        bump_version(db, "galpones")
         db.commit()
+        _shed_references.invalidate()
 
         return result.rowcount > 0
 
@@ -97,3 +190,79 @@ def change_shed_status(db: Session, id_galpon: int, nuevo_estado: bool) -> bool:
         db.rollback()
         logger.error(f"Error al cambiar el estado del galpón {id_galpon}: {e}")
         raise Exception("Error de base de datos al cambiar el estado del galpón")
+
+
+
+class ShedCapacityError(Exception):
+    """El movimiento de aves dejaría el galpón por encima de su capacidad o con ocupación negativa."""
+
+    def __init__(self, id_galpon: int, delta: int):
+        self.id_galpon = id_galpon
+        self.delta = delta
+        motivo = "supera su capacidad" if delta > 0 else "deja la ocupación en negativo"
+        super().__init__(f"El movimiento de {delta:+d} aves en el galpón {id_galpon} {motivo}")
+
+
+class ShedBelowOccupancyError(Exception):
+    """La nueva capacidad de uno o más galpones es menor que su ocupación actual."""
+
+    def __init__(self, id_galpones: List[int]):
+        self.id_galpones = id_galpones
+        super().__init__(
+            f"La capacidad no puede ser menor que la ocupación actual (galpones {', '.join(map(str, id_galpones))})"
+        )
+
+
+def occupancy_deltas(entran: Iterable[Dict], salen: Iterable[Dict] = ()) -> Dict[int, int]:
+    """
+    Cambio de ocupación por galpón ({id_galpon: delta}) a partir de registros con
+    `id_galpon` y `cantidad_gallinas`: los de `entran` suman aves y los de `salen` restan.
+    """
+    deltas = Counter()
+    for registro in entran:
+        deltas[registro["id_galpon"]] += registro["cantidad_gallinas"]
+    for registro in salen:
+        deltas[registro["id_galpon"]] -= registro["cantidad_gallinas"]
+    return dict(deltas)
+
+
+# El límite va en el WHERE: la comprobación y el cambio son una sola sentencia atómica, sin
+# SELECT ... FOR UPDATE previo. Solo se valida el límite hacia el que se mueve la ocupación,
+# para que un galpón que ya excede una capacidad reducida pueda seguir vaciándose.
+_SUMAR_AVES = text("""
+    UPDATE galpones
+    SET cant_actual = cant_actual + :delta
+    WHERE id_galpon = :id_galpon AND cant_actual + :delta <= capacidad
+""")
+
+_RESTAR_AVES = text("""
+    UPDATE galpones
+    SET cant_actual = cant_actual + :delta
+    WHERE id_galpon = :id_galpon AND cant_actual + :delta >= 0
+""")
+
+
+def adjust_shed_occupancy(db: Session, deltas: Dict[int, int]) -> None:
+    """
+    Suma a `cant_actual` de cada galpón su delta ({id_galpon: cantidad}) en la transacción actual,
+    sin hacer commit. Se llama desde las escrituras de ingresos y salvamentos para que el
+    movimiento de aves y la ocupación se confirmen juntos.
+
+    Cada galpón se ajusta con un UPDATE condicional (`cant_actual = cant_actual + :delta`), así
+    que dos escrituras concurrentes sobre el mismo galpón no pierden actualizaciones y solo
+    bloquean esa fila. Los galpones se recorren en orden de id para que las transacciones tomen
+    los bloqueos en el mismo orden. Es el único bloqueo que se toma sobre galpones: la versión
+    "galpones" la incrementa el llamador después del commit (bump_versions_after_commit).
+
+    Raises:
+        ShedCapacityError: Si un galpón no existe o el cambio rompe sus límites; el llamador
+            debe revertir la transacción.
+    """
+    cambios = [(id_galpon, delta) for id_galpon, delta in sorted(deltas.items()) if delta]
+    if not cambios:
+        return
+    for id_galpon, delta in cambios:
+        sentencia = _SUMAR_AVES if delta > 0 else _RESTAR_AVES
+        result = db.execute(sentencia, {"id_galpon": id_galpon, "delta": delta})
+        if result.rowcount == 0:
+            raise ShedCapacityError(id_galpon, delta)
@@ -0,0 +1,19 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+from app.crud import sheds as crud_sheds
+from app.schemas.sheds import ShedUpdate
+
+# Variantes asíncronas de app.crud.sheds (ver app.crud.rescue_async).
+
+
+async def get_shed_by_id(db: AsyncSession, id: int):
+    return await db.run_sync(crud_sheds.get_shed_by_id, id)
+
+
+async def get_all_sheds(db: AsyncSession):
+    return await db.run_sync(crud_sheds.get_all_sheds)
+
+
+async def update_shed_by_id(db: AsyncSession, shed_id: int, shed: ShedUpdate) -> Optional[bool]:
+    return await db.run_sync(crud_sheds.update_shed_by_id, shed_id, shed)
@@ -1,13 +1,29 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
-from typing import Optional
+from typing import Dict, List, Optional
 import logging
 
+from app.crud.cache_versions import VersionedCache, bump_version
+from app.crud.common import PartialUpdate, fetch_by_ids, order_by_ids
 from app.schemas.type_chickens import TypeChickenCreate, TypeChickenUpdate, TypeChickenOut
+from core.config import settings
 
 logger = logging.getLogger(__name__)
 
+_type_chicken_update = PartialUpdate(
+    "tipo_gallinas", "id_tipo_gallinas", {"raza": "raza", "descripcion": "descripcion"}
+)
+
+
+def _load_type_chickens(db: Session) -> List[Dict]:
+    rows = db.execute(text("""SELECT * FROM tipo_gallinas""")).mappings().all()
+    return [dict(row) for row in rows]
+
+
+# Tabla de referencia completa en memoria (se precarga al arrancar, ver main.lifespan)
+_type_chickens_cache = VersionedCache("tipo_gallinas", _load_type_chickens, settings.REFERENCE_CACHE_TTL_SECONDS)
+
 def create_type_chicken(db: Session, type_chicken: TypeChickenCreate) -> Optional[bool]:
     try:
         query = text("""
@@ -18,7 +34,9 @@ def create_type_chicken(db: Session, type_chicken: TypeChickenCreate) -> Optiona
             )
         """)
         db.execute(query, type_chicken.model_dump())
+        bump_version(db, "tipo_gallinas")
         db.commit()
+        _type_chickens_cache.invalidate()
         return True
     except SQLAlchemyError as e:
         db.rollback()
@@ -36,11 +54,23 @@ def get_type_chicken_by_id(db: Session, id_tipo_gallinas: int):
         logger.error(f"Error al obtener el tipo de gallina por id: {e}")
         raise Exception("Error de base de datos al obtener el tipo de gallina")
 
+
+def get_type_chickens_by_ids(db: Session, ids: List[int]) -> Dict[str, List]:
+    """Tipos de gallina en el orden de `ids` (None en las posiciones inexistentes) y los ids no encontrados."""
+    try:
+        filas = fetch_by_ids(db, """
+            SELECT id_tipo_gallinas, raza, descripcion
+            FROM tipo_gallinas
+            WHERE id_tipo_gallinas IN :ids
+        """, "id_tipo_gallinas", ids)
+        return order_by_ids(ids, filas)
+    except SQLAlchemyError as e:
+        logger.error(f"Error al obtener tipos de gallina por ids: {e}")
+        raise Exception("Error de base de datos al obtener los tipos de gallina")
+
 def get_all_type_chickens(db: Session):
     try:
-        query = text("""SELECT * FROM tipo_gallinas""")
-        result = db.execute(query).mappings().all()
-        return result
+        return _type_chickens_cache.get(db)
     except SQLAlchemyError as e:
         logger.error(f"Error al obtener los tipos de gallinas: {e}")
         raise Exception("Error de base de datos al obtener los tipos de gallinas")
@@ -48,25 +78,34 @@ def get_all_type_chickens(db: Session):
 def update_type_chicken_by_id(db: Session, id_tipo_gallinas: int, type_chicken: TypeChickenUpdate) -> Optional[bool]:
     try:
         # Solo los campos enviados por el cliente
-        type_chicken_data = type_chicken.model_dump(exclude_unset=True)
-        if not type_chicken_data:
+        rowcount = _type_chicken_update.execute(db, id_tipo_gallinas, type_chicken.model_dump(exclude_unset=True))
+        if rowcount is None:
             return False  # nada que actualizar
 
-        # Construir dinámicamente la sentencia UPDATE
-        set_clauses = ", ".join([f"{key} = :{key}" for key in type_chicken_data.keys()])
-        sentencia = text(f"""
-            UPDATE tipo_gallinas 
-            SET {set_clauses}
-            WHERE id_tipo_gallinas = :id_tipo_gallinas
-        """)
-
-        type_chicken_data["id_tipo_gallinas"] = id_tipo_gallinas
-
-        result = db.execute(sentencia, type_chicken_data)
+        bump_version(db, "tipo_gallinas")
         db.commit()
-        return result.rowcount > 0
+        _type_chickens_cache.invalidate()
+        return rowcount > 0
     except SQLAlchemyError as e:
         db.rollback()
         logger.error(f"Error al actualizar el tipo de gallina {id_tipo_gallinas}: {e}")
         raise Exception("Error de base de datos al actualizar el tipo de gallina")
+
+
+def update_type_chickens_bulk(db: Session, type_chickens: List[Dict]) -> int:
+    """
+    Actualiza varios tipos de gallina en una transacción; cada dict trae id_tipo_gallinas y
+    los campos a cambiar. Devuelve las filas afectadas.
+    """
+    try:
+        updated = _type_chicken_update.execute_many(db, type_chickens)
+        if updated:
+            bump_version(db, "tipo_gallinas")
+        db.commit()
+        _type_chickens_cache.invalidate()
+        return updated
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error al actualizar tipos de gallina en lote: {e}")
+        raise Exception("Error de base de datos al actualizar los tipos de gallina")
     
@@ -1,14 +1,55 @@
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError 
 from sqlalchemy import text
-from typing import Optional
+from typing import Dict, List, Optional
 import logging
 
+from app.crud.cache_versions import VersionedCache, bump_version
+from app.crud.common import PartialUpdate, fetch_by_ids, order_by_ids
+from app.crud.refresh_tokens import revoke_user_refresh_tokens
 from app.schemas.users import UserCreate, UserUpdate
+from core.cache import TTLCache
+from core.config import settings
+from core.database import estimate_table_rows
 from core.security import get_hashed_password
 
 logger = logging.getLogger(__name__)
 
+# Filas de usuario (usuarios JOIN roles) usadas por get_current_user en cada petición autenticada
+_user_cache = TTLCache(ttl=settings.USER_CACHE_TTL_SECONDS, max_size=settings.USER_CACHE_MAX_SIZE)
+
+# Usuarios desactivados recientemente en este proceso, durante la vida de un access token. Solo
+# se usan si no se puede leer la lista compartida (_inactivos_compartidos), que es la fuente de verdad.
+_usuarios_inactivos = TTLCache(
+    ttl=settings.jwt_access_token_expire_minutes * 60,
+    max_size=settings.USER_CACHE_MAX_SIZE
+)
+
+# Ids de usuarios inactivos compartidos entre workers: change_user_status incrementa la versión
+# "usuarios_estado" y cada proceso recarga el conjunto cuando la ve cambiar (como máximo cada
+# USER_REVOCATION_CHECK_SECONDS). Así una desactivación llega a todos los workers en segundos,
+# también cuando la autenticación confía en los claims del token o la fila está en _user_cache.
+_ESTADO_VERSION = "usuarios_estado"
+
+
+def _load_inactive_ids(db: Session) -> frozenset:
+    rows = db.execute(text("SELECT id_usuario FROM usuarios WHERE estado = 0")).scalars().all()
+    return frozenset(rows)
+
+
+_inactivos_compartidos = VersionedCache(_ESTADO_VERSION, _load_inactive_ids, settings.USER_REVOCATION_CHECK_SECONDS)
+
+# Conteo de usuarios no administradores para la paginación; se vacía al crear usuarios
+_count_cache = TTLCache(ttl=settings.COUNT_CACHE_TTL_SECONDS, max_size=16)
+
+# Campos editables con PUT /users/by_id y PATCH /users/bulk. El estado tiene su propio endpoint
+# (change_user_status), que además revoca los refresh tokens y avisa a la autenticación por claims
+_user_update = PartialUpdate(
+    "usuarios", "id_usuario",
+    {"nombre": "nombre", "email": "email", "telefono": "telefono", "documento": "documento"},
+    omitir=(0, "", "string")
+)
+
 def create_user(db: Session, user: UserCreate) -> Optional[bool]:
     try:
         pass_encrypt = get_hashed_password(user.pass_hash)  #se implementa para encriptar la contraseña en la base de datos.
@@ -27,6 +68,7 @@ def create_user(db: Session, user: UserCreate) -> Optional[bool]:
         """)
         db.execute(query, user.model_dump())
         db.commit()
+        _count_cache.clear()
         return True
     except SQLAlchemyError as e:
         db.rollback()
@@ -82,35 +124,37 @@ def get_user_by_email(db: Session, email: str):
 def update_user_by_id(db: Session, user_id: int, user: UserUpdate) -> Optional[bool]:
     try:
         # Solo los campos enviados por el cliente
-        user_data = user.model_dump(exclude_unset=True, exclude_none=True)
-
-        user_data = {key: value for key, value in user_data.items() if value != 0 and value != "" and value != "string"}
-
-        if not user_data:
+        rowcount = _user_update.execute(db, user_id, user.model_dump(exclude_unset=True))
+        if rowcount is None:
             return False  # nada que actualizar
 
-        logger.info(f"Actualizando usuario {user_id} con datos: {user_data}")
-
-        # Construir dinámicamente la sentencia UPDATE
-        set_clauses = ", ".join([f"{key} = :{key}" for key in user_data.keys()])
-        sentencia = text(f"""
-            UPDATE usuarios 
-            SET {set_clauses}
-            WHERE id_usuario = :id_usuario
-        """)
-
-        # Agregar el id_usuario
-        user_data["id_usuario"] = user_id
-
-        result = db.execute(sentencia, user_data)
+        logger.info(f"Usuario {user_id} actualizado")
         db.commit()
+        invalidate_user_cache(user_id)
 
-        return result.rowcount > 0
+        return rowcount > 0
     except SQLAlchemyError as e:
         db.rollback()
         logger.error(f"Error al actualizar usuario {user_id}: {e}")
         raise Exception("Error de base de datos al actualizar el usuario")
     
+def update_users_bulk(db: Session, users: List[Dict]) -> int:
+    """
+    Actualiza varios usuarios en una transacción; `users` son dicts con id_usuario y los campos a cambiar.
+    Devuelve las filas afectadas.
+    """
+    try:
+        updated = _user_update.execute_many(db, users)
+        db.commit()
+        for user in users:
+            invalidate_user_cache(user["id_usuario"])
+        return updated
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error al actualizar usuarios en lote: {e}")
+        raise Exception("Error de base de datos al actualizar los usuarios")
+
+
 def get_user_by_id(db:Session, id:int):
     try:
         query = text(""" SELECT usuarios.id_usuario, usuarios.nombre, usuarios.id_rol,
@@ -126,6 +170,59 @@ def get_user_by_id(db:Session, id:int):
     except SQLAlchemyError as e:
         logger.error(f"Error al obtener usuario por id: {e}")
         raise Exception("Error de base de datos al obtener el usuario")
+
+
+def get_users_by_ids(db: Session, ids: List[int]) -> Dict[str, List]:
+    """Usuarios en el orden de `ids` (None en las posiciones inexistentes) y los ids no encontrados."""
+    try:
+        # Sin pass_hash: las filas solo se usan para responder
+        filas = fetch_by_ids(db, """
+            SELECT usuarios.id_usuario, usuarios.nombre, usuarios.id_rol,
+                   usuarios.email, usuarios.telefono,
+                   usuarios.documento, usuarios.estado, roles.nombre_rol
+            FROM usuarios
+            JOIN roles ON usuarios.id_rol = roles.id_rol
+            WHERE usuarios.id_usuario IN :ids
+        """, "id_usuario", ids)
+        return order_by_ids(ids, filas)
+    except SQLAlchemyError as e:
+        logger.error(f"Error al obtener usuarios por ids: {e}")
+        raise Exception("Error de base de datos al obtener los usuarios")
+
+
+def get_user_by_id_cached(db: Session, id: int):
+    """
+    Igual que get_user_by_id, pero reutiliza la fila durante USER_CACHE_TTL_SECONDS.
+    Los usuarios inexistentes no se cachean.
+    """
+    user = _user_cache.get(id)
+    if user is None:
+        user = get_user_by_id(db, id)
+        if user is not None:
+            _user_cache.set(id, user)
+    return user
+
+
+def invalidate_user_cache(id_usuario: int) -> None:
+    _user_cache.pop(id_usuario)
+
+
+def is_user_deactivated(db: Session, id_usuario: int) -> bool:
+    """
+    Indica si el usuario está desactivado según la lista compartida entre workers, que recoge
+    los cambios de estado hechos en cualquier proceso en cuanto este ve la nueva versión de
+    "usuarios_estado". Las desactivaciones locales solo se consultan si la BD no responde.
+    """
+    try:
+        inactivo = id_usuario in _inactivos_compartidos.get(db)
+    except SQLAlchemyError as e:
+        # Sin BD se conserva la última lista conocida (o solo la revocación local)
+        logger.warning(f"No se pudo revisar la lista de usuarios inactivos: {e}")
+        return id_usuario in _usuarios_inactivos
+    if not inactivo and id_usuario in _usuarios_inactivos:
+        # Reactivado (aquí o en otro worker): la entrada local ya no sirve ni como respaldo
+        _usuarios_inactivos.pop(id_usuario)
+    return inactivo
     
 
 def change_user_status(db: Session, id_usuario: int, nuevo_estado: bool) -> bool:
@@ -136,7 +233,20 @@ def change_user_status(db: Session, id_usuario: int, nuevo_estado: bool) -> bool
             WHERE id_usuario = :id_usuario
         """)
         result = db.execute(sentencia, {"estado": nuevo_estado, "id_usuario": id_usuario})
+        if not nuevo_estado:
+            # Sin esto el usuario podría seguir renovando su access token con /access/refresh
+            revoke_user_refresh_tokens(db, id_usuario)
+        # Cambio poco frecuente: se confirma junto con el estado para que ningún worker lo pierda
+        bump_version(db, _ESTADO_VERSION)
         db.commit()
+        _inactivos_compartidos.invalidate()
+
+        # La revocación debe aplicarse de inmediato, incluso con autenticación por claims
+        invalidate_user_cache(id_usuario)
+        if nuevo_estado:
+            _usuarios_inactivos.pop(id_usuario)
+        else:
+            _usuarios_inactivos.set(id_usuario, True)
 
         return result.rowcount > 0
 
@@ -150,20 +260,50 @@ def change_user_status(db: Session, id_usuario: int, nuevo_estado: bool) -> bool
 # FETCH NEXT :Limit ROWS ONLY obtiene solo las filas de esa pagina 
 # Usamos parametros :skip y :limit para evitar inyeccion sqlñ
 
-def get_all_user_except_admins_pag(db: Session, skip: int = 0, limit: int = 10):
+def count_users_except_admins(db: Session, total_mode: str = "cached") -> int:
+    """
+    Cuenta los usuarios que no son administradores.
+
+    total_mode:
+        - "exact": ejecuta siempre COUNT.
+        - "cached": reutiliza el conteo durante COUNT_CACHE_TTL_SECONDS.
+        - "estimated": usa las estadísticas de la tabla usuarios (incluye administradores,
+          que son pocos); si no están disponibles se comporta como "cached".
+    """
+    if total_mode == "estimated":
+        estimado = estimate_table_rows(db, "usuarios")
+        if estimado is not None:
+            return estimado
+
+    if total_mode != "exact":
+        total = _count_cache.get("except_admins")
+        if total is not None:
+            return total
+
+    count_query = text("""
+        SELECT COUNT(id_usuario) AS total
+        FROM usuarios
+        WHERE id_rol NOT IN (1,2)
+        """)
+    total = db.execute(count_query).scalar() or 0
+    _count_cache.set("except_admins", total)
+    return total
+
+def get_all_user_except_admins_pag(
+    db: Session,
+    skip: int = 0,
+    limit: int = 10,
+    include_total: bool = True,
+    total_mode: str = "cached"
+):
     """
     Obtiene los usuarios  (excepto administradores) con paginacion.
-    Tambien realiza una segunda consulta para contar total de usuarios.
+    Tambien realiza una segunda consulta (opcional y cacheada) para contar total de usuarios.
     Compatible con PostgreSQL, MySQL y SQLite
     """
     try:
         # 1. Contar total de usuarios excepto admins
-        count_query = text("""
-            SELECT COUNT(id_usuario) AS total
-            FROM usuarios
-            WHERE id_rol NOT IN (1,2)
-            """)
-        total_result = db.execute(count_query).scalar()
+        total_result = count_users_except_admins(db, total_mode) if include_total else None
     
         # 2. Consultar usuarios paginados
         data_query = text("""
@@ -180,7 +320,7 @@ def get_all_user_except_admins_pag(db: Session, skip: int = 0, limit: int = 10):
 
         # 3. Retornar resultados
         return {
-            "total": total_result or 0,
+            "total": total_result,
             "users": [dict(row) for row in result]
         }
     
@@ -190,3 +330,33 @@ def get_all_user_except_admins_pag(db: Session, skip: int = 0, limit: int = 10):
         
 
 
+
+
+def get_all_user_except_admins_keyset(db: Session, after_id: Optional[int] = None, limit: int = 10):
+    """
+    Obtiene los usuarios (excepto administradores) paginados por clave (id_usuario).
+    Continúa a partir del último id entregado en lugar de usar OFFSET.
+    """
+    try:
+        after_clause = "AND usuarios.id_usuario > :after_id" if after_id is not None else ""
+        data_query = text(f"""
+            SELECT id_usuario, nombre, documento, usuarios.id_rol,
+                    email, telefono, estado, nombre_rol
+            FROM usuarios
+            JOIN roles ON usuarios.id_rol = roles.id_rol
+            WHERE usuarios.id_rol NOT IN (1,2)
+            {after_clause}
+            ORDER BY id_usuario
+            LIMIT :limit
+        """)
+
+        result = db.execute(data_query, {"after_id": after_id, "limit": limit + 1}).mappings().all()
+
+        return {
+            "has_more": len(result) > limit,
+            "users": [dict(row) for row in result[:limit]]
+        }
+
+    except SQLAlchemyError as e:
+        logger.error(f"error al obtener los usuarios por cursor: {e}", exc_info=True)
+        raise Exception("Error de base de datos al obtener los usuarios")
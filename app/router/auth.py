@@ -1,32 +1,125 @@
 from typing import Annotated
-from fastapi import APIRouter, Depends,HTTPException
-from sqlalchemy.orm import Session
-from app.router.dependencias import authenticate_user
-from app.schemas.auth import ResponseLoggin
-from core.security import create_access_token
-from core.database import get_db
+from fastapi import APIRouter, Depends,HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.crud.refresh_tokens import (
+    RefreshTokenReused, revoke_refresh_family, rotate_refresh_token, store_refresh_token
+)
+from app.router.dependencias import authenticate_user_async
+from app.schemas.auth import RefreshRequest, ResponseLoggin, TokenPair
+from core.admission import LoginThrottled, login_admission
+from core.config import settings
+from core.security import (
+    PasswordHashBusy, create_access_token, create_refresh_token, decode_refresh_token
+)
+from core.database import get_async_db
 from fastapi.security import OAuth2PasswordRequestForm
 
 
 router = APIRouter()
 
+
+def _access_token_for(user) -> str:
+    return create_access_token(
+        data={
+            "sub": str(user["id_usuario"]),
+            "rol": user["id_rol"],
+            "email": user["email"],
+            "estado": bool(user["estado"])
+        }
+    )
+
+
+def _invalid_refresh() -> HTTPException:
+    return HTTPException(
+        status_code=401,
+        detail="Refresh token inválido o revocado",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
 @router.post("/token", response_model=ResponseLoggin)
 async def login_for_access_token(
+    request: Request,
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = authenticate_user(form_data.username, form_data.password, db)
+    try:
+        if settings.LOGIN_ADMISSION_ENABLED:
+            # Se rechaza antes de consultar la BD y de encolar bcrypt (ver core/admission.py)
+            login_admission.check(request.client.host if request.client else None, form_data.username)
+            with login_admission.verification_slot():
+                user = await authenticate_user_async(form_data.username, form_data.password, db)
+            if not user:
+                login_admission.record_failure(form_data.username)
+        else:
+            user = await authenticate_user_async(form_data.username, form_data.password, db)
+    except LoginThrottled as e:
+        raise HTTPException(
+            status_code=429,
+            detail="Demasiados intentos de inicio de sesión, intente más tarde",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except PasswordHashBusy:
+        raise HTTPException(
+            status_code=503,
+            detail="Servicio de autenticación saturado, intente de nuevo",
+            headers={"Retry-After": "1"},
+        )
     if not user:
         raise HTTPException(
             status_code=401,
             detail="Datos Incorrectos en email o password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token = create_access_token(
-        data={"sub": str(user.id_usuario), "rol":user.id_rol}
-    )
+    access_token = _access_token_for(user)
+    refresh_token, claims = create_refresh_token(user.id_usuario)
+    try:
+        await db.run_sync(store_refresh_token, user.id_usuario, claims)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
     return ResponseLoggin(
         user=user,
-        access_token=access_token
+        access_token=access_token,
+        refresh_token=refresh_token
     )
+
+
+@router.post("/refresh", response_model=TokenPair)
+async def refresh_access_token(
+    body: RefreshRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Emite un access token nuevo a partir de un refresh token, sin volver a verificar la
+    contraseña. El refresh token se rota: el enviado deja de servir y se devuelve otro.
+    """
+    claims = decode_refresh_token(body.refresh_token)
+    if claims is None:
+        raise _invalid_refresh()
+    refresh_token, nuevo = create_refresh_token(int(claims["sub"]), familia=claims["fam"])
+    try:
+        user = await db.run_sync(rotate_refresh_token, claims, nuevo)
+    except RefreshTokenReused:
+        raise _invalid_refresh()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if user is None:
+        raise _invalid_refresh()
+
+    return TokenPair(access_token=_access_token_for(user), refresh_token=refresh_token)
+
+
+@router.post("/logout", status_code=204)
+async def logout(
+    body: RefreshRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Revoca el refresh token enviado y todos los emitidos desde el mismo login."""
+    claims = decode_refresh_token(body.refresh_token)
+    if claims is None:
+        raise _invalid_refresh()
+    try:
+        await db.run_sync(revoke_refresh_family, claims["fam"])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
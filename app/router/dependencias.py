@@ -1,32 +1,100 @@
+from typing import List
 from fastapi import Depends, HTTPException
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.crud.users import get_user_by_email_for_login
-from app.crud.users import get_user_by_id
-from core.security import verify_password, verify_token
-from core.database import get_db
+from app.crud.users import get_user_by_id_cached, is_user_deactivated
+from app.schemas.auth import TokenUser
+from core.config import settings
+from core.security import decode_access_token, verify_password, verify_password_async
+from core.database import get_async_db, get_db
 from fastapi.security import OAuth2PasswordBearer
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/access/token")
 
-def get_current_user(
-        token: str = Depends(oauth2_scheme),
-        db: Session = Depends(get_db)
-):
-    user = verify_token(token)
-    if user is None:
+
+def parse_ids(ids: str) -> List[int]:
+    """Convierte el parámetro `ids` de los endpoints by-ids ("1,2,3") en una lista de enteros."""
+    try:
+        valores = [int(valor) for valor in ids.split(",") if valor.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids debe ser una lista de enteros separados por comas")
+    return check_ids(valores)
+
+
+def check_ids(ids: List[int]) -> List[int]:
+    if not ids:
+        raise HTTPException(status_code=400, detail="Debe enviar al menos un id")
+    if len(ids) > settings.BY_IDS_MAX:
+        raise HTTPException(status_code=413, detail=f"Máximo {settings.BY_IDS_MAX} ids por petición")
+    return ids
+
+
+def _resolve_current_user(db: Session, token: str):
+    payload = decode_access_token(token)
+    if payload is None or payload.get("sub") is None:
         raise HTTPException(status_code=403, detail="Token Invalido")
-    user_db = get_user_by_id(db, user)
+    try:
+        user = int(payload["sub"])
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=403, detail="Token Invalido")
+
+    # Camino sin leer la fila del usuario: los claims están firmados, solo se revisa la revocación
+    # (local y la lista compartida entre workers, que se consulta como máximo cada pocos segundos)
+    if settings.AUTH_TRUST_TOKEN_CLAIMS and all(k in payload for k in ("rol", "estado", "email")):
+        if not payload["estado"] or is_user_deactivated(db, user):
+            raise HTTPException(status_code=403, detail="Usuario inactivo. No autorizado")
+        return TokenUser(
+            id_usuario=user,
+            id_rol=payload["rol"],
+            email=payload["email"],
+            estado=payload["estado"]
+        )
+
+    user_db = get_user_by_id_cached(db, user)
     if user_db is None:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
-    if not user_db.estado:
+    # La fila puede venir de la caché de este worker aunque otro ya haya desactivado al usuario
+    if not user_db.estado or is_user_deactivated(db, user):
         raise HTTPException(status_code=403, detail="Usuario inactivo. No autorizado")
     return user_db
 
 
+def get_current_user(
+        token: str = Depends(oauth2_scheme),
+        db: Session = Depends(get_db)
+):
+    return _resolve_current_user(db, token)
+
+
+async def get_current_user_async(
+        token: str = Depends(oauth2_scheme),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Equivalente de get_current_user para endpoints `async def`: ni la sesión ni la validación
+    ocupan un hilo del threadpool. La sesión solo toma una conexión si hay que consultar la BD
+    (usuario fuera de la caché o lista de inactivos vencida).
+    """
+    return await db.run_sync(_resolve_current_user, token)
+
+
 def authenticate_user(username: str, password: str, db: Session):
     user = get_user_by_email_for_login(db, username)
     if not user:
         return False
     if not verify_password(password, user.pass_hash):
         return False
-    return user
\ No newline at end of file
+    return user
+
+
+async def authenticate_user_async(username: str, password: str, db: AsyncSession):
+    # La consulta espera en el event loop y bcrypt se ejecuta en su pool dedicado
+    user = await db.run_sync(get_user_by_email_for_login, username)
+    # La lectura ya terminó: la conexión vuelve al pool en lugar de esperar a bcrypt
+    await db.rollback()
+    if not user:
+        return False
+    if not await verify_password_async(password, user.pass_hash):
+        return False
+    return user
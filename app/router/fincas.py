@@ -1,11 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from app.crud.permisos import verify_permissions
-from app.router.dependencias import get_current_user
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+from app.crud.permisos import verify_permissions, verify_permissions_async
+from app.router.dependencias import get_current_user, get_current_user_async
 from app.schemas.users import UserOut
-from core.database import get_db
-from app.schemas.fincas import FincasCreate, FincasOut, FincasOut, FincasUpdate
+from core.config import settings
+from core.database import get_async_read_db, get_db, get_read_db
+from app.schemas.common import BulkUpdateResult
+from app.schemas.fincas import FincaDashboardResponse, FincasBulkUpdate, FincasCreate, FincasOut, FincasUpdate
 from app.crud import fincas as crud_fincas
+from app.crud import fincas_async
 
 
 router = APIRouter()
@@ -37,7 +43,7 @@ def create_fincas(
 @router.get("/by-id/{id_finca}", response_model=FincasOut)
 def get_finca(
     id_finca: int, 
-    db: Session = Depends(get_db), 
+    db: Session = Depends(get_read_db), 
     user_token: UserOut = Depends(get_current_user)
     ):
 
@@ -79,4 +85,57 @@ def update_finca(
         # Deja pasar errores HTTP tal como están
         raise http_exc
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.patch("/bulk", response_model=BulkUpdateResult)
+def bulk_update_fincas(
+    items: List[FincasBulkUpdate] = Body(...),
+    db: Session = Depends(get_db),
+    user_token: UserOut = Depends(get_current_user)
+):
+    """
+    Actualiza varios fincas en una transacción. Las filas que cambian los mismos campos
+    se escriben con un solo executemany; las que no traen nada que cambiar se ignoran.
+    """
+    try:
+        if not verify_permissions(db, user_token.id_rol, modulo, 'actualizar'):
+            raise HTTPException(status_code=401, detail="Usuario no autorizado")
+
+        if not items:
+            raise HTTPException(status_code=400, detail="Debe enviar al menos un registro")
+        if len(items) > settings.BULK_UPDATE_MAX_ROWS:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Máximo {settings.BULK_UPDATE_MAX_ROWS} registros por petición"
+            )
+
+        updated = crud_fincas.update_fincas_bulk(db, [item.model_dump(exclude_unset=True) for item in items])
+        return {"received": len(items), "updated": updated}
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{id_finca}/dashboard", response_model=FincaDashboardResponse)
+async def get_finca_dashboard(
+    id_finca: int,
+    dias: int = Query(7, ge=1, le=365, description="Días recientes para mortalidad e ingresos (incluido hoy)"),
+    db: AsyncSession = Depends(get_async_read_db),
+    user_token: UserOut = Depends(get_current_user_async)
+):
+    """
+    Finca, galpones con ocupación y totales recientes de mortalidad e ingresos en una sola respuesta.
+    """
+    try:
+        id_rol = user_token.id_rol
+        if not await verify_permissions_async(db, id_rol, modulo, 'seleccionar'):
+            raise HTTPException(status_code=401, detail="Usuario no autorizado")
+
+        dashboard = await fincas_async.get_finca_dashboard(id_finca, dias)
+        if dashboard is None:
+            raise HTTPException(status_code=404, detail="Finca no encontrada")
+        return dashboard
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,51 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from core.config import settings
+from core.database import replicas
+from core.health import last_probe, probe_is_stale
+from core.metrics import pool_saturation
+
+router = APIRouter()
+
+
+@router.get("/live")
+def live():
+    """El proceso responde. No consulta la base de datos."""
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+async def ready():
+    """
+    Estado de la última verificación de la base de datos y saturación de los pools.
+    Responde 503 si la base de datos no respondió, si la verificación está desactualizada o si
+    un pool supera HEALTH_MAX_POOL_SATURATION (cuando está configurado).
+    """
+    probe = last_probe()
+    pools = pool_saturation()
+
+    motivos = []
+    if probe is None:
+        motivos.append("sin_verificacion")
+    elif not probe.ok:
+        motivos.append("base_de_datos")
+    elif probe_is_stale(probe):
+        motivos.append("verificacion_desactualizada")
+    if settings.HEALTH_MAX_POOL_SATURATION > 0 and any(
+        pool["saturation"] >= settings.HEALTH_MAX_POOL_SATURATION for pool in pools.values()
+    ):
+        motivos.append("pool_saturado")
+
+    body = {
+        "status": "not_ready" if motivos else "ready",
+        "reasons": motivos,
+        "database": {
+            "ok": probe.ok,
+            "checked_at": probe.checked_at.isoformat(),
+            "latency_ms": probe.latency_ms,
+        } if probe else None,
+        "pools": pools,
+        "replicas": {replica.nombre: replica.disponible() for replica in replicas},
+    }
+    return JSONResponse(body, status_code=503 if motivos else 200)
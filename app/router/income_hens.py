@@ -0,0 +1,263 @@
+from datetime import date
+from typing import List, Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+from app.crud.permisos import verify_permissions
+from app.crud.sheds import ShedCapacityError
+from app.router.dependencias import get_current_user
+from app.schemas.income_hens import (
+    IncomeHensBulkResult, IncomeHensCreate, IncomeHensCursorResponse, IncomeHensOut,
+    IncomeHensPaginatedResponse, IncomeHensUpdate
+)
+from core.config import settings
+from core.database import get_db, get_read_db
+from core.pagination import decode_cursor, encode_cursor
+from app.schemas.users import UserOut
+from app.crud import income_hens as crud_income_hens
+
+import time
+
+router = APIRouter()
+modulo = 7
+
+
+def _check_date_range(fecha_inicio: Optional[date], fecha_fin: Optional[date]):
+    if (fecha_inicio is None) != (fecha_fin is None):
+        raise HTTPException(status_code=400, detail="Debe enviar fecha_inicio y fecha_fin juntas")
+    if fecha_inicio is not None and fecha_inicio > fecha_fin:
+        raise HTTPException(
+            status_code=400,
+            detail="La fecha de inicio no puede ser mayor que la fecha de fin"
+        )
+
+
+@router.post("/crear", status_code=status.HTTP_201_CREATED)
+def create_income_hens(
+    ingreso: IncomeHensCreate,
+    db: Session = Depends(get_db),
+    user_token: UserOut = Depends(get_current_user)
+):
+    try:
+        id_rol = user_token.id_rol
+        if not verify_permissions(db, id_rol, modulo, 'insertar'):
+            raise HTTPException(status_code=401, detail="Usuario no autorizado")
+
+        galpones, tipos = crud_income_hens.get_missing_references(db, [ingreso.id_galpon], [ingreso.id_tipo_gallina])
+        if galpones or tipos:
+            raise HTTPException(status_code=400, detail="El galpón o el tipo de gallina no existe")
+
+        crud_income_hens.create_income_hens(db, ingreso)
+        return {"message": "Ingreso de gallinas creado correctamente"}
+    except ShedCapacityError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/bulk", status_code=status.HTTP_201_CREATED, response_model=IncomeHensBulkResult)
+def bulk_create_income_hens(
+    ingresos: List[IncomeHensCreate] = Body(...),
+    db: Session = Depends(get_db),
+    user_token: UserOut = Depends(get_current_user)
+):
+    """
+    Registra varios ingresos en una sola petición y una sola transacción: se insertan en
+    bloques multi-fila y la ocupación de cada galpón se actualiza una vez por galpón.
+    Si alguna fila referencia un galpón o tipo de gallina inexistente no se registra ninguna.
+    """
+    try:
+        id_rol = user_token.id_rol
+        if not verify_permissions(db, id_rol, modulo, 'insertar'):
+            raise HTTPException(status_code=401, detail="Usuario no autorizado")
+
+        if not ingresos:
+            raise HTTPException(status_code=400, detail="Debe enviar al menos un ingreso")
+        if len(ingresos) > settings.INCOME_BULK_MAX_ROWS:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Máximo {settings.INCOME_BULK_MAX_ROWS} ingresos por petición"
+            )
+
+        galpones, tipos = crud_income_hens.get_missing_references(
+            db,
+            (ingreso.id_galpon for ingreso in ingresos),
+            (ingreso.id_tipo_gallina for ingreso in ingresos)
+        )
+        if galpones or tipos:
+            raise HTTPException(
+                status_code=400,
+                detail={"galpones_inexistentes": galpones, "tipos_gallina_inexistentes": tipos}
+            )
+
+        inicio = time.perf_counter()
+        result = crud_income_hens.create_income_hens_bulk(db, [ingreso.model_dump() for ingreso in ingresos])
+        elapsed = time.perf_counter() - inicio
+        return {
+            **result,
+            "elapsed_seconds": round(elapsed, 4),
+            "rows_per_second": round(result["inserted"] / elapsed, 2) if elapsed > 0 else float(result["inserted"])
+        }
+    except ShedCapacityError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/by-id/{id_ingreso}", response_model=IncomeHensOut)
+def get_income_hens(
+    id_ingreso: int,
+    db: Session = Depends(get_read_db),
+    user_token: UserOut = Depends(get_current_user)
+):
+    try:
+        id_rol = user_token.id_rol
+        if not verify_permissions(db, id_rol, modulo, 'seleccionar'):
+            raise HTTPException(status_code=401, detail="Usuario no autorizado")
+
+        ingreso = crud_income_hens.get_income_hens_by_id(db, id_ingreso)
+        if not ingreso:
+            raise HTTPException(status_code=404, detail="Ingreso de gallinas no encontrado")
+        return ingreso
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.put("/by-id/{id_ingreso}")
+def update_income_hens(
+    id_ingreso: int,
+    ingreso: IncomeHensUpdate,
+    db: Session = Depends(get_db),
+    user_token: UserOut = Depends(get_current_user)
+):
+    try:
+        id_rol = user_token.id_rol
+        if not verify_permissions(db, id_rol, modulo, 'actualizar'):
+            raise HTTPException(status_code=401, detail="Usuario no autorizado")
+
+        galpones, tipos = crud_income_hens.get_missing_references(
+            db,
+            [ingreso.id_galpon] if ingreso.id_galpon is not None else [],
+            [ingreso.id_tipo_gallina] if ingreso.id_tipo_gallina is not None else []
+        )
+        if galpones or tipos:
+            raise HTTPException(status_code=400, detail="El galpón o el tipo de gallina no existe")
+
+        success = crud_income_hens.update_income_hens_by_id(db, id_ingreso, ingreso)
+        if not success:
+            raise HTTPException(status_code=400, detail="No se pudo actualizar el ingreso de gallinas")
+        return {"message": "Ingreso de gallinas actualizado correctamente"}
+    except ShedCapacityError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.delete("/by-id/{id_ingreso}")
+def delete_income_hens(
+    id_ingreso: int,
+    db: Session = Depends(get_db),
+    user_token: UserOut = Depends(get_current_user)
+):
+    try:
+        id_rol = user_token.id_rol
+        if not verify_permissions(db, id_rol, modulo, 'borrar'):
+            raise HTTPException(status_code=401, detail="Usuario no autorizado")
+
+        success = crud_income_hens.delete_income_hens_by_id(db, id_ingreso)
+        if not success:
+            raise HTTPException(status_code=404, detail="Ingreso de gallinas no encontrado")
+        return {"message": "Ingreso de gallinas eliminado correctamente"}
+    except ShedCapacityError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/all-pag", response_model=IncomeHensPaginatedResponse)
+def get_income_hens_pag(
+    page: int = Query(1, ge=1),
+    page_size: int = Query(10, ge=1, le=100),
+    fecha_inicio: Optional[date] = Query(None, description="Fecha de inicio (YYYY-MM-DD)"),
+    fecha_fin: Optional[date] = Query(None, description="Fecha de fin (YYYY-MM-DD)"),
+    include_total: bool = Query(True, description="Incluir el total de registros y de páginas"),
+    total_mode: str = Query("cached", pattern="^(exact|cached|estimated)$", description="exact, cached o estimated"),
+    db: Session = Depends(get_read_db),
+    user_token: UserOut = Depends(get_current_user)
+):
+    try:
+        id_rol = user_token.id_rol
+        if not verify_permissions(db, id_rol, modulo, 'seleccionar'):
+            raise HTTPException(status_code=401, detail="Consulta de ingresos no autorizada")
+
+        _check_date_range(fecha_inicio, fecha_fin)
+
+        data = crud_income_hens.get_income_hens_pag(
+            db,
+            skip=(page - 1) * page_size,
+            limit=page_size,
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            include_total=include_total,
+            total_mode=total_mode
+        )
+
+        total = data['total']
+        return {
+            "page": page,
+            "page_size": page_size,
+            "total_ingresos": total,
+            "total_pages": (total + page_size - 1) // page_size if total is not None else None,
+            "ingresos": data['ingresos']
+        }
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/all-cursor", response_model=IncomeHensCursorResponse)
+def get_income_hens_cursor(
+    cursor: Optional[str] = Query(None, description="Valor de next_cursor de la respuesta anterior"),
+    page_size: int = Query(10, ge=1, le=100),
+    fecha_inicio: Optional[date] = Query(None, description="Fecha de inicio (YYYY-MM-DD)"),
+    fecha_fin: Optional[date] = Query(None, description="Fecha de fin (YYYY-MM-DD)"),
+    db: Session = Depends(get_read_db),
+    user_token: UserOut = Depends(get_current_user)
+):
+    try:
+        id_rol = user_token.id_rol
+        if not verify_permissions(db, id_rol, modulo, 'seleccionar'):
+            raise HTTPException(status_code=401, detail="Consulta de ingresos no autorizada")
+
+        _check_date_range(fecha_inicio, fecha_fin)
+
+        after_fecha = after_id = None
+        if cursor:
+            try:
+                key = decode_cursor(cursor)
+                after_fecha = date.fromisoformat(key["fecha"])
+                after_id = int(key["id"])
+            except (ValueError, KeyError, TypeError):
+                raise HTTPException(status_code=400, detail="Cursor inválido")
+
+        data = crud_income_hens.get_income_hens_keyset(
+            db,
+            limit=page_size,
+            after_fecha=after_fecha,
+            after_id=after_id,
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin
+        )
+
+        ingresos = data['ingresos']
+        next_cursor = None
+        if data['has_more']:
+            last = ingresos[-1]
+            next_cursor = encode_cursor({"fecha": last["fecha"], "id": last["id_ingreso"]})
+
+        return {
+            "page_size": page_size,
+            "next_cursor": next_cursor,
+            "ingresos": ingresos
+        }
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from core.metrics import render_metrics
+
+router = APIRouter()
+
+# Formato de exposición de texto de Prometheus
+_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """
+    Métricas del proceso: pool de conexiones, latencia por ruta, bcrypt y verificación de permisos.
+    Sin autenticación, para que Prometheus pueda leerlas; se desactiva con METRICS_ENABLED=false.
+    """
+    return PlainTextResponse(render_metrics(), media_type=_CONTENT_TYPE)
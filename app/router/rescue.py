@@ -1,14 +1,34 @@
 from datetime import date
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import AsyncIterator, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
-from app.crud.permisos import verify_permissions
-from app.router.dependencias import get_current_user
-from app.schemas.rescue import RescueCreate, RescueOut, RescuePaginatedResponse, RescueUpdate
-from core.database import get_db
+from app.crud.permisos import verify_permissions, verify_permissions_async
+from app.crud.cache_versions import get_tables_etag
+from app.crud.sheds import ShedCapacityError
+from app.router.dependencias import check_ids, get_current_user, get_current_user_async, parse_ids
+from app.schemas.rescue import (
+    RescueBulkResult, RescueCreate, RescueCursorResponse, RescueOut, RescuePaginatedResponse,
+    RescueByIdsResponse, RescueStatsResponse, RescueUpdate
+)
+from app.schemas.common import IdsRequest
+from core.config import settings
+from core.database import get_async_db, get_async_read_db, get_db, get_read_db, open_read_session
+from core.etag import etag_matches, not_modified
+from core.serialization import fast_list_response
+from core.pagination import decode_cursor, encode_cursor
 from app.schemas.users import UserOut
 from app.crud import rescue as crud_rescue
+from app.crud import rescue_async
+from app.crud import rescue_stats as crud_rescue_stats
+
+import csv
+import io
+import json
+import time
 
 router = APIRouter()
 modulo = 4
@@ -30,34 +50,67 @@ def create_rescue(
         crud_rescue.create_rescue(db, rescue)
         return {"message": "Salvamento creado correctamente"}
 
+    except ShedCapacityError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 
 @router.get("/by-id/{id_salvamento}", response_model=RescueOut)
-def get_rescue(
+async def get_rescue(
     id_salvamento: int, 
-    db: Session = Depends(get_db), 
-    user_token: UserOut = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_read_db), 
+    user_token: UserOut = Depends(get_current_user_async)
     ):
 
     try:
         id_rol = user_token.id_rol 
 
-        if not verify_permissions(db, id_rol, modulo, 'seleccionar'):
+        if not await verify_permissions_async(db, id_rol, modulo, 'seleccionar'):
             raise HTTPException(status_code=401, detail="Usuario no autorizado")
         
 
-        rescue = crud_rescue.get_rescue_by_id(db, id_salvamento)
+        rescue = await rescue_async.get_rescue_by_id(db, id_salvamento)
         if not rescue:
             raise HTTPException(status_code=404, detail="Salvamento no encontrada")
         return rescue
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) 
 
+@router.get("/by-ids", response_model=RescueByIdsResponse)
+def get_rescues_by_ids(
+    ids: str = Query(..., description="Ids separados por comas (1,2,3)"),
+    db: Session = Depends(get_read_db),
+    user_token: UserOut = Depends(get_current_user)
+):
+    """
+    Devuelve los salvamentos en el orden de `ids` con una consulta IN (...) por bloque: `items` trae
+    null en las posiciones que no existen y `missing` lista esos ids. Para listas largas use POST.
+    """
+    return _rescues_by_ids(parse_ids(ids), db, user_token)
+
+
+@router.post("/by-ids", response_model=RescueByIdsResponse)
+def post_rescues_by_ids(
+    body: IdsRequest,
+    db: Session = Depends(get_read_db),
+    user_token: UserOut = Depends(get_current_user)
+):
+    return _rescues_by_ids(check_ids(body.ids), db, user_token)
+
+
+def _rescues_by_ids(ids: List[int], db: Session, user_token: UserOut):
+    try:
+        if not verify_permissions(db, user_token.id_rol, modulo, 'seleccionar'):
+            raise HTTPException(status_code=401, detail="Usuario no autorizado")
+        return crud_rescue.get_rescues_by_ids(db, ids)
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/all", response_model=List[RescueOut])
 def get_all_rescues(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     user_token: UserOut = Depends(get_current_user)
 ):
     try:
@@ -67,6 +120,8 @@ def get_all_rescues(
             raise HTTPException(status_code=401, detail="Consulta de salvamentos no autorizada")
 
         rescues = crud_rescue.get_all_rescues(db)
+        if settings.FAST_SERIALIZATION:
+            return fast_list_response(rescues, RescueOut)
         return rescues
         
     except SQLAlchemyError as e:
@@ -85,6 +140,8 @@ def update_user(
         if not success:
             raise HTTPException(status_code=400, detail="No se pudo actualizar el salvamento")
         return {"message": "salvamento actualizado correctamente"}
+    except ShedCapacityError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -113,34 +170,57 @@ def delete_rescue(
         
         return {"message": "Salvamento eliminado correctamente"}
         
+    except ShedCapacityError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/all-pag", response_model=RescuePaginatedResponse)
-def get_rescues_pag(
+async def get_rescues_pag(
+    request: Request,
+    response: Response,
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db),
+    include_total: bool = Query(True, description="Incluir el total de registros y de páginas"),
+    total_mode: str = Query("cached", pattern="^(exact|cached|estimated)$", description="exact, cached o estimated"),
+    db: AsyncSession = Depends(get_async_read_db),
     # user_token: UserOut = Depends(get_current_user)
 ):
     try:
         # Verificar permisos
         # id_rol = user_token.id_rol
-        # if not verify_permissions(db, id_rol, modulo, 'seleccionar'):
+        # if not await verify_permissions_async(db, id_rol, modulo, 'seleccionar'):
         #     raise HTTPException(status_code=401, detail="Consulta de salvamentos no autorizada")
 
+        # Los nombres de galpón y raza vienen de otras tablas: sus versiones también forman parte del ETag
+        etag = await db.run_sync(
+            get_tables_etag,
+            ["salvamento", "galpones", "tipo_gallinas"],
+            page, page_size, include_total, total_mode
+        )
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
         skip = (page - 1) * page_size
-        data = crud_rescue.get_all_rescues_pag(db, skip=skip, limit=page_size)
+        data = await rescue_async.get_all_rescues_pag(
+            db,
+            skip=skip,
+            limit=page_size,
+            include_total=include_total,
+            total_mode=total_mode
+        )
 
         total = data['total']
         rescues = data['rescues']
+        if etag:
+            response.headers["ETag"] = etag
 
         return {
             "page": page,
             "page_size": page_size,
             "total_rescues": total,
-            "total_pages": (total + page_size - 1) // page_size,
+            "total_pages": (total + page_size - 1) // page_size if total is not None else None,
             "rescues": rescues
         }
     except SQLAlchemyError as e:
@@ -148,17 +228,19 @@ def get_rescues_pag(
 
 
 @router.get("/all-pag-by-date", response_model=RescuePaginatedResponse)
-def get_rescues_pag_by_date(
+async def get_rescues_pag_by_date(
     fecha_inicio: date = Query(..., description="Fecha de inicio (YYYY-MM-DD)"),
     fecha_fin: date = Query(..., description="Fecha de fin (YYYY-MM-DD)"),
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db),
+    include_total: bool = Query(True, description="Incluir el total de registros y de páginas"),
+    total_mode: str = Query("cached", pattern="^(exact|cached|estimated)$", description="exact, cached o estimated"),
+    db: AsyncSession = Depends(get_async_read_db),
     # user_token: UserOut = Depends(get_current_user)
 ):
     try:
         # id_rol = user_token.id_rol
-        # if not verify_permissions(db, id_rol, modulo, 'seleccionar'):
+        # if not await verify_permissions_async(db, id_rol, modulo, 'seleccionar'):
         #     raise HTTPException(status_code=401, detail="Consulta de salvamentos no autorizada")
 
         
@@ -169,12 +251,14 @@ def get_rescues_pag_by_date(
             )
 
         skip = (page - 1) * page_size
-        data = crud_rescue.get_rescues_by_date_range_pag(
+        data = await rescue_async.get_rescues_by_date_range_pag(
             db, 
             fecha_inicio=fecha_inicio, 
             fecha_fin=fecha_fin, 
             skip=skip, 
-            limit=page_size
+            limit=page_size,
+            include_total=include_total,
+            total_mode=total_mode
         )
 
         total = data['total']
@@ -184,8 +268,314 @@ def get_rescues_pag_by_date(
             "page": page,
             "page_size": page_size,
             "total_rescues": total,
-            "total_pages": (total + page_size - 1) // page_size,
+            "total_pages": (total + page_size - 1) // page_size if total is not None else None,
+            "rescues": rescues
+        }
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/all-cursor", response_model=RescueCursorResponse)
+async def get_rescues_cursor(
+    cursor: Optional[str] = Query(None, description="Valor de next_cursor de la respuesta anterior"),
+    page_size: int = Query(10, ge=1, le=100),
+    fecha_inicio: Optional[date] = Query(None, description="Fecha de inicio (YYYY-MM-DD)"),
+    fecha_fin: Optional[date] = Query(None, description="Fecha de fin (YYYY-MM-DD)"),
+    db: AsyncSession = Depends(get_async_read_db),
+    user_token: UserOut = Depends(get_current_user_async)
+):
+    try:
+        id_rol = user_token.id_rol
+        if not await verify_permissions_async(db, id_rol, modulo, 'seleccionar'):
+            raise HTTPException(status_code=401, detail="Consulta de salvamentos no autorizada")
+
+        if (fecha_inicio is None) != (fecha_fin is None):
+            raise HTTPException(status_code=400, detail="Debe enviar fecha_inicio y fecha_fin juntas")
+        if fecha_inicio is not None and fecha_inicio > fecha_fin:
+            raise HTTPException(
+                status_code=400, 
+                detail="La fecha de inicio no puede ser mayor que la fecha de fin"
+            )
+
+        after_fecha = after_id = None
+        if cursor:
+            try:
+                key = decode_cursor(cursor)
+                after_fecha = date.fromisoformat(key["fecha"])
+                after_id = int(key["id"])
+            except (ValueError, KeyError, TypeError):
+                raise HTTPException(status_code=400, detail="Cursor inválido")
+
+        data = await rescue_async.get_rescues_keyset(
+            db,
+            limit=page_size,
+            after_fecha=after_fecha,
+            after_id=after_id,
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin
+        )
+
+        rescues = data['rescues']
+        next_cursor = None
+        if data['has_more']:
+            last = rescues[-1]
+            next_cursor = encode_cursor({"fecha": last["fecha"], "id": last["id_salvamento"]})
+
+        return {
+            "page_size": page_size,
+            "next_cursor": next_cursor,
             "rescues": rescues
         }
     except SQLAlchemyError as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def _iter_lines(request: Request, max_bytes: int) -> AsyncIterator[Optional[bytes]]:
+    """
+    Entrega el cuerpo de la petición línea por línea a medida que llega, sin cargarlo completo.
+    Una línea de más de `max_bytes` se descarta sin acumularla y se entrega como None.
+    """
+    pendiente = bytearray()  # inicio de la línea en curso; solo se agrega, nunca se recopia
+    descartando = False      # la línea en curso ya superó max_bytes (y se entregó None)
+    async for chunk in request.stream():
+        inicio = 0
+        while (fin := chunk.find(b"\n", inicio)) >= 0:
+            if descartando:
+                descartando = False
+            elif len(pendiente) + fin - inicio > max_bytes:
+                yield None
+            else:
+                pendiente += chunk[inicio:fin]
+                yield bytes(pendiente)
+            pendiente.clear()
+            inicio = fin + 1
+        if descartando:
+            continue
+        if len(pendiente) + len(chunk) - inicio > max_bytes:
+            descartando = True
+            pendiente.clear()
+            yield None
+        else:
+            pendiente += chunk[inicio:]
+    if pendiente:
+        yield bytes(pendiente)
+
+
+def _error_message(e: Exception) -> str:
+    if isinstance(e, ValidationError):
+        return "; ".join(f"{'.'.join(map(str, err['loc'])) or 'fila'}: {err['msg']}" for err in e.errors())
+    return str(e)
+
+
+@router.post("/bulk", response_model=RescueBulkResult)
+async def bulk_create_rescues(
+    request: Request,
+    formato: Optional[str] = Query(
+        None, pattern="^(csv|ndjson)$", description="csv o ndjson; por defecto se deduce del Content-Type"
+    ),
+    db: AsyncSession = Depends(get_async_db),
+    user_token: UserOut = Depends(get_current_user_async)
+):
+    """
+    Importa salvamentos desde un cuerpo CSV (con encabezado) o NDJSON enviado en streaming.
+
+    Cada fila se valida con RescueCreate y las válidas se insertan en lotes de
+    BULK_BATCH_SIZE filas, cada lote en su propia transacción. Las filas rechazadas
+    se informan con su número de línea.
+    """
+    try:
+        id_rol = user_token.id_rol
+        if not await verify_permissions_async(db, id_rol, modulo, 'insertar'):
+            raise HTTPException(status_code=401, detail="Usuario no autorizado")
+
+        if formato is None:
+            formato = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+
+        galpones, tipos = await rescue_async.get_rescue_reference_ids(db)
+        # Lecturas terminadas: la conexión vuelve al pool mientras llegan las filas del primer lote
+        await db.rollback()
+
+        inicio = time.perf_counter()
+        received = inserted = failed = 0
+        errors = []
+        batch, batch_lines = [], []
+        header = None
+
+        def add_error(line: int, message: str):
+            nonlocal failed
+            failed += 1
+            if len(errors) < settings.BULK_MAX_ERRORS:
+                errors.append({"line": line, "error": message})
+
+        async def flush():
+            nonlocal inserted
+            try:
+                inserted += await rescue_async.create_rescues_bulk(db, batch)
+            except Exception as e:
+                for line in batch_lines:
+                    add_error(line, str(e))
+            batch.clear()
+            batch_lines.clear()
+
+        line_no = 0
+        async for raw in _iter_lines(request, settings.BULK_MAX_LINE_BYTES):
+            line_no += 1
+            if raw is None:
+                if formato == "csv" and header is None:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"El encabezado supera {settings.BULK_MAX_LINE_BYTES} bytes"
+                    )
+                received += 1
+                add_error(line_no, f"La línea supera {settings.BULK_MAX_LINE_BYTES} bytes")
+                continue
+            line = raw.decode("utf-8-sig" if line_no == 1 else "utf-8", errors="replace").strip()
+            if not line:
+                continue
+
+            if formato == "csv" and header is None:
+                header = [col.strip() for col in next(csv.reader([line]))]
+                continue
+
+            received += 1
+            try:
+                if formato == "csv":
+                    data = dict(zip(header, next(csv.reader([line]))))
+                else:
+                    data = json.loads(line)
+                rescue = RescueCreate.model_validate(data)
+            except ValueError as e:  # JSONDecodeError y ValidationError heredan de ValueError
+                add_error(line_no, _error_message(e))
+                continue
+
+            if rescue.id_galpon not in galpones:
+                add_error(line_no, f"Galpón {rescue.id_galpon} no existe")
+                continue
+            if rescue.id_tipo_gallina not in tipos:
+                add_error(line_no, f"Tipo de gallina {rescue.id_tipo_gallina} no existe")
+                continue
+
+            batch.append(rescue.model_dump())
+            batch_lines.append(line_no)
+            if len(batch) >= settings.BULK_BATCH_SIZE:
+                await flush()
+
+        if batch:
+            await flush()
+
+        elapsed = time.perf_counter() - inicio
+        return {
+            "received": received,
+            "inserted": inserted,
+            "failed": failed,
+            "errors": errors,
+            "elapsed_seconds": round(elapsed, 4),
+            "rows_per_second": round(inserted / elapsed, 2) if elapsed > 0 else float(inserted)
+        }
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Columnas de la exportación, en el mismo orden que RescueOut
+_EXPORT_COLUMNS = ["id_salvamento", "id_galpon", "nombre", "fecha", "id_tipo_gallina", "raza", "cantidad_gallinas"]
+
+
+def _export_rescues(request: Request, formato: str, fecha_inicio: Optional[date], fecha_fin: Optional[date]):
+    # La sesión de la dependencia se cierra antes de enviar el cuerpo, por eso el
+    # generador abre y cierra la suya (en una réplica si hay) mientras dura la descarga.
+    db = open_read_session(request)
+    try:
+        if formato == "csv":
+            yield ",".join(_EXPORT_COLUMNS) + "\n"
+        for rows in crud_rescue.iter_rescues(db, fecha_inicio, fecha_fin, settings.EXPORT_BATCH_SIZE):
+            buffer = io.StringIO()
+            if formato == "csv":
+                writer = csv.writer(buffer, lineterminator="\n")
+                writer.writerows([row[col] for col in _EXPORT_COLUMNS] for row in rows)
+            else:
+                for row in rows:
+                    buffer.write(json.dumps({col: row[col] for col in _EXPORT_COLUMNS}, default=str))
+                    buffer.write("\n")
+            yield buffer.getvalue()
+    finally:
+        db.close()
+
+
+@router.get("/export")
+def export_rescues(
+    request: Request,
+    formato: str = Query("csv", pattern="^(csv|ndjson)$", description="csv o ndjson"),
+    fecha_inicio: Optional[date] = Query(None, description="Fecha de inicio (YYYY-MM-DD)"),
+    fecha_fin: Optional[date] = Query(None, description="Fecha de fin (YYYY-MM-DD)"),
+    db: Session = Depends(get_read_db),
+    user_token: UserOut = Depends(get_current_user)
+):
+    """
+    Exporta los salvamentos en CSV o NDJSON enviando las filas a medida que se leen,
+    con memoria acotada a EXPORT_BATCH_SIZE filas sin importar el tamaño de la exportación.
+    """
+    try:
+        id_rol = user_token.id_rol
+        if not verify_permissions(db, id_rol, modulo, 'seleccionar'):
+            raise HTTPException(status_code=401, detail="Consulta de salvamentos no autorizada")
+
+        if (fecha_inicio is None) != (fecha_fin is None):
+            raise HTTPException(status_code=400, detail="Debe enviar fecha_inicio y fecha_fin juntas")
+        if fecha_inicio is not None and fecha_inicio > fecha_fin:
+            raise HTTPException(
+                status_code=400, 
+                detail="La fecha de inicio no puede ser mayor que la fecha de fin"
+            )
+
+        media_type = "text/csv" if formato == "csv" else "application/x-ndjson"
+        return StreamingResponse(
+            _export_rescues(request, formato, fecha_inicio, fecha_fin),
+            media_type=media_type,
+            headers={"Content-Disposition": f"attachment; filename=salvamentos.{formato}"}
+        )
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/stats", response_model=RescueStatsResponse)
+def get_rescue_stats(
+    fecha_inicio: date = Query(..., description="Fecha de inicio (YYYY-MM-DD)"),
+    fecha_fin: date = Query(..., description="Fecha de fin (YYYY-MM-DD)"),
+    periodo: str = Query("dia", pattern="^(dia|semana|mes)$", description="dia, semana o mes"),
+    id_galpon: Optional[int] = Query(None),
+    id_tipo_gallina: Optional[int] = Query(None),
+    agrupar_por: Optional[str] = Query(None, pattern="^(galpon|tipo_gallina)$", description="galpon o tipo_gallina"),
+    db: Session = Depends(get_read_db),
+    user_token: UserOut = Depends(get_current_user)
+):
+    """
+    Totales de mortalidad por día, semana o mes, leídos del acumulado diario `salvamento_diario`.
+    """
+    try:
+        id_rol = user_token.id_rol
+        if not verify_permissions(db, id_rol, modulo, 'seleccionar'):
+            raise HTTPException(status_code=401, detail="Consulta de salvamentos no autorizada")
+
+        if fecha_inicio > fecha_fin:
+            raise HTTPException(
+                status_code=400, 
+                detail="La fecha de inicio no puede ser mayor que la fecha de fin"
+            )
+
+        items = crud_rescue_stats.get_rescue_stats(
+            db,
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            periodo=periodo,
+            id_galpon=id_galpon,
+            id_tipo_gallina=id_tipo_gallina,
+            agrupar_por=agrupar_por
+        )
+        return {
+            "periodo": periodo,
+            "fecha_inicio": fecha_inicio,
+            "fecha_fin": fecha_fin,
+            "items": items
+        }
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=str(e))
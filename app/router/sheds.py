@@ -1,13 +1,19 @@
-from app.schemas.sheds import ShedOut
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
-from core.database import get_db
-from app.schemas.sheds import ShedCreate, ShedUpdate
+from core.database import get_async_read_db, get_db, get_read_db
+from core.config import settings
+from core.etag import etag_matches, not_modified
+from core.serialization import fast_list_response
+from app.schemas.common import BulkUpdateResult, IdsRequest
+from app.schemas.sheds import ShedBulkUpdate, ShedByIdsResponse, ShedCreate, ShedOut, ShedUpdate
 from app.schemas.users import UserOut
 from app.crud import sheds as crud_sheds
-from app.router.dependencias import get_current_user
-from app.crud.permisos import verify_permissions
+from app.crud import sheds_async
+from app.router.dependencias import check_ids, get_current_user, get_current_user_async, parse_ids
+from app.crud.permisos import verify_permissions, verify_permissions_async
+from app.crud.cache_versions import get_tables_etag
 from typing import List
 
 router = APIRouter()
@@ -29,33 +35,77 @@ def create_shed(
         raise HTTPException(status_code=500, detail=str(e))
     
 @router.get("/by-id/{shed_id}", response_model = ShedOut)
-def get_shed_by_id(
+async def get_shed_by_id(
     shed_id: int, 
-    db: Session = Depends(get_db),
-    user_token: UserOut = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_read_db),
+    user_token: UserOut = Depends(get_current_user_async)
 ):
     try:
         id_rol = user_token.id_rol
-        if not verify_permissions(db, id_rol, modulo, 'seleccionar'):
+        if not await verify_permissions_async(db, id_rol, modulo, 'seleccionar'):
             raise HTTPException(status_code=401, detail="Usuario no autorizado")
         
-        shed = crud_sheds.get_shed_by_id(db, shed_id)
+        shed = await sheds_async.get_shed_by_id(db, shed_id)
         if not shed:
             raise HTTPException(status_code=404, detail="Galpón no encontrada")
         return shed
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=str(e))
     
-@router.get("/all", response_model=List[ShedOut])
-def get_all_sheds(
-    db: Session = Depends(get_db),
+@router.get("/by-ids", response_model=ShedByIdsResponse)
+def get_sheds_by_ids(
+    ids: str = Query(..., description="Ids separados por comas (1,2,3)"),
+    db: Session = Depends(get_read_db),
+    user_token: UserOut = Depends(get_current_user)
+):
+    """
+    Devuelve los galpones en el orden de `ids` con una consulta IN (...) por bloque: `items` trae
+    null en las posiciones que no existen y `missing` lista esos ids. Para listas largas use POST.
+    """
+    return _sheds_by_ids(parse_ids(ids), db, user_token)
+
+
+@router.post("/by-ids", response_model=ShedByIdsResponse)
+def post_sheds_by_ids(
+    body: IdsRequest,
+    db: Session = Depends(get_read_db),
     user_token: UserOut = Depends(get_current_user)
+):
+    return _sheds_by_ids(check_ids(body.ids), db, user_token)
+
+
+def _sheds_by_ids(ids: List[int], db: Session, user_token: UserOut):
+    try:
+        if not verify_permissions(db, user_token.id_rol, modulo, 'seleccionar'):
+            raise HTTPException(status_code=401, detail="Usuario no autorizado")
+        return crud_sheds.get_sheds_by_ids(db, ids)
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/all", response_model=List[ShedOut])
+async def get_all_sheds(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db),
+    user_token: UserOut = Depends(get_current_user_async)
 ):
     try:
         id_rol = user_token.id_rol
-        if not verify_permissions(db, id_rol, modulo, "seleccionar"):
+        if not await verify_permissions_async(db, id_rol, modulo, "seleccionar"):
             raise HTTPException(status_code=401, detail="Usuario no autorizado")
-        sheds = crud_sheds.get_all_sheds(db)
+
+        # Si el cliente ya tiene la versión actual no se consulta ni se serializa el listado
+        etag = await db.run_sync(get_tables_etag, ["galpones"])
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+        sheds = await sheds_async.get_all_sheds(db)
+        headers = {"ETag": etag} if etag else None
+        if settings.FAST_SERIALIZATION:
+            return fast_list_response(sheds, ShedOut, headers=headers)
+        if etag:
+            response.headers["ETag"] = etag
         return sheds
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -76,9 +126,41 @@ def update_shed_by_id(
         if not success:
             raise HTTPException(status_code=400, detail="No se pudo actualizar el galpón")
         return {"message": "Galpón actualizado correctamente"}
+    except crud_sheds.ShedBelowOccupancyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=str(e))
     
+@router.patch("/bulk", response_model=BulkUpdateResult)
+def bulk_update_sheds(
+    items: List[ShedBulkUpdate] = Body(...),
+    db: Session = Depends(get_db),
+    user_token: UserOut = Depends(get_current_user)
+):
+    """
+    Actualiza varios galpones en una transacción. Las filas que cambian los mismos campos
+    se escriben con un solo executemany; las que no traen nada que cambiar se ignoran.
+    """
+    try:
+        if not verify_permissions(db, user_token.id_rol, modulo, 'actualizar'):
+            raise HTTPException(status_code=401, detail="Usuario no autorizado")
+
+        if not items:
+            raise HTTPException(status_code=400, detail="Debe enviar al menos un registro")
+        if len(items) > settings.BULK_UPDATE_MAX_ROWS:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Máximo {settings.BULK_UPDATE_MAX_ROWS} registros por petición"
+            )
+
+        updated = crud_sheds.update_sheds_bulk(db, [item.model_dump(exclude_unset=True) for item in items])
+        return {"received": len(items), "updated": updated}
+    except crud_sheds.ShedBelowOccupancyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.put("/cambiar-estado/{id_galpon}", status_code=status.HTTP_200_OK)
 def change_shed_status(
     id_galpon: int,
@@ -1,11 +1,15 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 from app.crud.permisos import verify_permissions
-from app.router.dependencias import get_current_user
-from core.database import get_db
-from app.schemas.type_chickens import TypeChickenCreate, TypeChickenUpdate, TypeChickenOut
+from app.crud.cache_versions import get_tables_etag
+from app.router.dependencias import check_ids, get_current_user, parse_ids
+from core.config import settings
+from core.database import get_db, get_read_db
+from core.etag import etag_matches, not_modified
+from app.schemas.common import BulkUpdateResult, IdsRequest
+from app.schemas.type_chickens import TypeChickenBulkUpdate, TypeChickenByIdsResponse, TypeChickenCreate, TypeChickenUpdate, TypeChickenOut
 from app.crud import type_chickens as crud_type_chicken
 from app.schemas.users import UserOut
 
@@ -36,7 +40,7 @@ def create_type_chicken(
 @router.get("/by-id", response_model=TypeChickenOut)
 def get__type_chicken(
     id: int, 
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     user_token: UserOut = Depends(get_current_user)
 ):
     try:
@@ -53,9 +57,42 @@ def get__type_chicken(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/by-ids", response_model=TypeChickenByIdsResponse)
+def get_type_chickens_by_ids(
+    ids: str = Query(..., description="Ids separados por comas (1,2,3)"),
+    db: Session = Depends(get_read_db),
+    user_token: UserOut = Depends(get_current_user)
+):
+    """
+    Devuelve los tipos de gallina en el orden de `ids` con una consulta IN (...) por bloque: `items` trae
+    null en las posiciones que no existen y `missing` lista esos ids. Para listas largas use POST.
+    """
+    return _type_chickens_by_ids(parse_ids(ids), db, user_token)
+
+
+@router.post("/by-ids", response_model=TypeChickenByIdsResponse)
+def post_type_chickens_by_ids(
+    body: IdsRequest,
+    db: Session = Depends(get_read_db),
+    user_token: UserOut = Depends(get_current_user)
+):
+    return _type_chickens_by_ids(check_ids(body.ids), db, user_token)
+
+
+def _type_chickens_by_ids(ids: List[int], db: Session, user_token: UserOut):
+    try:
+        if not verify_permissions(db, user_token.id_rol, modulo, 'seleccionar'):
+            raise HTTPException(status_code=401, detail="Usuario no autorizado")
+        return crud_type_chicken.get_type_chickens_by_ids(db, ids)
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/all-type-chickens", response_model=List[TypeChickenOut])
 def get_type_chickens(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
     user_token: UserOut = Depends(get_current_user)
 ):
     try:
@@ -63,10 +100,17 @@ def get_type_chickens(
 
         if not verify_permissions(db, id_rol, modulo, 'seleccionar'):
             raise HTTPException(status_code=401, detail="Usuario no autorizado")
+
+        # Si el cliente ya tiene la versión actual no se consulta ni se serializa el listado
+        etag = get_tables_etag(db, ["tipo_gallinas"])
+        if etag_matches(request, etag):
+            return not_modified(etag)
         
         type_chickens = crud_type_chicken.get_all_type_chickens(db)
         if not type_chickens:
             raise HTTPException(status_code=404, detail="Registro no encontrado")
+        if etag:
+            response.headers["ETag"] = etag
         return type_chickens
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -90,4 +134,32 @@ def update_chicken(
             raise HTTPException(status_code=400, detail="No se pudo actualizar el registro")
         return {"message": "Registro actualizado correctamente"}
     except SQLAlchemyError as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.patch("/bulk", response_model=BulkUpdateResult)
+def bulk_update_type_chickens(
+    items: List[TypeChickenBulkUpdate] = Body(...),
+    db: Session = Depends(get_db),
+    user_token: UserOut = Depends(get_current_user)
+):
+    """
+    Actualiza varios tipos de gallina en una transacción. Las filas que cambian los mismos campos
+    se escriben con un solo executemany; las que no traen nada que cambiar se ignoran.
+    """
+    try:
+        if not verify_permissions(db, user_token.id_rol, modulo, 'actualizar'):
+            raise HTTPException(status_code=401, detail="Usuario no autorizado")
+
+        if not items:
+            raise HTTPException(status_code=400, detail="Debe enviar al menos un registro")
+        if len(items) > settings.BULK_UPDATE_MAX_ROWS:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Máximo {settings.BULK_UPDATE_MAX_ROWS} registros por petición"
+            )
+
+        updated = crud_type_chicken.update_type_chickens_bulk(db, [item.model_dump(exclude_unset=True) for item in items])
+        return {"received": len(items), "updated": updated}
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=str(e))
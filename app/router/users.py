@@ -1,11 +1,17 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import List, Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError 
 from app.crud.permisos import verify_permissions
-from app.router.dependencias import get_current_user
-from core.database import get_db
-from app.schemas.users import UserCreate, UserOut, UserPaginatedResponse, UserUpdate
+from app.router.dependencias import check_ids, get_current_user, parse_ids
+from core.config import settings
+from core.database import get_db, get_read_db
+from core.serialization import fast_list_response
+from core.pagination import decode_cursor, encode_cursor
+from app.schemas.common import BulkUpdateResult, IdsRequest
+from app.schemas.users import (
+    UserBulkUpdate, UserByIdsResponse, UserCreate, UserCursorResponse, UserOut, UserPaginatedResponse, UserUpdate
+)
 from app.crud import users as crud_users
 
 router = APIRouter()
@@ -40,7 +46,7 @@ def create_user(
 
 @router.get("/all-except-admins", response_model=List[UserOut])
 def get_users(
-            db: Session = Depends(get_db),
+            db: Session = Depends(get_read_db),
             user_token: UserOut = Depends(get_current_user)
 ):
     try:
@@ -50,13 +56,15 @@ def get_users(
             raise HTTPException(status_code=401, detail="Usuario no autorizado")
 
         users = crud_users.get_all_user_except_admins(db)
+        if settings.FAST_SERIALIZATION:
+            return fast_list_response(users, UserOut)
         return users
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/by-email", response_model=UserOut)
-def get_user(email: str, db: Session = Depends(get_db),
+def get_user(email: str, db: Session = Depends(get_read_db),
             user_token: UserOut = Depends(get_current_user)
             ):
     try:
@@ -75,6 +83,37 @@ def get_user(email: str, db: Session = Depends(get_db),
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/by-ids", response_model=UserByIdsResponse)
+def get_users_by_ids(
+    ids: str = Query(..., description="Ids separados por comas (1,2,3)"),
+    db: Session = Depends(get_read_db),
+    user_token: UserOut = Depends(get_current_user)
+):
+    """
+    Devuelve los usuarios en el orden de `ids` con una consulta IN (...) por bloque: `items` trae
+    null en las posiciones que no existen y `missing` lista esos ids. Para listas largas use POST.
+    """
+    return _users_by_ids(parse_ids(ids), db, user_token)
+
+
+@router.post("/by-ids", response_model=UserByIdsResponse)
+def post_users_by_ids(
+    body: IdsRequest,
+    db: Session = Depends(get_read_db),
+    user_token: UserOut = Depends(get_current_user)
+):
+    return _users_by_ids(check_ids(body.ids), db, user_token)
+
+
+def _users_by_ids(ids: List[int], db: Session, user_token: UserOut):
+    try:
+        if not verify_permissions(db, user_token.id_rol, modulo, 'seleccionar'):
+            raise HTTPException(status_code=401, detail="Usuario no autorizado")
+        return crud_users.get_users_by_ids(db, ids)
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.put("/by_id/{user_id}")
 def update_user(
     user_id: int, user: UserUpdate, 
@@ -93,6 +132,34 @@ def update_user(
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=str(e))
     
+@router.patch("/bulk", response_model=BulkUpdateResult)
+def bulk_update_users(
+    items: List[UserBulkUpdate] = Body(...),
+    db: Session = Depends(get_db),
+    user_token: UserOut = Depends(get_current_user)
+):
+    """
+    Actualiza varios usuarios en una transacción. Las filas que cambian los mismos campos
+    se escriben con un solo executemany; las que no traen nada que cambiar se ignoran.
+    """
+    try:
+        if not verify_permissions(db, user_token.id_rol, modulo, 'actualizar'):
+            raise HTTPException(status_code=401, detail="Usuario no autorizado")
+
+        if not items:
+            raise HTTPException(status_code=400, detail="Debe enviar al menos un registro")
+        if len(items) > settings.BULK_UPDATE_MAX_ROWS:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Máximo {settings.BULK_UPDATE_MAX_ROWS} registros por petición"
+            )
+
+        updated = crud_users.update_users_bulk(db, [item.model_dump(exclude_unset=True) for item in items])
+        return {"received": len(items), "updated": updated}
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.put("/cambiar-estado/{user_id}", status_code=status.HTTP_200_OK)
 def change_user_status(
     user_id: int,
@@ -121,7 +188,9 @@ def change_user_status(
 def get_users_pag(
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db),
+    include_total: bool = Query(True, description="Incluir el total de registros y de páginas"),
+    total_mode: str = Query("cached", pattern="^(exact|cached|estimated)$", description="exact, cached o estimated"),
+    db: Session = Depends(get_read_db),
     #user_token: UserOut = Depends(get_current_user)
 ):
     try:
@@ -130,7 +199,13 @@ def get_users_pag(
         #     raise HTTPException(status_code=401, detail="Usuario no autorizado")
 
         skip = (page - 1) * page_size
-        data = crud_users.get_all_user_except_admins_pag(db, skip=skip, limit=page_size)
+        data = crud_users.get_all_user_except_admins_pag(
+            db,
+            skip=skip,
+            limit=page_size,
+            include_total=include_total,
+            total_mode=total_mode
+        )
 
         total = data['total']
         users = data['users']
@@ -139,7 +214,42 @@ def get_users_pag(
             "page": page,
             "page_size": page_size,
             "total_users": total,
-            "total_pages": (total + page_size - 1) // page_size,
+            "total_pages": (total + page_size - 1) // page_size if total is not None else None,
+            "users": users
+        }
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/all-except-admins-cursor", response_model=UserCursorResponse)
+def get_users_cursor(
+    cursor: Optional[str] = Query(None, description="Valor de next_cursor de la respuesta anterior"),
+    page_size: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_read_db),
+    user_token: UserOut = Depends(get_current_user)
+):
+    try:
+        id_rol = user_token.id_rol
+        if not verify_permissions(db, id_rol, modulo, 'seleccionar'):
+            raise HTTPException(status_code=401, detail="Usuario no autorizado")
+
+        after_id = None
+        if cursor:
+            try:
+                after_id = int(decode_cursor(cursor)["id"])
+            except (ValueError, KeyError, TypeError):
+                raise HTTPException(status_code=400, detail="Cursor inválido")
+
+        data = crud_users.get_all_user_except_admins_keyset(db, after_id=after_id, limit=page_size)
+
+        users = data['users']
+        next_cursor = None
+        if data['has_more']:
+            next_cursor = encode_cursor({"id": users[-1]["id_usuario"]})
+
+        return {
+            "page_size": page_size,
+            "next_cursor": next_cursor,
             "users": users
         }
     except SQLAlchemyError as e:
@@ -5,4 +5,20 @@ from app.schemas.users import UserOut
 
 class ResponseLoggin(BaseModel):
     user:UserOut
-    access_token: str
\ No newline at end of file
+    access_token: str
+    refresh_token: str
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class TokenPair(BaseModel):
+    access_token: str
+    refresh_token: str
+    token_type: str = "bearer"
+
+class TokenUser(BaseModel):
+    """Usuario autenticado construido a partir de los claims firmados del access token."""
+    id_usuario: int
+    id_rol: int
+    email: str
+    estado: bool
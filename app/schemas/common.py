@@ -0,0 +1,11 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+
+class IdsRequest(BaseModel):
+    ids: List[int] = Field(min_length=1)
+
+
+class BulkUpdateResult(BaseModel):
+    received: int
+    updated: int
@@ -1,5 +1,6 @@
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from datetime import date, datetime
+from pydantic import AliasChoices, BaseModel, EmailStr, Field
+from typing import List, Optional
 
 class FincaBase(BaseModel):
     nombre_finca: str = Field(min_length=3, max_length=100)
@@ -17,5 +18,47 @@ class FincasUpdate(BaseModel):
     latitud: Optional[float] = None
     estado_finca: Optional[bool] = None
 
-class FincasOut(FincaBase):
-    id_finca: int  
\ No newline at end of file
+class FincasBulkUpdate(FincasUpdate):
+    id_finca: int
+
+# La tabla guarda nombre y estado: se aceptan ambos nombres al leer la fila
+class FincasOut(BaseModel):
+    id_finca: int
+    nombre_finca: str = Field(validation_alias=AliasChoices("nombre_finca", "nombre"))
+    longitud: float
+    latitud: float
+    estado_finca: bool = Field(validation_alias=AliasChoices("estado_finca", "estado"))
+
+class FincaResumen(BaseModel):
+    id_finca: int
+    nombre: str
+    longitud: float
+    latitud: float
+    estado: bool
+
+class FincaDashboardShed(BaseModel):
+    id_galpon: int
+    nombre: str
+    capacidad: float
+    cant_actual: float
+    estado: bool
+    ocupacion_pct: Optional[float] = None
+    mortalidad: int
+    registros_salvamento: int
+    ingresos: int
+
+class FincaDashboardTotals(BaseModel):
+    galpones: int
+    capacidad: float
+    cant_actual: float
+    ocupacion_pct: Optional[float] = None
+    mortalidad: int
+    ingresos: int
+
+class FincaDashboardResponse(BaseModel):
+    finca: FincaResumen
+    fecha_inicio: date
+    fecha_fin: date
+    generado_en: datetime
+    totales: FincaDashboardTotals
+    galpones: List[FincaDashboardShed]
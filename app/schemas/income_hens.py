@@ -1,14 +1,13 @@
 from datetime import date
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 
 
 class IncomeHensBase(BaseModel):
-    id_ingreso: int
     id_galpon: int
     fecha: date
     id_tipo_gallina: int
-    cantidad_gallinas: int
+    cantidad_gallinas: int = Field(gt=0)
     
 class IncomeHensCreate(IncomeHensBase):
     pass
@@ -17,7 +16,28 @@ class IncomeHensUpdate(BaseModel):
     id_galpon: Optional[int] = None
     fecha: Optional[date] = None
     id_tipo_gallina: Optional[int] = None
-    cantidad_gallinas: Optional[int] = None
+    cantidad_gallinas: Optional[int] = Field(default=None, gt=0)
 
+class IncomeHensOut(IncomeHensBase):
+    id_ingreso: int
+    nombre: str
+    raza: str
 
-    
+class IncomeHensPaginatedResponse(BaseModel):
+    page: int
+    page_size: int
+    total_ingresos: Optional[int] = None
+    total_pages: Optional[int] = None
+    ingresos: List[IncomeHensOut]
+
+class IncomeHensCursorResponse(BaseModel):
+    page_size: int
+    next_cursor: Optional[str] = None
+    ingresos: List[IncomeHensOut]
+
+class IncomeHensBulkResult(BaseModel):
+    inserted: int
+    galpones: int
+    total_gallinas: int
+    elapsed_seconds: float
+    rows_per_second: float
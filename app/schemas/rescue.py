@@ -27,6 +27,40 @@ class RescueOut(RescueBase):
 class RescuePaginatedResponse(BaseModel):
     page: int
     page_size: int
-    total_rescues: int
-    total_pages: int
-    rescues: List[RescueOut]
\ No newline at end of file
+    total_rescues: Optional[int] = None
+    total_pages: Optional[int] = None
+    rescues: List[RescueOut]
+
+class RescueCursorResponse(BaseModel):
+    page_size: int
+    next_cursor: Optional[str] = None
+    rescues: List[RescueOut]
+
+class RescueBulkError(BaseModel):
+    line: int
+    error: str
+
+class RescueBulkResult(BaseModel):
+    received: int
+    inserted: int
+    failed: int
+    errors: List[RescueBulkError]
+    elapsed_seconds: float
+    rows_per_second: float
+
+class RescueStatsItem(BaseModel):
+    periodo_inicio: date
+    id_galpon: Optional[int] = None
+    id_tipo_gallina: Optional[int] = None
+    total_gallinas: int
+    registros: int
+
+class RescueStatsResponse(BaseModel):
+    periodo: str
+    fecha_inicio: date
+    fecha_fin: date
+    items: List[RescueStatsItem]
+
+class RescueByIdsResponse(BaseModel):
+    items: List[Optional[RescueOut]]
+    missing: List[int]
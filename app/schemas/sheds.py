@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 
 class ShedBase(BaseModel):
     id_finca: int
@@ -14,10 +14,16 @@ class ShedCreate(ShedBase):
 class ShedUpdate(BaseModel):
     nombre: Optional[str] = Field(default=None, min_length=3, max_length=70)
     capacidad: Optional[float] = Field(default=None)
-    cant_actual: Optional[float] = Field(default=None)
+
+class ShedBulkUpdate(ShedUpdate):
+    id_galpon: int
 
 class ShedEstado(BaseModel):
     estado: Optional[bool] = None
 
 class ShedOut(ShedBase):
     id_galpon: int
+
+class ShedByIdsResponse(BaseModel):
+    items: List[Optional[ShedOut]]
+    missing: List[int]
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 
 class TypeChickenBase(BaseModel):
     raza: str 
@@ -11,6 +11,13 @@ class TypeChickenCreate(TypeChickenBase):
 class TypeChickenUpdate(BaseModel):
     raza: Optional[str] = None
     descripcion: Optional[str] = None
+
+class TypeChickenBulkUpdate(TypeChickenUpdate):
+    id_tipo_gallinas: int
     
 class TypeChickenOut(TypeChickenBase):
     id_tipo_gallinas: int
+
+class TypeChickenByIdsResponse(BaseModel):
+    items: List[Optional[TypeChickenOut]]
+    missing: List[int]
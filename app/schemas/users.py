@@ -17,11 +17,13 @@ class UserUpdate(BaseModel):
     email: Optional[EmailStr] = None
     telefono: Optional[str] = Field(default=None, min_length=7, max_length=15)
     documento: Optional[str] = Field(default=None, min_length=8, max_length=20)
-    estado: Optional[bool] = None
 
 class UserEstado(BaseModel):
     estado: Optional[bool] = None
 
+class UserBulkUpdate(UserUpdate):
+    id_usuario: int
+
 class UserOut(UserBase):
     id_usuario: int
     nombre_rol: str
@@ -29,6 +31,15 @@ class UserOut(UserBase):
 class UserPaginatedResponse(BaseModel):
     page: int
     page_size: int
-    total_users: int
-    total_pages: int
+    total_users: Optional[int] = None
+    total_pages: Optional[int] = None
     users: List[UserOut]
+
+class UserCursorResponse(BaseModel):
+    page_size: int
+    next_cursor: Optional[str] = None
+    users: List[UserOut]
+
+class UserByIdsResponse(BaseModel):
+    items: List[Optional[UserOut]]
+    missing: List[int]
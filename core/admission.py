@@ -0,0 +1,175 @@
+"""
+Control de admisión del login (/access/token).
+
+Cada intento de login cuesta una verificación bcrypt (cientos de ms de CPU). Antes de llegar a
+bcrypt un intento debe pasar, en este orden:
+
+1. Presupuesto de latencia: si la espera estimada en la cola de bcrypt supera
+   LOGIN_HASH_LATENCY_BUDGET_MS se responde 429 de inmediato, sin encolar más trabajo.
+2. Token buckets por IP y por cuenta (email): limitan ráfagas de un mismo origen y los ataques
+   de diccionario contra una cuenta repartidos entre muchas IPs. El bucket de la cuenta solo se
+   descuenta cuando la contraseña es incorrecta (record_failure), para que conocer un email no
+   baste para bloquear los logins correctos de su dueño.
+3. Cupo global de verificaciones de login simultáneas en el proceso (LOGIN_MAX_CONCURRENT_HASHES),
+   que deja libre parte del pool de bcrypt para el resto de operaciones.
+
+Los buckets se guardan en un backend intercambiable. LocalBucketBackend los mantiene en memoria
+del proceso, así que con varios workers (serve.py) cada uno aplica sus propios límites; para
+compartirlos se configura LOGIN_ADMISSION_BACKEND con la ruta "modulo:Clase" de una
+implementación de BucketBackend (por ejemplo sobre Redis). El presupuesto de latencia y el cupo
+de concurrencia son siempre locales: protegen la CPU de este proceso.
+
+La IP es request.client.host. Detrás de un proxy, uvicorn la toma de X-Forwarded-For solo si el
+proxy está en FORWARDED_ALLOW_IPS (ver serve.py); si no, todos los logins comparten la IP del proxy.
+"""
+from contextlib import contextmanager
+from importlib import import_module
+from threading import Lock
+from typing import Dict, Iterator, Optional, Tuple
+import math
+import time
+
+from core.config import settings
+from core.metrics import login_admission_rejected
+from core.security import hash_metrics
+
+
+class LoginThrottled(Exception):
+    """Intento de login rechazado; `retry_after` indica en cuántos segundos reintentar."""
+
+    def __init__(self, motivo: str, retry_after: float):
+        super().__init__(motivo)
+        self.motivo = motivo
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class BucketBackend:
+    """Almacén de token buckets. Las implementaciones compartidas deben ser atómicas por clave."""
+
+    def take(self, key: str, rate: float, burst: int) -> float:
+        """
+        Consume un token del bucket `key`, que se recarga a `rate` tokens por segundo hasta
+        `burst`. Devuelve 0 si había token, o los segundos hasta que haya uno disponible.
+        """
+        raise NotImplementedError
+
+    def peek(self, key: str, rate: float, burst: int) -> float:
+        """Como take, pero sin consumir: 0 si hay un token disponible o los segundos hasta que lo haya."""
+        raise NotImplementedError
+
+
+class LocalBucketBackend(BucketBackend):
+    """Buckets en memoria del proceso, seguros para hilos y con número de claves acotado."""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = Lock()
+
+    def _tokens(self, key: str, rate: float, burst: int, ahora: float) -> float:
+        tokens, ultimo = self._buckets.get(key, (float(burst), ahora))
+        return min(float(burst), tokens + (ahora - ultimo) * rate)
+
+    def peek(self, key: str, rate: float, burst: int) -> float:
+        with self._lock:
+            tokens = self._tokens(key, rate, burst, time.monotonic())
+        return 0.0 if tokens >= 1 else (1 - tokens) / rate
+
+    def take(self, key: str, rate: float, burst: int) -> float:
+        ahora = time.monotonic()
+        with self._lock:
+            tokens = self._tokens(key, rate, burst, ahora)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, ahora)
+                espera = 0.0
+            else:
+                self._buckets[key] = (tokens, ahora)
+                espera = (1 - tokens) / rate
+            if len(self._buckets) > self.max_keys:
+                self._prune(ahora, rate, burst)
+            return espera
+
+    def _prune(self, ahora: float, rate: float, burst: int) -> None:
+        # Un bucket que ya se habría recargado por completo equivale a no tenerlo
+        lleno = burst / rate
+        for key in [k for k, (_, ultimo) in self._buckets.items() if ahora - ultimo >= lleno]:
+            del self._buckets[key]
+        # Si aún hay demasiadas claves activas se descartan las más antiguas (orden de inserción)
+        exceso = len(self._buckets) - self.max_keys
+        for key in list(self._buckets)[:max(0, exceso)]:
+            del self._buckets[key]
+
+
+def _build_backend() -> BucketBackend:
+    nombre = settings.LOGIN_ADMISSION_BACKEND
+    if nombre == "local":
+        return LocalBucketBackend(max_keys=settings.LOGIN_BUCKET_MAX_KEYS)
+    modulo, _, clase = nombre.partition(":")
+    return getattr(import_module(modulo), clase)()
+
+
+class LoginAdmission:
+    """Aplica el presupuesto de latencia, los buckets y el cupo de concurrencia del login."""
+
+    def __init__(self, backend: BucketBackend):
+        self.backend = backend
+        self.max_concurrent = settings.LOGIN_MAX_CONCURRENT_HASHES or settings.PASSWORD_HASH_WORKERS * 2
+        self._en_curso = 0
+        self._lock = Lock()
+
+    def _reject(self, motivo: str, retry_after: float) -> None:
+        login_admission_rejected.inc(motivo)
+        raise LoginThrottled(motivo, retry_after)
+
+    def check(self, ip: Optional[str], account: str) -> None:
+        """Lanza LoginThrottled si el intento no debe llegar a bcrypt."""
+        presupuesto = settings.LOGIN_HASH_LATENCY_BUDGET_MS / 1000
+        if presupuesto > 0:
+            espera = hash_metrics.estimated_wait()
+            if espera > presupuesto:
+                self._reject("latencia", espera)
+
+        if ip and settings.LOGIN_IP_RATE_PER_MINUTE > 0:
+            espera = self.backend.take(
+                f"login:ip:{ip}", settings.LOGIN_IP_RATE_PER_MINUTE / 60, settings.LOGIN_IP_BURST
+            )
+            if espera:
+                self._reject("ip", espera)
+
+        if settings.LOGIN_ACCOUNT_RATE_PER_MINUTE > 0:
+            espera = self.backend.peek(*self._account_bucket(account))
+            if espera:
+                self._reject("cuenta", espera)
+
+    def record_failure(self, account: str) -> None:
+        """Descuenta un intento del bucket de la cuenta tras una contraseña incorrecta."""
+        if settings.LOGIN_ACCOUNT_RATE_PER_MINUTE > 0:
+            self.backend.take(*self._account_bucket(account))
+
+    @staticmethod
+    def _account_bucket(account: str) -> Tuple[str, float, int]:
+        return (
+            f"login:cuenta:{account.strip().lower()}",
+            settings.LOGIN_ACCOUNT_RATE_PER_MINUTE / 60,
+            settings.LOGIN_ACCOUNT_BURST,
+        )
+
+    @contextmanager
+    def verification_slot(self) -> Iterator[None]:
+        """Reserva uno de los cupos de verificación simultánea o lanza LoginThrottled."""
+        with self._lock:
+            if self._en_curso >= self.max_concurrent:
+                lleno = True
+            else:
+                lleno = False
+                self._en_curso += 1
+        if lleno:
+            self._reject("concurrencia", hash_metrics.duracion_reciente or 1)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._en_curso -= 1
+
+
+login_admission = LoginAdmission(_build_backend())
@@ -0,0 +1,69 @@
+from collections import OrderedDict
+from threading import RLock
+from typing import Any, Callable, Hashable, Optional
+import time
+
+
+# Marcador para distinguir "no está en caché" de un valor None almacenado
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Caché en memoria del proceso con expiración por tiempo (TTL) y tamaño acotado (LRU).
+
+    Es segura para hilos, ya que los endpoints síncronos de FastAPI se ejecutan
+    en el threadpool de Starlette y pueden acceder a la caché simultáneamente.
+
+    Args:
+        ttl: Segundos que una entrada permanece válida.
+        max_size: Número máximo de entradas; al superarlo se descarta la menos usada.
+    """
+
+    def __init__(self, ttl: float, max_size: int = 1024):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = RLock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return default
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key: Hashable, loader: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """Devuelve el valor en caché o lo calcula con `loader` y lo almacena."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            self.set(key, value, ttl)
+        return value
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
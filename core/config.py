@@ -18,11 +18,123 @@ class Settings(BaseSettings):
     DB_NAME: str = os.getenv("DB_NAME", "")
 
     DATABASE_URL: str = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    # URL del motor asíncrono; si se deja vacía se deriva de DATABASE_URL (pymysql -> aiomysql, sqlite -> aiosqlite)
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL", "")
+    # Pool de conexiones (por motor y por proceso): permanentes, adicionales y espera máxima en segundos
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    # Réplicas de solo lectura separadas por comas (vacío = todo va a la primaria). Las lecturas
+    # de un cliente vuelven a la primaria durante DB_REPLICA_STICKY_SECONDS tras una escritura, y
+    # una réplica que falla se omite durante DB_REPLICA_RETRY_SECONDS
+    DATABASE_REPLICA_URLS: str = os.getenv("DATABASE_REPLICA_URLS", "")
+    DB_REPLICA_STICKY_SECONDS: float = float(os.getenv("DB_REPLICA_STICKY_SECONDS", "5"))
+    DB_REPLICA_RETRY_SECONDS: float = float(os.getenv("DB_REPLICA_RETRY_SECONDS", "30"))
+    # Al arrancar: conexiones que se abren por motor (hasta DB_POOL_SIZE) y si se cargan de
+    # antemano los permisos, tipos de gallina y galpones
+    DB_WARMUP_CONNECTIONS: int = int(os.getenv("DB_WARMUP_CONNECTIONS", "2"))
+    WARMUP_CACHES: bool = os.getenv("WARMUP_CACHES", "true").lower() == "true"
+    # /health/ready: segundos entre verificaciones de la base de datos en segundo plano y
+    # saturación de un pool (0-1) a partir de la cual se responde 503 (0 = solo se informa)
+    HEALTH_PROBE_INTERVAL_SECONDS: float = float(os.getenv("HEALTH_PROBE_INTERVAL_SECONDS", "5"))
+    HEALTH_MAX_POOL_SATURATION: float = float(os.getenv("HEALTH_MAX_POOL_SATURATION", "0"))
     
     # Configuración JWT
     jwt_secret: str = os.getenv("JWT_SECRET")
     jwt_algorithm: str = os.getenv("JWT_ALGORITHM", "HS256")
     jwt_access_token_expire_minutes: int = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+    # Vigencia de los refresh tokens (POST /access/refresh renueva el access token sin bcrypt)
+    jwt_refresh_token_expire_days: int = int(os.getenv("JWT_REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+
+    # Caché de la matriz de permisos (segundos antes de revisar la versión en BD)
+    PERMISSIONS_CACHE_TTL_SECONDS: float = float(os.getenv("PERMISSIONS_CACHE_TTL_SECONDS", "60"))
+    # Tipos de gallina y galpones en memoria (segundos antes de revisar la versión en BD)
+    REFERENCE_CACHE_TTL_SECONDS: float = float(os.getenv("REFERENCE_CACHE_TTL_SECONDS", "10"))
+
+    # Autenticación sin consulta a BD: confiar en los claims firmados del token (id, rol, estado, email)
+    AUTH_TRUST_TOKEN_CLAIMS: bool = os.getenv("AUTH_TRUST_TOKEN_CLAIMS", "false").lower() == "true"
+    # Caché de usuarios (filas usuarios JOIN roles) y de tokens decodificados
+    USER_CACHE_TTL_SECONDS: float = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+    USER_CACHE_MAX_SIZE: int = int(os.getenv("USER_CACHE_MAX_SIZE", "10000"))
+    TOKEN_CACHE_TTL_SECONDS: float = float(os.getenv("TOKEN_CACHE_TTL_SECONDS", "300"))
+    TOKEN_CACHE_MAX_SIZE: int = int(os.getenv("TOKEN_CACHE_MAX_SIZE", "10000"))
+    # Segundos entre revisiones de la versión "usuarios_estado" (desactivaciones hechas en otros workers)
+    USER_REVOCATION_CHECK_SECONDS: float = float(os.getenv("USER_REVOCATION_CHECK_SECONDS", "2"))
+
+    # Pool dedicado para bcrypt: hilos de trabajo y operaciones adicionales que pueden esperar en cola
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PASSWORD_HASH_MAX_QUEUE: int = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+    # Control de admisión de /access/token (ver core/admission.py): intentos por minuto y ráfaga
+    # por IP y por cuenta (0 desactiva el límite), verificaciones de login simultáneas
+    # (0 = 2 x PASSWORD_HASH_WORKERS), espera máxima estimada en la cola de bcrypt antes de
+    # responder 429 (0 = sin límite) y backend de los buckets ("local" o "modulo:Clase")
+    LOGIN_ADMISSION_ENABLED: bool = os.getenv("LOGIN_ADMISSION_ENABLED", "true").lower() == "true"
+    LOGIN_IP_RATE_PER_MINUTE: float = float(os.getenv("LOGIN_IP_RATE_PER_MINUTE", "30"))
+    LOGIN_IP_BURST: int = int(os.getenv("LOGIN_IP_BURST", "10"))
+    LOGIN_ACCOUNT_RATE_PER_MINUTE: float = float(os.getenv("LOGIN_ACCOUNT_RATE_PER_MINUTE", "10"))
+    LOGIN_ACCOUNT_BURST: int = int(os.getenv("LOGIN_ACCOUNT_BURST", "5"))
+    LOGIN_MAX_CONCURRENT_HASHES: int = int(os.getenv("LOGIN_MAX_CONCURRENT_HASHES", "0"))
+    LOGIN_HASH_LATENCY_BUDGET_MS: float = float(os.getenv("LOGIN_HASH_LATENCY_BUDGET_MS", "1000"))
+    LOGIN_ADMISSION_BACKEND: str = os.getenv("LOGIN_ADMISSION_BACKEND", "local")
+    LOGIN_BUCKET_MAX_KEYS: int = int(os.getenv("LOGIN_BUCKET_MAX_KEYS", "100000"))
+
+    # Segundos que se reutiliza el total de registros en los listados paginados
+    COUNT_CACHE_TTL_SECONDS: float = float(os.getenv("COUNT_CACHE_TTL_SECONDS", "30"))
+
+    # Importación masiva: filas por transacción y máximo de errores detallados en la respuesta
+    BULK_BATCH_SIZE: int = int(os.getenv("BULK_BATCH_SIZE", "1000"))
+    BULK_MAX_ERRORS: int = int(os.getenv("BULK_MAX_ERRORS", "1000"))
+    # Longitud máxima de una línea del cuerpo en bytes; las más largas se rechazan sin acumularlas
+    BULK_MAX_LINE_BYTES: int = int(os.getenv("BULK_MAX_LINE_BYTES", "16384"))
+    # Máximo de ingresos de gallinas por petición en /income_hens/bulk (una sola transacción)
+    INCOME_BULK_MAX_ROWS: int = int(os.getenv("INCOME_BULK_MAX_ROWS", "10000"))
+
+    # Filas leídas por bloque desde el cursor del servidor en las exportaciones
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+    # Endpoints by-ids: máximo de ids por petición e ids por consulta IN (...)
+    BY_IDS_MAX: int = int(os.getenv("BY_IDS_MAX", "1000"))
+    BY_IDS_CHUNK_SIZE: int = int(os.getenv("BY_IDS_CHUNK_SIZE", "500"))
+
+    # Máximo de filas por petición en los PATCH /bulk
+    BULK_UPDATE_MAX_ROWS: int = int(os.getenv("BULK_UPDATE_MAX_ROWS", "1000"))
+
+    # Segundos que se reutiliza el tablero de una finca (/fincas/{id}/dashboard)
+    DASHBOARD_CACHE_TTL_SECONDS: float = float(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "15"))
+
+    # Serializar los listados grandes sin revalidar cada fila con Pydantic (ver core/serialization.py)
+    FAST_SERIALIZATION: bool = os.getenv("FAST_SERIALIZATION", "true").lower() == "true"
+
+    # Observabilidad: nivel de logs de la aplicación, encabezado Server-Timing por petición,
+    # umbral de consultas lentas (0 lo desactiva) y registro muestreado de sentencias SQL
+    # (SQL_LOG_LEVEL=DEBUG las registra; SQL_LOG_SAMPLE_RATE es la fracción registrada)
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    SERVER_TIMING_HEADER: bool = os.getenv("SERVER_TIMING_HEADER", "true").lower() == "true"
+    SQL_SLOW_QUERY_MS: float = float(os.getenv("SQL_SLOW_QUERY_MS", "200"))
+    SQL_LOG_LEVEL: str = os.getenv("SQL_LOG_LEVEL", "WARNING")
+    SQL_LOG_SAMPLE_RATE: float = float(os.getenv("SQL_LOG_SAMPLE_RATE", "1.0"))
+    # Endpoint /metrics en formato Prometheus
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+    # Servidor de producción (serve.py): dirección, workers (0 = uno por CPU disponible),
+    # peticiones por worker antes de reiniciarlo (0 = sin límite) con una variación aleatoria
+    # para que no se reinicien todos a la vez, y segundos para terminar las peticiones en curso
+    HOST: str = os.getenv("HOST", "0.0.0.0")
+    PORT: int = int(os.getenv("PORT", "8000"))
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "0"))
+    MAX_REQUESTS: int = int(os.getenv("MAX_REQUESTS", "10000"))
+    MAX_REQUESTS_JITTER: int = int(os.getenv("MAX_REQUESTS_JITTER", "1000"))
+    GRACEFUL_TIMEOUT: float = float(os.getenv("GRACEFUL_TIMEOUT", "30"))
+    # Proxies de confianza (IPs o redes separadas por comas, "*" = cualquiera) cuyos encabezados
+    # X-Forwarded-For/Proto se usan como dirección del cliente; sin esto, detrás de un balanceador
+    # todos los logins compartirían el límite por IP
+    PROXY_HEADERS: bool = os.getenv("PROXY_HEADERS", "true").lower() == "true"
+    FORWARDED_ALLOW_IPS: str = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+    # Límite de conexiones del servidor MySQL (max_connections) y conexiones que se dejan libres
+    # para administración y scripts; serve.py reparte el resto entre los pools de los workers
+    # (MYSQL_MAX_CONNECTIONS=0 desactiva el reparto)
+    MYSQL_MAX_CONNECTIONS: int = int(os.getenv("MYSQL_MAX_CONNECTIONS", "151"))
+    DB_RESERVED_CONNECTIONS: int = int(os.getenv("DB_RESERVED_CONNECTIONS", "10"))
 
     class Config:
         env_file = ".env"
@@ -1,12 +1,21 @@
-from typing import Generator
+from typing import AsyncGenerator, Generator, List, Optional
+import asyncio
+import itertools
 import logging
+import math
+import time
+from contextvars import ContextVar
 
-from sqlalchemy import create_engine, text, MetaData
-from sqlalchemy.orm import sessionmaker, declarative_base
+from fastapi import Request
+from sqlalchemy import create_engine, event, text, MetaData
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 from sqlalchemy.exc import SQLAlchemyError, OperationalError, DisconnectionError
-from sqlalchemy.pool import QueuePool
 
 from core.config import settings 
+from core.instrumentation import instrument_engine
+from core.metrics import InstrumentedAsyncQueuePool, InstrumentedQueuePool, db_read_routing, instrument_pool
 
 # Configurar el módulo de logging de Python y se usa para crear un registrador de eventos (logger)
 logger = logging.getLogger(__name__)
@@ -14,13 +23,13 @@ logger = logging.getLogger(__name__)
 # Crear el motor de base de datos con configuraciones óptimas
 engine = create_engine(
     settings.DATABASE_URL,
-    echo=True,           # Activar o desactivar el modo debug para imprimir en consola todas las sentencias SQL
+    echo=False,          # Las sentencias se registran muestreadas desde core/instrumentation.py (SQL_LOG_LEVEL)
     pool_pre_ping=True,  # Verifica que las conexiones estén activas antes de usarlas
     pool_recycle=3600,   # Recicla conexiones después de una hora para evitar el error "connection has been closed"
-    pool_size=10,        # Número máximo de conexiones permanentes en el pool
-    max_overflow=20,     # Conexiones adicionales permitidas temporalmente cuando el pool está lleno
-    pool_timeout=30,     # Tiempo máximo de espera para obtener una conexión del pool
-    poolclass=QueuePool  # Clase de pool para manejo eficiente de conexiones
+    pool_size=settings.DB_POOL_SIZE,        # Número máximo de conexiones permanentes en el pool
+    max_overflow=settings.DB_MAX_OVERFLOW,  # Conexiones adicionales permitidas temporalmente cuando el pool está lleno
+    pool_timeout=settings.DB_POOL_TIMEOUT,  # Tiempo máximo de espera para obtener una conexión del pool
+    poolclass=InstrumentedQueuePool  # QueuePool que además mide la espera de checkout (core/metrics.py)
 )
 
 # Crear la fábrica de sesiones
@@ -29,6 +38,217 @@ engine = create_engine(
 # - bind=engine: Vincula la sesión al motor creado anteriormente
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Drivers asíncronos equivalentes a los drivers síncronos configurados en DATABASE_URL
+_ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def _to_async_url(database_url: str) -> str:
+    url = make_url(database_url)
+    return url.set(drivername=_ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername)).render_as_string(hide_password=False)
+
+def _async_database_url() -> str:
+    return settings.ASYNC_DATABASE_URL or _to_async_url(settings.DATABASE_URL)
+
+# Crear el motor asíncrono con la misma configuración de pool que el motor síncrono.
+# Los endpoints `async def` que lo usan esperan a la base de datos sin ocupar un hilo del threadpool.
+async_engine = create_async_engine(
+    _async_database_url(),
+    echo=False,
+    pool_pre_ping=True,
+    pool_recycle=3600,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    poolclass=InstrumentedAsyncQueuePool
+)
+
+# Contar sentencias y tiempo en base de datos por petición, y registrar las consultas lentas
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+instrument_pool("sync", engine.pool)
+instrument_pool("async", async_engine.sync_engine.pool)
+
+# Fábrica de sesiones asíncronas
+# - expire_on_commit=False: los resultados siguen disponibles tras el commit sin volver a consultar
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+
+# --- Réplicas de lectura ---
+# Los endpoints de solo lectura usan get_read_db / get_async_read_db, que entregan una sesión de
+# una réplica (por turnos) y caen a la primaria si el cliente escribió hace poco o si ninguna
+# réplica responde. Sin DATABASE_REPLICA_URLS ambas equivalen a get_db / get_async_db.
+
+class _Replica:
+    def __init__(self, nombre: str, url: str):
+        self.nombre = nombre
+        pool_args = dict(
+            echo=False,
+            pool_pre_ping=True,
+            pool_recycle=3600,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+        self.engine = create_engine(url, poolclass=InstrumentedQueuePool, **pool_args)
+        self.async_engine = create_async_engine(_to_async_url(url), poolclass=InstrumentedAsyncQueuePool, **pool_args)
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.async_session_factory = async_sessionmaker(self.async_engine, autoflush=False, expire_on_commit=False)
+        # Momento (time.monotonic) hasta el que la réplica se considera caída
+        self.caida_hasta = 0.0
+
+        for motor, etiqueta in ((self.engine, nombre), (self.async_engine.sync_engine, f"{nombre}_async")):
+            instrument_engine(motor)
+            instrument_pool(etiqueta, motor.pool)
+            event.listen(motor, "handle_error", self._handle_error)
+
+    def disponible(self) -> bool:
+        return time.monotonic() >= self.caida_hasta
+
+    def marcar_caida(self, error: Exception) -> None:
+        if self.disponible():
+            logger.warning(
+                f"Réplica {self.nombre} no disponible, se omite durante {settings.DB_REPLICA_RETRY_SECONDS} s: {error}"
+            )
+        self.caida_hasta = time.monotonic() + settings.DB_REPLICA_RETRY_SECONDS
+
+    def _handle_error(self, context):
+        # Una desconexión a mitad de petición deja la réplica fuera para las siguientes
+        if context.is_disconnect:
+            self.marcar_caida(context.original_exception)
+
+
+replicas: List[_Replica] = [
+    _Replica(f"replica{i}", url.strip())
+    for i, url in enumerate(settings.DATABASE_REPLICA_URLS.split(","))
+    if url.strip()
+]
+_turno = itertools.count()
+
+# Lectura de las propias escrituras: tras un commit en la primaria, la respuesta lleva la marca de
+# tiempo de la escritura en una cookie y en el encabezado X-Ultima-Escritura. El cliente la
+# devuelve en sus siguientes peticiones, así que cualquier worker o instancia que las atienda
+# envía sus lecturas a la primaria durante DB_REPLICA_STICKY_SECONDS aunque la réplica tenga
+# retraso. Los clientes sin cookies (apps, scripts) pueden reenviar el encabezado.
+ESCRITURA_COOKIE = "avisena_ultima_escritura"
+ESCRITURA_HEADER = "X-Ultima-Escritura"
+_ESCRITURA_PRIMARIA = "escritura_primaria"
+_escritura_actual: ContextVar[Optional[dict]] = ContextVar("escritura_actual", default=None)
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_write(session):
+    marca = _escritura_actual.get()
+    if marca is not None and session.info.get(_ESCRITURA_PRIMARIA):
+        marca["ts"] = time.time()
+
+
+def _ultima_escritura(request: Optional[Request]) -> Optional[float]:
+    if request is None:
+        return None
+    valor = request.headers.get(ESCRITURA_HEADER) or request.cookies.get(ESCRITURA_COOKIE)
+    try:
+        return float(valor) if valor else None
+    except ValueError:
+        return None
+
+
+def _escritura_reciente(request: Optional[Request]) -> bool:
+    ultima = _ultima_escritura(request)
+    # Valor absoluto: tolera que el reloj del worker que escribió vaya algo adelantado
+    return ultima is not None and abs(time.time() - ultima) < settings.DB_REPLICA_STICKY_SECONDS
+
+
+class ReadYourWritesMiddleware:
+    """
+    Middleware ASGI que agrega la marca de la última escritura (cookie y encabezado) a las
+    respuestas de las peticiones que hicieron commit en la primaria. Solo se registra con
+    réplicas configuradas.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.max_age = max(1, math.ceil(settings.DB_REPLICA_STICKY_SECONDS))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        marca = {}
+        token = _escritura_actual.set(marca)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and "ts" in marca:
+                valor = f"{marca['ts']:.3f}"
+                cookie = f"{ESCRITURA_COOKIE}={valor}; Max-Age={self.max_age}; Path=/; HttpOnly; SameSite=Lax"
+                headers = list(message.get("headers", []))
+                headers.append((ESCRITURA_HEADER.lower().encode("latin-1"), valor.encode("latin-1")))
+                headers.append((b"set-cookie", cookie.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _escritura_actual.reset(token)
+
+
+def _read_candidates(request: Optional[Request]) -> List[_Replica]:
+    if not replicas:
+        return []
+    if _escritura_reciente(request):
+        db_read_routing.inc("primaria", "escritura_reciente")
+        return []
+    disponibles = [replica for replica in replicas if replica.disponible()]
+    if not disponibles:
+        db_read_routing.inc("primaria", "replicas_caidas")
+        return []
+    inicio = next(_turno) % len(disponibles)
+    return disponibles[inicio:] + disponibles[:inicio]
+
+
+def open_read_session(request: Optional[Request] = None) -> Session:
+    """
+    Abre una sesión de solo lectura: en una réplica disponible (ya conectada) o en la primaria.
+    `request` identifica al cliente para respetar sus escrituras recientes. Quien la abre debe cerrarla.
+    """
+    candidatas = _read_candidates(request)
+    for replica in candidatas:
+        db = replica.session_factory()
+        try:
+            db.connection()
+        except (OperationalError, DisconnectionError) as e:
+            db.close()
+            replica.marcar_caida(e)
+            continue
+        db_read_routing.inc(replica.nombre, "lectura")
+        return db
+    if candidatas:
+        db_read_routing.inc("primaria", "replicas_caidas")
+    return SessionLocal()
+
+
+async def open_async_read_session(request: Optional[Request] = None) -> AsyncSession:
+    """Equivalente asíncrono de open_read_session."""
+    candidatas = _read_candidates(request)
+    for replica in candidatas:
+        db = replica.async_session_factory()
+        try:
+            await db.connection()
+        except (OperationalError, DisconnectionError) as e:
+            await db.close()
+            replica.marcar_caida(e)
+            continue
+        db_read_routing.inc(replica.nombre, "lectura")
+        return db
+    if candidatas:
+        db_read_routing.inc("primaria", "replicas_caidas")
+    return AsyncSessionLocal()
+
+
 # Declarar la base para los modelos ORM
 Base = declarative_base()
 
@@ -40,7 +260,9 @@ def get_db() -> Generator:
     Dependencia para obtener una sesión de base de datos en FastAPI.
     
     Crea una nueva sesión por cada solicitud y la cierra automáticamente
-    al finalizar, incluso si ocurre alguna excepción.
+    al finalizar, incluso si ocurre alguna excepción. Siempre usa la primaria; con
+    réplicas configuradas, un commit marca la respuesta para que las lecturas del mismo
+    cliente vuelvan a la primaria durante DB_REPLICA_STICKY_SECONDS.
     
     Yields:
         Session: Una sesión de SQLAlchemy para interactuar con la base de datos.
@@ -53,6 +275,7 @@ def get_db() -> Generator:
         ```
     """
     db = SessionLocal()
+    db.info[_ESCRITURA_PRIMARIA] = True
     try:
         yield db  # El 'yield' permite que la función de endpoint use la sesión.
     except SQLAlchemyError as e:
@@ -64,6 +287,122 @@ def get_db() -> Generator:
         # Esto es esencial para evitar fugas de memoria y conexiones abiertas.
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependencia para obtener una sesión asíncrona de base de datos en FastAPI.
+
+    Equivalente a get_db para endpoints `async def`.
+
+    Example:
+        ```python
+        @app.get("/items/")
+        async def read_items(db: AsyncSession = Depends(get_async_db)):
+            result = await db.execute(text("SELECT * FROM items"))
+            return result.mappings().all()
+        ```
+    """
+    async with AsyncSessionLocal() as db:
+        db.info[_ESCRITURA_PRIMARIA] = True
+        try:
+            yield db
+        except SQLAlchemyError as e:
+            await db.rollback()
+            logger.error(f"Error de base de datos: {str(e)}")
+            raise
+
+
+def get_read_db(request: Request = None) -> Generator:
+    """
+    Dependencia para endpoints de solo lectura: sesión en una réplica cuando hay alguna
+    disponible y el cliente no escribió recientemente; en otro caso, en la primaria.
+    """
+    db = open_read_session(request)
+    try:
+        yield db
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error de base de datos: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request = None) -> AsyncGenerator[AsyncSession, None]:
+    """Equivalente de get_read_db para endpoints `async def`."""
+    db = await open_async_read_session(request)
+    try:
+        yield db
+    except SQLAlchemyError as e:
+        await db.rollback()
+        logger.error(f"Error de base de datos: {str(e)}")
+        raise
+    finally:
+        await db.close()
+
+
+def _all_engines() -> list:
+    return [engine] + [replica.engine for replica in replicas]
+
+
+def _all_async_engines() -> list:
+    return [async_engine] + [replica.async_engine for replica in replicas]
+
+
+async def warm_pools(conexiones: int) -> None:
+    """
+    Abre `conexiones` conexiones por motor (sin pasar de DB_POOL_SIZE) y las devuelve al
+    pool, para que las primeras peticiones no paguen el handshake con la base de datos.
+    Un motor que no responde se registra y se omite.
+    """
+    conexiones = min(conexiones, settings.DB_POOL_SIZE)
+    if conexiones <= 0:
+        return
+
+    def abrir(motor):
+        abiertas = []
+        try:
+            for _ in range(conexiones):
+                abiertas.append(motor.connect())
+        except SQLAlchemyError as e:
+            logger.warning(f"No se pudo precalentar el pool de {motor.url.render_as_string()}: {e}")
+        finally:
+            for conexion in abiertas:
+                conexion.close()
+
+    for motor in _all_engines():
+        await asyncio.to_thread(abrir, motor)
+
+    for motor in _all_async_engines():
+        abiertas = []
+        try:
+            for _ in range(conexiones):
+                abiertas.append(await motor.connect())
+        except SQLAlchemyError as e:
+            logger.warning(f"No se pudo precalentar el pool asíncrono de {motor.url.render_as_string()}: {e}")
+        finally:
+            for conexion in abiertas:
+                await conexion.close()
+
+
+async def dispose_engines() -> None:
+    """Cierra las conexiones de todos los pools al apagar el proceso."""
+    for motor in _all_engines():
+        motor.dispose()
+    for motor in _all_async_engines():
+        await motor.dispose()
+
+
+def dispose_after_fork() -> None:
+    """
+    Descarta los pools heredados del proceso padre sin cerrar sus conexiones.
+
+    Se llama en cada worker creado con fork (serve.py): las conexiones del padre no se
+    pueden compartir entre procesos, así que cada worker abre las suyas.
+    """
+    for motor in _all_engines() + [motor.sync_engine for motor in _all_async_engines()]:
+        motor.dispose(close=False)
+
+
 def check_database_connection() -> bool:
     """
     Verifica la conexión a la base de datos.
@@ -79,6 +418,36 @@ def check_database_connection() -> bool:
         logger.error(f"Error de conexión a la base de datos: {str(e)}")
         return False
 
+def for_update_clause(db) -> str:
+    """
+    Devuelve " FOR UPDATE" para bloquear las filas leídas dentro de la transacción,
+    o una cadena vacía en motores que no lo soportan (SQLite bloquea la base completa al escribir).
+    """
+    return "" if db.get_bind().dialect.name == "sqlite" else " FOR UPDATE"
+
+
+def estimate_table_rows(db, table: str) -> Optional[int]:
+    """
+    Devuelve el número aproximado de filas de una tabla según las estadísticas del motor.
+
+    En MySQL/InnoDB se lee information_schema.TABLES.TABLE_ROWS, que no recorre la tabla
+    (puede desviarse del valor real). En otros motores devuelve None para que el llamador
+    use un conteo exacto.
+    """
+    if db.get_bind().dialect.name != "mysql":
+        return None
+    try:
+        query = text("""
+            SELECT TABLE_ROWS
+            FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :tabla
+        """)
+        rows = db.execute(query, {"tabla": table}).scalar()
+        return int(rows) if rows is not None else None
+    except SQLAlchemyError as e:
+        logger.warning(f"No se pudo estimar el número de filas de {table}: {e}")
+        return None
+
 # if __name__ == "__main__":
 #     resultado = check_database_connection()
 #     print("¿Conexión exitosa?:", resultado)
\ No newline at end of file
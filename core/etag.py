@@ -0,0 +1,31 @@
+from typing import Optional
+import hashlib
+
+from fastapi import Request, Response
+
+# ETag fuertes para los listados que los clientes consultan periódicamente.
+# El valor se deriva de las versiones de las tablas involucradas (versiones_cache) y de los
+# parámetros de la consulta, por lo que se calcula sin ejecutar el listado ni serializarlo.
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.sha1(":".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(request: Request, etag: Optional[str]) -> bool:
+    """Indica si algún valor de If-None-Match coincide con el ETag actual."""
+    if etag is None:
+        return False
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match usa comparación débil: se ignora el prefijo W/
+    candidatos = {value.strip().removeprefix("W/") for value in header.split(",")}
+    return etag in candidatos
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
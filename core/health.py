@@ -0,0 +1,82 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional
+import asyncio
+import logging
+import time
+
+from core.config import settings
+from core.database import check_database_connection
+
+# Verificación periódica de la base de datos para /health/ready.
+# Una tarea en segundo plano ejecuta check_database_connection cada
+# HEALTH_PROBE_INTERVAL_SECONDS y guarda el resultado; la sonda solo lee ese resultado,
+# así que consultarla con frecuencia no agrega carga a MySQL ni latencia a las peticiones.
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ProbeResult:
+    ok: bool
+    checked_at: datetime
+    latency_ms: float
+    monotonic: float
+
+
+_ultimo: Optional[ProbeResult] = None
+_tarea: Optional[asyncio.Task] = None
+
+
+def last_probe() -> Optional[ProbeResult]:
+    """Último resultado de la verificación, o None si aún no se ha ejecutado."""
+    return _ultimo
+
+
+def probe_is_stale(result: ProbeResult) -> bool:
+    # Si la tarea dejó de ejecutarse el resultado guardado ya no dice nada del estado actual
+    return time.monotonic() - result.monotonic > settings.HEALTH_PROBE_INTERVAL_SECONDS * 3
+
+
+async def run_probe() -> bool:
+    """Verifica la conexión a la base de datos (en un hilo) y guarda el resultado."""
+    global _ultimo
+    inicio = time.perf_counter()
+    ok = await asyncio.to_thread(check_database_connection)
+    anterior = _ultimo
+    _ultimo = ProbeResult(
+        ok=ok,
+        checked_at=datetime.now(tz=timezone.utc),
+        latency_ms=round((time.perf_counter() - inicio) * 1000, 2),
+        monotonic=time.monotonic(),
+    )
+    if anterior is not None and anterior.ok != ok:
+        logger.warning(f"Base de datos {'disponible' if ok else 'no disponible'} según la verificación periódica")
+    return ok
+
+
+async def _probe_loop() -> None:
+    while True:
+        await asyncio.sleep(settings.HEALTH_PROBE_INTERVAL_SECONDS)
+        try:
+            await run_probe()
+        except Exception as e:
+            logger.error(f"Error en la verificación periódica de la base de datos: {e}")
+
+
+def start_probe() -> None:
+    """Inicia la verificación periódica; se llama desde el lifespan de la aplicación."""
+    global _tarea
+    if _tarea is None or _tarea.done():
+        _tarea = asyncio.create_task(_probe_loop(), name="health-probe")
+
+
+async def stop_probe() -> None:
+    global _tarea
+    if _tarea is not None:
+        _tarea.cancel()
+        try:
+            await _tarea
+        except asyncio.CancelledError:
+            pass
+        _tarea = None
@@ -0,0 +1,172 @@
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Optional
+import json
+import logging
+import random
+import sys
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from core.config import settings
+from core.metrics import http_request_duration
+
+# Instrumentación de SQL por petición.
+# Los eventos del motor acumulan el número de sentencias y el tiempo en base de datos en un
+# objeto guardado en una ContextVar. El objeto es mutable y se crea en el middleware, así que
+# lo comparten el endpoint en el threadpool (Starlette copia el contexto) y las sesiones
+# asíncronas (run_sync conserva el contexto de la corrutina).
+
+logger = logging.getLogger(__name__)
+
+# Sentencias SQL muestreadas: se habilitan con SQL_LOG_LEVEL=DEBUG
+sql_logger = logging.getLogger("avisena.sql")
+sql_logger.setLevel(settings.SQL_LOG_LEVEL.upper())
+
+# Consultas que superan SQL_SLOW_QUERY_MS
+slow_logger = logging.getLogger("avisena.sql.slow")
+
+# Una línea JSON por petición con sus totales
+request_logger = logging.getLogger("avisena.request")
+
+_START_KEY = "avisena_query_start"
+
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    db_time: float = 0.0
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    """Totales de SQL de la petición en curso, o None fuera de una petición HTTP."""
+    return _request_stats.get()
+
+
+def _params_shape(parameters: Any) -> str:
+    # Solo nombres y tipos: los valores pueden contener contraseñas o datos personales
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            return f"{len(parameters)} filas x {_params_shape(parameters[0])}"
+        return f"[{', '.join(type(value).__name__ for value in parameters)}]"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    return type(parameters).__name__
+
+
+def _crud_caller() -> Optional[str]:
+    # Primera función de app.crud en la pila; solo se busca para las consultas lentas
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("app.crud"):
+            return f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info[_START_KEY].pop()
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+
+    elapsed_ms = elapsed * 1000
+    if settings.SQL_SLOW_QUERY_MS and elapsed_ms >= settings.SQL_SLOW_QUERY_MS:
+        slow_logger.warning(json.dumps({
+            "event": "slow_query",
+            "duration_ms": round(elapsed_ms, 2),
+            "crud": _crud_caller(),
+            "statement": " ".join(statement.split()),
+            "params": _params_shape(parameters),
+            "executemany": executemany,
+        }, ensure_ascii=False))
+
+    if sql_logger.isEnabledFor(logging.DEBUG) and random.random() < settings.SQL_LOG_SAMPLE_RATE:
+        sql_logger.debug(f"{' '.join(statement.split())} [{_params_shape(parameters)}] {elapsed_ms:.2f} ms")
+
+
+def _handle_error(context):
+    # La sentencia falló: descartar su marca de inicio para no desalinear la pila
+    conn = context.connection
+    if conn is not None and conn.info.get(_START_KEY):
+        conn.info[_START_KEY].pop()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Registra los eventos de medición en un motor síncrono (o en `async_engine.sync_engine`)."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+class RequestMetricsMiddleware:
+    """
+    Middleware ASGI que mide cada petición HTTP.
+
+    Agrega el encabezado `Server-Timing` (tiempo total, tiempo en base de datos y número de
+    sentencias), registra una línea JSON en el logger `avisena.request` al terminar la respuesta
+    y alimenta el histograma de latencia por ruta de /metrics.
+    En las respuestas en streaming el encabezado refleja solo el trabajo previo al primer bloque;
+    la línea de log incluye todas las consultas.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if settings.SERVER_TIMING_HEADER:
+                    total_ms = (time.perf_counter() - start) * 1000
+                    server_timing = (
+                        f'db;dur={stats.db_time * 1000:.2f};desc="{stats.queries} queries", '
+                        f"total;dur={total_ms:.2f}"
+                    )
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", server_timing.encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            duration = time.perf_counter() - start
+            # Plantilla de la ruta (/rescue/by-id/{id_salvamento}) para no crear una serie por id
+            route = scope.get("route")
+            http_request_duration.observe(
+                duration, scope["method"], getattr(route, "path", "no_encontrada"), str(status_code)
+            )
+            if request_logger.isEnabledFor(logging.INFO):
+                request_logger.info(json.dumps({
+                    "event": "request",
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status_code,
+                    "duration_ms": round(duration * 1000, 2),
+                    "db_queries": stats.queries,
+                    "db_time_ms": round(stats.db_time * 1000, 2),
+                }))
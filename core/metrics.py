@@ -0,0 +1,267 @@
+from bisect import bisect_left
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Métricas en memoria del proceso con salida en el formato de texto de Prometheus.
+# Cada worker de uvicorn/gunicorn expone sus propios valores; Prometheus los agrega por instancia.
+# Se implementan aquí (contadores e histogramas con etiquetas) para no depender de prometheus_client.
+
+_DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pares = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def collect(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = _DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Por etiquetas: [conteo por bucket..., conteo +Inf], suma
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+        self._lock = Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            conteos, suma = self._values.setdefault(labels, ([0] * (len(self.buckets) + 1), [0.0]))
+            conteos[index] += 1
+            suma[0] += value
+
+    def collect(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = sorted((labels, (list(conteos), suma[0])) for labels, (conteos, suma) in self._values.items())
+        for labels, (conteos, suma) in items:
+            acumulado = 0
+            for limite, conteo in zip(self.buckets + (float("inf"),), conteos):
+                acumulado += conteo
+                le = 'le="' + _format_value(limite) + '"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {acumulado}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {suma!r}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {acumulado}"
+
+
+class GaugeCallback:
+    """Gauge cuyo valor se calcula al momento de la lectura (estado del pool, cola de bcrypt)."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        callback: Callable[[], Iterable[Tuple[LabelValues, float]]]
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def collect(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} gauge"
+        for labels, value in self.callback():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+_registry: List = []
+
+
+def register(metric):
+    _registry.append(metric)
+    return metric
+
+
+def render_metrics() -> str:
+    """Todas las métricas registradas en el formato de exposición de texto de Prometheus."""
+    lineas = []
+    for metric in _registry:
+        lineas.extend(metric.collect())
+    return "\n".join(lineas) + "\n"
+
+
+# --- Peticiones HTTP ---
+
+http_request_duration = register(Histogram(
+    "http_request_duration_seconds",
+    "Duración de las peticiones HTTP por ruta",
+    ("method", "route", "status"),
+))
+
+# --- Pool de conexiones ---
+
+db_pool_checkout_wait = register(Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Tiempo para obtener una conexión del pool (espera y apertura de conexiones nuevas)",
+    ("pool",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0),
+))
+
+db_pool_checkout_timeouts = register(Counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts que agotaron pool_timeout",
+    ("pool",),
+))
+
+db_read_routing = register(Counter(
+    "db_read_routing_total",
+    "Sesiones de solo lectura por destino (réplica o primaria) y motivo",
+    ("destino", "motivo"),
+))
+
+_pools: Dict[str, QueuePool] = {}
+
+
+def _pool_state(attribute: str):
+    def collect():
+        for name, pool in sorted(_pools.items()):
+            yield (name,), getattr(pool, attribute)()
+    return collect
+
+
+register(GaugeCallback("db_pool_size", "Conexiones permanentes configuradas", ("pool",), _pool_state("size")))
+register(GaugeCallback("db_pool_checked_out", "Conexiones en uso", ("pool",), _pool_state("checkedout")))
+register(GaugeCallback("db_pool_checked_in", "Conexiones libres en el pool", ("pool",), _pool_state("checkedin")))
+register(GaugeCallback(
+    "db_pool_overflow",
+    "Conexiones de overflow abiertas (negativo mientras el pool no está lleno)",
+    ("pool",),
+    _pool_state("overflow"),
+))
+
+
+def pool_saturation() -> Dict[str, Dict[str, float]]:
+    """Conexiones en uso frente a la capacidad máxima (pool_size + max_overflow) de cada pool."""
+    estado = {}
+    for name, pool in sorted(_pools.items()):
+        capacidad = pool.size() + max(0, pool._max_overflow)
+        en_uso = pool.checkedout()
+        estado[name] = {
+            "checked_out": en_uso,
+            "capacity": capacidad,
+            "saturation": round(en_uso / capacidad, 3) if capacidad else 0.0,
+        }
+    return estado
+
+
+class _TimedCheckoutMixin:
+    # Nombre con el que el pool aparece en las métricas; se asigna en instrument_pool
+    metrics_name = "default"
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            db_pool_checkout_timeouts.inc(self.metrics_name)
+            raise
+        finally:
+            db_pool_checkout_wait.observe(time.perf_counter() - inicio, self.metrics_name)
+
+    def recreate(self):
+        # engine.dispose() reemplaza el pool; el nuevo conserva el nombre y se sigue publicando
+        pool = super().recreate()
+        instrument_pool(self.metrics_name, pool)
+        return pool
+
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    """QueuePool que mide el tiempo de checkout."""
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool que mide el tiempo de checkout."""
+
+
+def instrument_pool(name: str, pool) -> None:
+    """Publica el estado del pool de un motor bajo la etiqueta `pool=name`."""
+    if isinstance(pool, _TimedCheckoutMixin):
+        pool.metrics_name = name
+    if isinstance(pool, QueuePool):
+        _pools[name] = pool
+
+
+# --- Autenticación y permisos ---
+
+password_hash_duration = register(Histogram(
+    "password_hash_duration_seconds",
+    "Duración de las operaciones de bcrypt (hash y verificación)",
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0, 5.0),
+))
+
+password_hash_queue_wait = register(Histogram(
+    "password_hash_queue_wait_seconds",
+    "Espera en cola del pool de bcrypt antes de ejecutar la operación",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+))
+
+password_hash_rejected = register(Counter(
+    "password_hash_rejected_total",
+    "Operaciones de bcrypt rechazadas por saturación del pool",
+))
+
+login_admission_rejected = register(Counter(
+    "login_admission_rejected_total",
+    "Intentos de login rechazados con 429 antes de verificar la contraseña",
+    ("motivo",),
+))
+
+permission_checks = register(Counter(
+    "permission_checks_total",
+    "Verificaciones de permisos por módulo, acción y resultado",
+    ("modulo", "accion", "resultado"),
+))
+
+permission_matrix_loads = register(Counter(
+    "permission_matrix_loads_total",
+    "Lecturas completas de la tabla permisos",
+))
@@ -0,0 +1,29 @@
+from typing import Any, Dict
+import base64
+import json
+
+# Cursores opacos para paginación por clave (keyset).
+# El cliente solo debe devolver el valor recibido en `next_cursor`; el contenido es la
+# clave de ordenamiento de la última fila entregada, serializada como JSON en base64 url-safe.
+
+
+def encode_cursor(data: Dict[str, Any]) -> str:
+    raw = json.dumps(data, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Decodifica un cursor generado por encode_cursor.
+
+    Raises:
+        ValueError: Si el cursor no es válido.
+    """
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(cursor + padding))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Cursor inválido") from e
+    if not isinstance(data, dict):
+        raise ValueError("Cursor inválido")
+    return data
@@ -1,7 +1,17 @@
 from passlib.context import CryptContext
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
+from threading import BoundedSemaphore, Lock
+from typing import Callable, Optional, Tuple
+import asyncio
+import time
+import uuid
+from core.cache import TTLCache
 from core.config import settings
+from core.metrics import (
+    GaugeCallback, password_hash_duration, password_hash_queue_wait, password_hash_rejected, register
+)
 
 # Configurar hashing de contraseñas
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -14,6 +24,135 @@ def get_hashed_password(password: str):
 def verify_password(plain_password: str, hashed_password: str):
     return pwd_context.verify(plain_password, hashed_password)
 
+# bcrypt es costoso en CPU (cientos de ms). Las versiones async se ejecutan en un pool de hilos
+# dedicado (la extensión de bcrypt libera el GIL) para no bloquear el event loop de uvicorn.
+# El número de cupos limita el trabajo en curso + en cola; al agotarse se rechaza en lugar de encolar.
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="bcrypt"
+)
+_hash_slots = BoundedSemaphore(settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_MAX_QUEUE)
+
+
+def shutdown_hash_executor() -> None:
+    """Detiene el pool de bcrypt al apagar el proceso, descartando las tareas en cola."""
+    _hash_executor.shutdown(wait=False, cancel_futures=True)
+
+
+class PasswordHashBusy(Exception):
+    """El pool de hashing está saturado y la operación fue rechazada."""
+
+
+class HashMetrics:
+    """Contadores de espera en cola y duración de las operaciones de bcrypt."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.operaciones = 0
+        self.rechazadas = 0
+        self.en_curso = 0
+        self.cola_total = 0.0
+        self.cola_max = 0.0
+        self.duracion_total = 0.0
+        self.duracion_max = 0.0
+        # Promedio móvil exponencial: sigue la duración actual (p. ej. con la CPU saturada)
+        self.duracion_reciente = 0.0
+
+    def started(self) -> None:
+        with self._lock:
+            self.en_curso += 1
+
+    def finished(self) -> None:
+        with self._lock:
+            self.en_curso -= 1
+
+    def record(self, espera: float, duracion: float) -> None:
+        with self._lock:
+            if self.operaciones == 0:
+                self.duracion_reciente = duracion
+            else:
+                self.duracion_reciente += 0.2 * (duracion - self.duracion_reciente)
+            self.operaciones += 1
+            self.cola_total += espera
+            self.cola_max = max(self.cola_max, espera)
+            self.duracion_total += duracion
+            self.duracion_max = max(self.duracion_max, duracion)
+        password_hash_queue_wait.observe(espera)
+        password_hash_duration.observe(duracion)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            n = self.operaciones or 1
+            return {
+                "operaciones": self.operaciones,
+                "rechazadas": self.rechazadas,
+                "en_curso": self.en_curso,
+                "cola_promedio_s": self.cola_total / n,
+                "cola_max_s": self.cola_max,
+                "duracion_promedio_s": self.duracion_total / n,
+                "duracion_max_s": self.duracion_max,
+                "duracion_reciente_s": self.duracion_reciente,
+            }
+
+    def estimated_wait(self) -> float:
+        """Segundos que esperaría en cola una operación que llegara ahora."""
+        en_cola = self.en_curso - settings.PASSWORD_HASH_WORKERS
+        if en_cola < 0:
+            return 0.0
+        return (en_cola + 1) / settings.PASSWORD_HASH_WORKERS * self.duracion_reciente
+
+
+hash_metrics = HashMetrics()
+
+register(GaugeCallback(
+    "password_hash_in_flight",
+    "Operaciones de bcrypt en ejecución o en cola",
+    (),
+    lambda: [((), hash_metrics.en_curso)],
+))
+
+
+def _release_hash_slot(_futuro) -> None:
+    # Callback del Future del pool: se ejecuta cuando bcrypt termina o cuando la tarea se
+    # cancela antes de empezar, nunca mientras sigue en ejecución
+    hash_metrics.finished()
+    _hash_slots.release()
+
+
+async def _run_hash(func: Callable, *args):
+    if not _hash_slots.acquire(blocking=False):
+        hash_metrics.rechazadas += 1
+        password_hash_rejected.inc()
+        raise PasswordHashBusy("Demasiadas operaciones de contraseña en curso")
+
+    encolado = time.perf_counter()
+
+    def tarea():
+        inicio = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            hash_metrics.record(inicio - encolado, time.perf_counter() - inicio)
+
+    hash_metrics.started()
+    try:
+        futuro = _hash_executor.submit(tarea)
+    except BaseException:
+        _release_hash_slot(None)
+        raise
+    # El cupo se libera del lado del pool: si la corrutina se cancela (cliente desconectado)
+    # mientras bcrypt sigue ejecutándose, el cupo y en_curso siguen ocupados hasta que termine
+    futuro.add_done_callback(_release_hash_slot)
+    return await asyncio.wrap_future(futuro)
+
+# Versión async de get_hashed_password que no bloquea el event loop
+async def get_hashed_password_async(password: str):
+    return await _run_hash(get_hashed_password, password)
+
+# Versión async de verify_password que no bloquea el event loop
+async def verify_password_async(plain_password: str, hashed_password: str):
+    return await _run_hash(verify_password, plain_password, hashed_password)
+
 # Función para crear un token JWT
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -22,13 +161,67 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, settings.jwt_secret, algorithm=settings.jwt_algorithm)
     return encoded_jwt
 
-# Función para verificar si un token JWT es valido
-def verify_token(token: str):
+# Refresh token: JWT con su propio jti y la familia del login que lo originó. Se distingue del
+# access token por el claim "typ", así que ninguno de los dos sirve en lugar del otro.
+_REFRESH_TYPE = "refresh"
+
+
+def create_refresh_token(id_usuario: int, familia: Optional[str] = None) -> Tuple[str, dict]:
+    """
+    Crea un refresh token para el usuario. Sin `familia` se inicia una nueva (login).
+    Devuelve el token y sus claims (jti, fam, exp) para registrarlo en la base de datos.
+    """
+    expire = datetime.now(tz=timezone.utc) + timedelta(days=settings.jwt_refresh_token_expire_days)
+    claims = {
+        "sub": str(id_usuario),
+        "typ": _REFRESH_TYPE,
+        "jti": uuid.uuid4().hex,
+        "fam": familia or uuid.uuid4().hex,
+        "exp": expire,
+    }
+    # jwt.encode convierte "exp" a entero sobre el dict recibido; se le pasa una copia
+    return jwt.encode(dict(claims), settings.jwt_secret, algorithm=settings.jwt_algorithm), claims
+
+
+def decode_refresh_token(token: str) -> Optional[dict]:
+    """Claims de un refresh token con firma válida y sin expirar, o None."""
+    try:
+        payload = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
+    except JWTError:
+        return None
+    if payload.get("typ") != _REFRESH_TYPE or not all(k in payload for k in ("sub", "jti", "fam")):
+        return None
+    return payload
+
+# Caché de tokens ya decodificados para no repetir la verificación de firma en cada petición
+_token_cache = TTLCache(ttl=settings.TOKEN_CACHE_TTL_SECONDS, max_size=settings.TOKEN_CACHE_MAX_SIZE)
+
+# Función para decodificar un token JWT y obtener sus claims
+def decode_access_token(token: str) -> Optional[dict]:
+    payload = _token_cache.get(token)
+    if payload is not None:
+        # Una entrada nunca vive más que el token, pero se revisa por si el reloj avanzó
+        if payload.get("exp", 0) > time.time():
+            return payload
+        _token_cache.pop(token)
+        return None
     try:
         payload = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
-        user_id = payload.get("sub")
-        return int(user_id) if user_id is not None else None
     except jwt.ExpiredSignatureError: # Token ha expirado
         return None
     except JWTError:
-        return None
\ No newline at end of file
+        return None
+    if payload.get("typ") == _REFRESH_TYPE:
+        return None
+    restante = payload.get("exp", 0) - time.time()
+    if restante > 0:
+        _token_cache.set(token, payload, ttl=min(restante, settings.TOKEN_CACHE_TTL_SECONDS))
+    return payload
+
+# Función para verificar si un token JWT es valido
+def verify_token(token: str):
+    payload = decode_access_token(token)
+    if payload is None:
+        return None
+    user_id = payload.get("sub")
+    return int(user_id) if user_id is not None else None
\ No newline at end of file
@@ -0,0 +1,84 @@
+from datetime import date, datetime, time
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type, Union, get_args, get_origin
+import json
+
+from fastapi import Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional; sin él se usa json de la librería estándar
+    orjson = None
+
+# Serialización rápida para listados grandes.
+# Las filas vienen de consultas propias (datos confiables), así que en lugar de validar cada
+# fila con Pydantic (incluido EmailStr con email_validator) solo se proyectan los campos del
+# modelo de salida y se convierten los tipos que el driver devuelve distinto (tinyint -> bool,
+# DECIMAL -> float). El resultado es el mismo JSON que produce FastAPI con response_model.
+
+_CONVERSIONES: Dict[Any, Callable[[Any], Any]] = {
+    bool: bool,
+    int: int,
+    float: float,
+}
+
+
+def _converter(annotation: Any) -> Optional[Callable[[Any], Any]]:
+    # Optional[X] -> X
+    if get_origin(annotation) is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        annotation = args[0] if len(args) == 1 else None
+    return _CONVERSIONES.get(annotation)
+
+
+@lru_cache(maxsize=None)
+def _plan(model: Type[BaseModel]) -> Tuple[Tuple[str, Optional[Callable[[Any], Any]]], ...]:
+    return tuple((name, _converter(field.annotation)) for name, field in model.model_fields.items())
+
+
+def rows_to_dicts(rows: Iterable[Any], model: Type[BaseModel]) -> List[Dict[str, Any]]:
+    """Proyecta filas (RowMapping o dict) a los campos de `model` sin validar."""
+    plan = _plan(model)
+    result = []
+    for row in rows:
+        item = {}
+        for name, convert in plan:
+            value = row[name]
+            item[name] = convert(value) if convert is not None and value is not None else value
+        result.append(item)
+    return result
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def fast_list_response(
+    rows: Iterable[Any],
+    model: Type[BaseModel],
+    headers: Optional[Dict[str, str]] = None
+) -> FastJSONResponse:
+    """
+    Respuesta JSON para un listado de filas de base de datos con la forma de `model`,
+    sin pasar por la validación de response_model.
+    """
+    return FastJSONResponse(rows_to_dicts(rows, model), headers=headers)
@@ -1,9 +1,64 @@
+from contextlib import asynccontextmanager
+import asyncio
+import logging
+import time
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.router import auth, type_chickens, users, fincas, rescue, sheds
+from app.router import auth, type_chickens, users, fincas, rescue, sheds, income_hens, metrics, health
+from app.crud import sheds as crud_sheds
+from app.crud import type_chickens as crud_type_chickens
+from app.crud.permisos import get_permissions_matrix
+from core.config import settings
+from core.database import ESCRITURA_HEADER, ReadYourWritesMiddleware, SessionLocal, dispose_engines, replicas, warm_pools
+from core.health import run_probe, start_probe, stop_probe
+from core.instrumentation import RequestMetricsMiddleware
+from core.security import shutdown_hash_executor
+
+logging.basicConfig(level=settings.LOG_LEVEL.upper(), format="%(asctime)s %(levelname)s %(name)s %(message)s")
+
+logger = logging.getLogger(__name__)
+
+
+def _prime_caches() -> None:
+    # Matriz de permisos, tipos de gallina y galpones activos en sus cachés en memoria, para
+    # que las primeras peticiones no paguen la carga
+    db = SessionLocal()
+    try:
+        get_permissions_matrix(db)
+        crud_type_chickens.get_all_type_chickens(db)
+        activos = crud_sheds.get_active_sheds(db)
+        logger.info(f"Datos de referencia precargados ({len(activos)} galpones activos)")
+    except Exception as e:
+        logger.warning(f"No se pudieron precargar los datos de referencia: {e}")
+    finally:
+        db.close()
+
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    inicio = time.perf_counter()
+    # La primera verificación también deja listo el resultado que sirve /health/ready
+    if await run_probe():
+        await warm_pools(settings.DB_WARMUP_CONNECTIONS)
+        if settings.WARMUP_CACHES:
+            await asyncio.to_thread(_prime_caches)
+        logger.info(f"Calentamiento completado en {time.perf_counter() - inicio:.2f} s")
+    else:
+        # Se arranca igual: las conexiones se abrirán cuando la base de datos responda
+        logger.warning("Base de datos no disponible al arrancar; se omite el calentamiento")
 
-app = FastAPI()
+    start_probe()
+
+    yield
+
+    await stop_probe()
+    # uvicorn ya terminó las peticiones en curso: se cierran las conexiones y el pool de bcrypt
+    await dispose_engines()
+    shutdown_hash_executor()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Incluir en el objeto app los routers
 app.include_router(users.router, prefix="/users", tags=["users"])
@@ -13,16 +68,28 @@ app.include_router(auth.router, prefix='/access', tags=["login"])
 app.include_router(rescue.router, prefix="/rescue", tags=["rescue"])
 app.include_router(sheds.router, prefix="/sheds", tags=["sheds"])
 app.include_router(type_chickens.router, prefix="/type_chicken", tags=['type_chicken'])   
+app.include_router(income_hens.router, prefix="/income_hens", tags=["income_hens"])
+app.include_router(health.router, prefix="/health", tags=["health"])
+if settings.METRICS_ENABLED:
+    app.include_router(metrics.router, tags=["metrics"])
 
 # Configuración de CORS para permitir todas las solicitudes desde cualquier origen
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Permitir solicitudes desde cualquier origen
     allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE"],  # Permitir estos métodos HTTP
+    allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE"],  # Permitir estos métodos HTTP
     allow_headers=["*"],  # Permitir cualquier encabezado en las solicitudes
+    expose_headers=["ETag", "Server-Timing", ESCRITURA_HEADER],  # Permitir que los clientes web lean el ETag, los tiempos y la marca de escritura
 )
 
+# Con réplicas, marcar las respuestas de escritura para que el cliente lea sus propios cambios
+if replicas:
+    app.add_middleware(ReadYourWritesMiddleware)
+
+# Server-Timing y log por petición con el número de consultas y el tiempo en base de datos
+app.add_middleware(RequestMetricsMiddleware)
+
 @app.get("/")
 def read_root():
     return {
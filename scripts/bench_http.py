@@ -0,0 +1,346 @@
+"""
+Benchmark HTTP reproducible de los routers de la API.
+
+Crea una base SQLite con datos sembrados, levanta `main:app` en el mismo proceso (httpx con
+transporte ASGI, incluyendo el lifespan de la aplicación) y genera tráfico mixto autenticado
+con la concurrencia indicada. Para cada endpoint reporta latencias p50/p95/p99, throughput,
+errores y consultas SQL por petición, y escribe el resultado en JSON para comparar versiones.
+
+Uso:
+    python -m scripts.bench_http --requests 2000 --concurrency 20 --output bench.json
+    python -m scripts.bench_http --db /tmp/avisena_bench.db --reuse-db
+
+Como la configuración se lee al importar `core.config`, el script define DATABASE_URL antes de
+importar la aplicación; no usa la base de datos configurada en .env.
+"""
+from contextvars import ContextVar
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = Path(__file__).resolve().parent.parent
+PASSWORD = "benchmark123"
+
+# Peso relativo de cada operación en el tráfico mixto
+TRAFFIC = [
+    ("GET /sheds/all", 10),
+    ("GET /sheds/by-id", 8),
+    ("GET /fincas/by-id", 4),
+    ("GET /type_chicken/all-type-chickens", 6),
+    ("GET /rescue/by-id", 8),
+    ("POST /rescue/by-ids", 4),
+    ("GET /rescue/all-pag", 12),
+    ("GET /rescue/all-pag-by-date", 10),
+    ("GET /rescue/all-cursor", 8),
+    ("GET /rescue/stats", 6),
+    ("POST /rescue/crear", 6),
+    ("GET /users/all-except-admins-pag", 6),
+    ("GET /users/by-email", 6),
+    ("GET /income_hens/all-cursor", 4),
+    ("POST /income_hens/bulk", 2),
+    ("POST /access/token", 2),
+]
+
+
+def _create_database(path: Path, args) -> None:
+    """Crea el esquema (bench_schema.sql + sql/*.sql) y siembra datos deterministas."""
+    from passlib.context import CryptContext
+
+    if path.exists():
+        path.unlink()
+    conn = sqlite3.connect(path)
+    conn.executescript((ROOT / "scripts" / "bench_schema.sql").read_text())
+
+    # Las migraciones de sql/ pueden cargar datos derivados (acumulados), así que se aplican
+    # después de sembrar las tablas base que consultan.
+    rnd = random.Random(args.seed)
+    pass_hash = CryptContext(schemes=["bcrypt"]).hash(PASSWORD)
+
+    conn.executemany("INSERT INTO roles VALUES (?, ?)", [(1, "superadmin"), (2, "admin"), (3, "operario")])
+    conn.executemany(
+        "INSERT INTO permisos VALUES (?, ?, 1, 1, 1, 1)",
+        [(rol, modulo) for rol in (1, 2) for modulo in range(1, 10)]
+    )
+    conn.executemany(
+        "INSERT INTO permisos VALUES (3, ?, 1, 0, 1, 0)",
+        [(modulo,) for modulo in range(3, 10)]
+    )
+    conn.execute(
+        "INSERT INTO usuarios (nombre, id_rol, email, telefono, documento, pass_hash, estado) "
+        "VALUES ('Administrador', 1, 'bench.admin@avisena.com', '3000000000', '100000000', ?, 1)",
+        (pass_hash,)
+    )
+    conn.executemany(
+        "INSERT INTO usuarios (nombre, id_rol, email, telefono, documento, pass_hash, estado) "
+        "VALUES (?, 3, ?, '3001234567', ?, ?, 1)",
+        [(f"Operario {i}", f"bench{i}@avisena.com", f"{200000000 + i}", pass_hash) for i in range(args.users)]
+    )
+    conn.executemany(
+        "INSERT INTO fincas (nombre, longitud, latitud, estado) VALUES (?, ?, ?, 1)",
+        [(f"Finca {i}", -74 + i / 10, 4 + i / 10) for i in range(args.farms)]
+    )
+    conn.executemany(
+        "INSERT INTO galpones (id_finca, nombre, capacidad, cant_actual, estado) VALUES (?, ?, 20000, 15000, 1)",
+        [(1 + i % args.farms, f"Galpon {i}") for i in range(args.sheds)]
+    )
+    conn.executemany(
+        "INSERT INTO tipo_gallinas (raza, descripcion) VALUES (?, ?)",
+        [("Lohmann Brown", "Ponedora"), ("Hy-Line W-36", "Ponedora"), ("Isa Brown", "Ponedora"), ("Ross 308", "Engorde")]
+    )
+    inicio = date(2023, 1, 1)
+    conn.executemany(
+        "INSERT INTO salvamento (id_galpon, fecha, id_tipo_gallina, cantidad_gallinas) VALUES (?, ?, ?, ?)",
+        [
+            (rnd.randint(1, args.sheds), (inicio + timedelta(days=rnd.randint(0, 729))).isoformat(),
+             rnd.randint(1, 4), rnd.randint(1, 20))
+            for _ in range(args.rescues)
+        ]
+    )
+    apply_migrations(conn)
+    conn.commit()
+    conn.close()
+
+
+def apply_migrations(conn: sqlite3.Connection) -> None:
+    """Aplica sql/*.sql (escritos para MySQL) sobre una base SQLite."""
+    for migration in sorted((ROOT / "sql").glob("*.sql")):
+        # INSERT IGNORE de MySQL se escribe INSERT OR IGNORE en SQLite
+        conn.executescript(migration.read_text().replace("INSERT IGNORE INTO", "INSERT OR IGNORE INTO"))
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latencias: List[float] = []
+        self.errores = 0
+        self.consultas = 0
+        self.status: Dict[int, int] = {}
+
+    def summary(self, elapsed: float) -> dict:
+        lat = sorted(self.latencias)
+        n = len(lat)
+
+        def percentil(p: float) -> Optional[float]:
+            if not n:
+                return None
+            return round(lat[min(n - 1, max(0, int(round(p / 100 * n)) - 1))] * 1000, 3)
+
+        return {
+            "requests": n,
+            "errors": self.errores,
+            "status": {str(code): count for code, count in sorted(self.status.items())},
+            "throughput_rps": round(n / elapsed, 2) if elapsed else None,
+            "latency_ms": {
+                "p50": percentil(50),
+                "p95": percentil(95),
+                "p99": percentil(99),
+                "mean": round(sum(lat) / n * 1000, 3) if n else None,
+                "max": round(lat[-1] * 1000, 3) if n else None,
+            },
+            "db_queries_per_request": round(self.consultas / n, 2) if n else None,
+        }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def _run(args) -> dict:
+    import httpx
+    from sqlalchemy import event
+
+    from main import app
+    from core.database import async_engine, engine
+
+    # Contador de sentencias SQL por petición: el contexto se copia al threadpool,
+    # así que el objeto mutable se comparte entre el endpoint y el cliente.
+    consultas_actuales: ContextVar[Optional[list]] = ContextVar("consultas_actuales", default=None)
+
+    def contar(*_):
+        contador = consultas_actuales.get()
+        if contador is not None:
+            contador[0] += 1
+
+    for eng in (engine, async_engine.sync_engine):
+        eng.echo = False
+        event.listen(eng, "before_cursor_execute", contar)
+
+    rnd = random.Random(args.seed)
+    operaciones = [name for name, _ in TRAFFIC]
+    pesos = [weight for _, weight in TRAFFIC]
+    stats = {name: EndpointStats() for name in operaciones}
+
+    def build_request(name: str):
+        fecha_inicio = date(2023, 1, 1) + timedelta(days=rnd.randint(0, 700))
+        fechas = {"fecha_inicio": fecha_inicio.isoformat(), "fecha_fin": (fecha_inicio + timedelta(days=30)).isoformat()}
+        if name == "GET /sheds/by-id":
+            return "GET", f"/sheds/by-id/{rnd.randint(1, args.sheds)}", {}, None
+        if name == "GET /fincas/by-id":
+            return "GET", f"/fincas/by-id/{rnd.randint(1, args.farms)}", {}, None
+        if name == "GET /rescue/by-id":
+            return "GET", f"/rescue/by-id/{rnd.randint(1, args.rescues)}", {}, None
+        if name == "POST /rescue/by-ids":
+            return "POST", "/rescue/by-ids", {}, {"ids": [rnd.randint(1, args.rescues) for _ in range(50)]}
+        if name == "GET /rescue/all-pag":
+            return "GET", "/rescue/all-pag", {"page": rnd.randint(1, max(1, args.rescues // 20)), "page_size": 20}, None
+        if name == "GET /rescue/all-pag-by-date":
+            return "GET", "/rescue/all-pag-by-date", {**fechas, "page": rnd.randint(1, 3), "page_size": 20}, None
+        if name == "GET /rescue/all-cursor":
+            return "GET", "/rescue/all-cursor", {"page_size": 20}, None
+        if name == "GET /rescue/stats":
+            return "GET", "/rescue/stats", {**fechas, "periodo": rnd.choice(["dia", "semana", "mes"])}, None
+        if name == "POST /rescue/crear":
+            body = {
+                "id_galpon": rnd.randint(1, args.sheds),
+                "fecha": fechas["fecha_inicio"],
+                "id_tipo_gallina": rnd.randint(1, 4),
+                "cantidad_gallinas": rnd.randint(1, 5),
+            }
+            return "POST", "/rescue/crear", {}, body
+        if name == "GET /users/all-except-admins-pag":
+            return "GET", "/users/all-except-admins-pag", {"page": rnd.randint(1, 5), "page_size": 20}, None
+        if name == "GET /users/by-email":
+            return "GET", "/users/by-email", {"email": f"bench{rnd.randrange(args.users)}@avisena.com"}, None
+        if name == "GET /income_hens/all-cursor":
+            return "GET", "/income_hens/all-cursor", {"page_size": 20}, None
+        if name == "POST /income_hens/bulk":
+            body = [
+                {
+                    "id_galpon": rnd.randint(1, args.sheds),
+                    "fecha": fechas["fecha_inicio"],
+                    "id_tipo_gallina": rnd.randint(1, 4),
+                    "cantidad_gallinas": rnd.randint(50, 200),
+                }
+                for _ in range(20)
+            ]
+            return "POST", "/income_hens/bulk", {}, body
+        if name == "POST /access/token":
+            return "POST", "/access/token", {}, {"username": "bench.admin@avisena.com", "password": PASSWORD}
+        return "GET", name.split(" ", 1)[1], {}, None
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            login = await client.post("/access/token", data={"username": "bench.admin@avisena.com", "password": PASSWORD})
+            login.raise_for_status()
+            headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+            async def ejecutar(name: str, registrar: bool):
+                method, path, params, body = build_request(name)
+                contador = [0]
+                token = consultas_actuales.set(contador)
+                inicio = time.perf_counter()
+                try:
+                    if name == "POST /access/token":
+                        response = await client.post(path, data=body)
+                    else:
+                        response = await client.request(method, path, params=params, json=body, headers=headers)
+                    status = response.status_code
+                except Exception:
+                    status = 599
+                finally:
+                    consultas_actuales.reset(token)
+                duracion = time.perf_counter() - inicio
+                if registrar:
+                    item = stats[name]
+                    item.latencias.append(duracion)
+                    item.consultas += contador[0]
+                    item.status[status] = item.status.get(status, 0) + 1
+                    if status >= 500 or status in (401, 403, 422):
+                        item.errores += 1
+
+            async def worker(cola: asyncio.Queue, registrar: bool):
+                while True:
+                    try:
+                        name = cola.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    await ejecutar(name, registrar)
+
+            async def fase(total: int, registrar: bool) -> float:
+                cola: asyncio.Queue = asyncio.Queue()
+                for name in rnd.choices(operaciones, weights=pesos, k=total):
+                    cola.put_nowait(name)
+                inicio = time.perf_counter()
+                await asyncio.gather(*(worker(cola, registrar) for _ in range(args.concurrency)))
+                return time.perf_counter() - inicio
+
+            await fase(args.warmup, registrar=False)
+            elapsed = await fase(args.requests, registrar=True)
+
+    # Cierra las conexiones de aiosqlite; sus hilos mantendrían vivo el proceso
+    await async_engine.dispose()
+    engine.dispose()
+
+    total = sum(len(item.latencias) for item in stats.values())
+    return {
+        "meta": {
+            "timestamp": datetime.now(tz=timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "dataset": {"users": args.users, "farms": args.farms, "sheds": args.sheds, "rescues": args.rescues},
+        },
+        "total": {
+            "requests": total,
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(total / elapsed, 2) if elapsed else None,
+        },
+        "endpoints": {name: item.summary(elapsed) for name, item in stats.items() if item.latencias},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTTP de la API AVISENA")
+    parser.add_argument("--requests", type=int, default=2000, help="Peticiones medidas")
+    parser.add_argument("--warmup", type=int, default=200, help="Peticiones previas no medidas")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--farms", type=int, default=5)
+    parser.add_argument("--sheds", type=int, default=40)
+    parser.add_argument("--rescues", type=int, default=50000)
+    parser.add_argument("--db", type=Path, default=Path(tempfile.gettempdir()) / "avisena_bench.db")
+    parser.add_argument("--reuse-db", action="store_true", help="No recrear la base si ya existe")
+    parser.add_argument("--output", type=Path, help="Archivo JSON de resultados (por defecto, salida estándar)")
+    args = parser.parse_args()
+
+    if not (args.reuse_db and args.db.exists()):
+        _create_database(args.db, args)
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{args.db}"
+    os.environ["ASYNC_DATABASE_URL"] = f"sqlite+aiosqlite:///{args.db}"
+    os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+    # Todas las peticiones llegan desde la misma IP y cuenta: los límites del login las rechazarían
+    os.environ.setdefault("LOGIN_ADMISSION_ENABLED", "false")
+    sys.path.insert(0, str(ROOT))
+
+    resultado = asyncio.run(_run(args))
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.output:
+        args.output.write_text(texto)
+        print(f"Resultados escritos en {args.output}")
+    else:
+        print(texto)
+
+
+if __name__ == "__main__":
+    main()
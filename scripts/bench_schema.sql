@@ -0,0 +1,67 @@
+-- Esquema base (SQLite) para la base de datos de benchmark de scripts/bench_http.py.
+-- Las tablas agregadas por migraciones se crean después con los archivos de sql/.
+CREATE TABLE roles (
+    id_rol     INTEGER PRIMARY KEY,
+    nombre_rol VARCHAR(50) NOT NULL
+);
+
+CREATE TABLE usuarios (
+    id_usuario INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre     VARCHAR(80) NOT NULL,
+    id_rol     INT NOT NULL REFERENCES roles (id_rol),
+    email      VARCHAR(100) NOT NULL UNIQUE,
+    telefono   VARCHAR(15) NOT NULL,
+    documento  VARCHAR(20) NOT NULL,
+    pass_hash  VARCHAR(255) NOT NULL,
+    estado     BOOLEAN NOT NULL DEFAULT 1
+);
+
+CREATE TABLE permisos (
+    id_rol      INT NOT NULL,
+    id_modulo   INT NOT NULL,
+    insertar    BOOLEAN NOT NULL DEFAULT 0,
+    actualizar  BOOLEAN NOT NULL DEFAULT 0,
+    seleccionar BOOLEAN NOT NULL DEFAULT 0,
+    borrar      BOOLEAN NOT NULL DEFAULT 0,
+    PRIMARY KEY (id_rol, id_modulo)
+);
+
+CREATE TABLE fincas (
+    id_finca INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre   VARCHAR(100) NOT NULL,
+    longitud REAL NOT NULL,
+    latitud  REAL NOT NULL,
+    estado   BOOLEAN NOT NULL DEFAULT 1
+);
+
+CREATE TABLE galpones (
+    id_galpon   INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_finca    INT NOT NULL REFERENCES fincas (id_finca),
+    nombre      VARCHAR(70) NOT NULL,
+    capacidad   REAL NOT NULL,
+    cant_actual REAL NOT NULL,
+    estado      BOOLEAN NOT NULL DEFAULT 1
+);
+
+CREATE TABLE tipo_gallinas (
+    id_tipo_gallinas INTEGER PRIMARY KEY AUTOINCREMENT,
+    raza             VARCHAR(50) NOT NULL,
+    descripcion      VARCHAR(255) NOT NULL
+);
+
+CREATE TABLE salvamento (
+    id_salvamento     INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_galpon         INT NOT NULL REFERENCES galpones (id_galpon),
+    fecha             DATE NOT NULL,
+    id_tipo_gallina   INT NOT NULL REFERENCES tipo_gallinas (id_tipo_gallinas),
+    cantidad_gallinas INT NOT NULL
+);
+
+-- En MySQL la crea sql/005_ingreso_gallinas.sql (AUTO_INCREMENT); aquí con la sintaxis de SQLite
+CREATE TABLE ingreso_gallinas (
+    id_ingreso        INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_galpon         INT NOT NULL REFERENCES galpones (id_galpon),
+    fecha             DATE NOT NULL,
+    id_tipo_gallina   INT NOT NULL REFERENCES tipo_gallinas (id_tipo_gallinas),
+    cantidad_gallinas INT NOT NULL
+);
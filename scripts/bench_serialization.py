@@ -0,0 +1,98 @@
+"""
+Compara la serialización estándar de FastAPI (validar con response_model y codificar con json)
+contra la serialización rápida de core/serialization.py sobre un listado de usuarios.
+
+Las filas se obtienen como RowMapping desde una base SQLite en memoria, igual que en app/crud.
+
+Uso:
+    python -m scripts.bench_serialization --rows 50000 --repeat 5
+"""
+from typing import List
+import argparse
+import json
+import statistics
+import time
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, text
+
+from app.schemas.users import UserOut
+from core.serialization import fast_list_response
+
+
+def _load_rows(n: int):
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE usuarios (
+                id_usuario INTEGER PRIMARY KEY, nombre TEXT, id_rol INT, email TEXT,
+                telefono TEXT, documento TEXT, pass_hash TEXT, estado INT, nombre_rol TEXT
+            )
+        """))
+        conn.execute(
+            text("""
+                INSERT INTO usuarios VALUES (
+                    :id_usuario, :nombre, 3, :email, '3001234567', :documento, 'hash', 1, 'operario'
+                )
+            """),
+            [
+                {
+                    "id_usuario": i,
+                    "nombre": f"Usuario {i}",
+                    "email": f"usuario{i}@avisena.com",
+                    "documento": f"{10000000 + i}"
+                }
+                for i in range(1, n + 1)
+            ]
+        )
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT * FROM usuarios")).mappings().all()
+
+
+def _standard(rows, adapter: TypeAdapter) -> bytes:
+    # Mismo recorrido que FastAPI con response_model=List[UserOut] y JSONResponse
+    validated = adapter.validate_python(rows, from_attributes=True)
+    content = adapter.dump_python(validated, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def _fast(rows) -> bytes:
+    return fast_list_response(rows, UserOut).body
+
+
+def _measure(func, repeat: int) -> List[float]:
+    tiempos = []
+    for _ in range(repeat):
+        inicio = time.perf_counter()
+        func()
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de serialización de listados")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = _load_rows(args.rows)
+    adapter = TypeAdapter(List[UserOut])
+
+    # Ambos caminos deben producir el mismo documento
+    assert json.loads(_standard(rows, adapter)) == json.loads(_fast(rows))
+
+    estandar = _measure(lambda: _standard(rows, adapter), args.repeat)
+    rapido = _measure(lambda: _fast(rows), args.repeat)
+
+    resultado = {
+        "rows": args.rows,
+        "repeat": args.repeat,
+        "standard_median_s": round(statistics.median(estandar), 4),
+        "fast_median_s": round(statistics.median(rapido), 4),
+        "speedup": round(statistics.median(estandar) / statistics.median(rapido), 2),
+    }
+    print(json.dumps(resultado, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Reconstruye el acumulado diario de salvamentos (tabla salvamento_diario).
+
+Uso:
+    python -m scripts.rebuild_rescue_rollup
+    python -m scripts.rebuild_rescue_rollup --desde 2024-01-01 --hasta 2024-12-31
+"""
+from datetime import date
+import argparse
+import logging
+
+from app.crud.rescue_stats import rebuild_rescue_rollup
+from core.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstruye la tabla salvamento_diario")
+    parser.add_argument("--desde", type=date.fromisoformat, help="Fecha de inicio (YYYY-MM-DD)")
+    parser.add_argument("--hasta", type=date.fromisoformat, help="Fecha de fin (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    if (args.desde is None) != (args.hasta is None):
+        parser.error("--desde y --hasta deben usarse juntas")
+
+    db = SessionLocal()
+    try:
+        filas = rebuild_rescue_rollup(db, args.desde, args.hasta)
+        print(f"Acumulado reconstruido: {filas} filas")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Servidor de producción: varios workers de uvicorn creados con fork sobre un mismo socket.
+
+    python serve.py
+
+- La aplicación (main:app y todas sus dependencias) se importa una vez en el proceso padre
+  antes de crear los workers, que comparten esa memoria copy-on-write.
+- Cada worker atiende como máximo MAX_REQUESTS (+ variación) peticiones y termina de forma
+  ordenada; el padre lo reemplaza mientras los demás siguen atendiendo.
+- Los pools de conexiones de cada worker se reducen para que la suma no supere
+  MYSQL_MAX_CONNECTIONS - DB_RESERVED_CONNECTIONS.
+- Usa uvloop y httptools si están instalados.
+
+La configuración se toma de core.config (HOST, PORT, WEB_CONCURRENCY, MAX_REQUESTS,
+FORWARDED_ALLOW_IPS, ...).
+Las métricas de /metrics son de cada worker.
+"""
+import logging
+import os
+import random
+import signal
+import socket
+import time
+
+from core.config import settings
+
+logger = logging.getLogger("avisena.serve")
+
+# Motores por worker que abren conexiones contra la primaria (síncrono y asíncrono)
+_MOTORES_POR_WORKER = 2
+
+
+def worker_count() -> int:
+    if settings.WEB_CONCURRENCY > 0:
+        return settings.WEB_CONCURRENCY
+    # bcrypt y la serialización usan CPU: más workers que CPUs solo compiten entre sí
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
+
+
+def budget_pools(workers: int) -> None:
+    """
+    Ajusta DB_POOL_SIZE y DB_MAX_OVERFLOW para que workers x motores x (pool + overflow)
+    quepa en MYSQL_MAX_CONNECTIONS - DB_RESERVED_CONNECTIONS. Solo reduce, nunca aumenta,
+    y mantiene la proporción configurada entre conexiones permanentes y adicionales.
+    Debe llamarse antes de importar core.database.
+    """
+    if settings.MYSQL_MAX_CONNECTIONS <= 0:
+        return
+
+    disponibles = settings.MYSQL_MAX_CONNECTIONS - settings.DB_RESERVED_CONNECTIONS
+    por_motor = disponibles // (workers * _MOTORES_POR_WORKER)
+    configuradas = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+    if por_motor >= configuradas:
+        return
+
+    if por_motor < 1:
+        logger.warning(
+            f"{workers} workers no caben en {disponibles} conexiones; cada motor usará 1 conexión "
+            f"y el total puede superar MYSQL_MAX_CONNECTIONS"
+        )
+        por_motor = 1
+
+    pool_size = max(1, por_motor * settings.DB_POOL_SIZE // configuradas)
+    settings.DB_POOL_SIZE = pool_size
+    settings.DB_MAX_OVERFLOW = por_motor - pool_size
+    logger.info(
+        f"Pools por motor reducidos a {settings.DB_POOL_SIZE} + {settings.DB_MAX_OVERFLOW} "
+        f"({workers} workers, {disponibles} conexiones disponibles)"
+    )
+
+
+def _installed(modulo: str) -> bool:
+    try:
+        __import__(modulo)
+        return True
+    except ImportError:
+        return False
+
+
+def _bind_socket() -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in settings.HOST else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((settings.HOST, settings.PORT))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock: socket.socket) -> None:
+    import uvicorn
+    from core.database import dispose_after_fork
+
+    # Las señales del padre no aplican al worker; uvicorn instala las suyas al arrancar
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    random.seed()
+    dispose_after_fork()
+
+    limite = None
+    if settings.MAX_REQUESTS > 0:
+        limite = settings.MAX_REQUESTS + random.randint(0, max(0, settings.MAX_REQUESTS_JITTER))
+
+    config = uvicorn.Config(
+        app,
+        loop="uvloop" if _installed("uvloop") else "asyncio",
+        http="httptools" if _installed("httptools") else "h11",
+        lifespan="on",
+        limit_max_requests=limite,
+        timeout_graceful_shutdown=settings.GRACEFUL_TIMEOUT,
+        # La IP del cliente (límites del login) sale de X-Forwarded-For solo si el proxy es de confianza
+        proxy_headers=settings.PROXY_HEADERS,
+        forwarded_allow_ips=settings.FORWARDED_ALLOW_IPS,
+        # RequestMetricsMiddleware ya registra una línea por petición
+        access_log=False,
+        log_config=None,
+    )
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def main() -> None:
+    logging.basicConfig(level=settings.LOG_LEVEL.upper(), format="%(asctime)s %(levelname)s %(name)s %(message)s")
+
+    workers = worker_count()
+    budget_pools(workers)
+
+    # Precarga: la aplicación y sus dependencias se importan antes del fork
+    from main import app
+
+    if not hasattr(os, "fork"):
+        import uvicorn
+        logger.warning("fork no disponible en esta plataforma; se inicia un solo proceso")
+        uvicorn.run(
+            app, host=settings.HOST, port=settings.PORT,
+            proxy_headers=settings.PROXY_HEADERS, forwarded_allow_ips=settings.FORWARDED_ALLOW_IPS
+        )
+        return
+
+    sock = _bind_socket()
+    hijos = {}
+    terminando = False
+
+    def spawn() -> None:
+        pid = os.fork()
+        if pid == 0:
+            codigo = 0
+            try:
+                _run_worker(app, sock)
+            except BaseException:
+                logger.exception("Error en el worker")
+                codigo = 1
+            finally:
+                os._exit(codigo)
+        hijos[pid] = time.monotonic()
+
+    def stop(signum, frame):
+        nonlocal terminando
+        terminando = True
+        for pid in list(hijos):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    logger.info(f"Escuchando en {settings.HOST}:{settings.PORT} con {workers} workers")
+    for _ in range(workers):
+        spawn()
+
+    limite_apagado = None
+    while hijos:
+        if terminando and limite_apagado is None:
+            limite_apagado = time.monotonic() + settings.GRACEFUL_TIMEOUT + 5
+        if limite_apagado is not None and time.monotonic() > limite_apagado:
+            for pid in list(hijos):
+                logger.warning(f"Worker {pid} no terminó a tiempo; se detiene con SIGKILL")
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+            limite_apagado = float("inf")
+
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            time.sleep(0.2)
+            continue
+
+        inicio = hijos.pop(pid, None)
+        if inicio is None or terminando:
+            continue
+        codigo = os.waitstatus_to_exitcode(status)
+        if codigo != 0:
+            logger.warning(f"Worker {pid} terminó con código {codigo}")
+        # Un worker que falla al arrancar no se relanza en un bucle sin pausa
+        if time.monotonic() - inicio < 1:
+            time.sleep(1)
+        spawn()
+
+    sock.close()
+    logger.info("Servidor detenido")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+-- Contadores de versión compartidos entre workers.
+-- Cada fila representa un conjunto de datos cacheado en memoria (por ejemplo, 'permisos').
+-- Incrementar `version` obliga a todos los procesos a recargar su caché en el siguiente refresco.
+-- Las filas iniciales usan INSERT IGNORE para que la migración pueda ejecutarse más de una vez.
+CREATE TABLE IF NOT EXISTS versiones_cache (
+    nombre  VARCHAR(64) NOT NULL PRIMARY KEY,
+    version BIGINT      NOT NULL DEFAULT 0
+);
+
+INSERT IGNORE INTO versiones_cache (nombre, version) VALUES ('permisos', 0);
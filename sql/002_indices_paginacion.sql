@@ -0,0 +1,3 @@
+-- Índice para la paginación por clave de salvamentos: ORDER BY fecha DESC, id_salvamento DESC
+-- y filtros por rango de fechas. Permite saltar directamente a la posición del cursor.
+CREATE INDEX idx_salvamento_fecha_id ON salvamento (fecha, id_salvamento);
@@ -0,0 +1,17 @@
+-- Acumulado diario de salvamentos por galpón y tipo de gallina.
+-- Se mantiene incrementalmente desde app/crud/rescue.py (crear, actualizar, eliminar e importación masiva)
+-- y se puede reconstruir con: python -m scripts.rebuild_rescue_rollup
+CREATE TABLE IF NOT EXISTS salvamento_diario (
+    fecha           DATE    NOT NULL,
+    id_galpon       INT     NOT NULL,
+    id_tipo_gallina INT     NOT NULL,
+    total_gallinas  BIGINT  NOT NULL DEFAULT 0,
+    registros       INT     NOT NULL DEFAULT 0,
+    PRIMARY KEY (fecha, id_galpon, id_tipo_gallina)
+);
+
+-- Carga inicial a partir de los salvamentos existentes
+INSERT INTO salvamento_diario (fecha, id_galpon, id_tipo_gallina, total_gallinas, registros)
+SELECT fecha, id_galpon, id_tipo_gallina, SUM(cantidad_gallinas), COUNT(*)
+FROM salvamento
+GROUP BY fecha, id_galpon, id_tipo_gallina;
@@ -0,0 +1,5 @@
+-- Versiones por tabla para los ETag de los listados (ver core/etag.py).
+-- Las funciones de escritura de app/crud incrementan la versión de la tabla que modifican.
+INSERT IGNORE INTO versiones_cache (nombre, version) VALUES ('galpones', 0);
+INSERT IGNORE INTO versiones_cache (nombre, version) VALUES ('tipo_gallinas', 0);
+INSERT IGNORE INTO versiones_cache (nombre, version) VALUES ('salvamento', 0);
@@ -0,0 +1,16 @@
+-- Ingresos de gallinas a los galpones (app/crud/income_hens.py).
+-- Cada ingreso suma cantidad_gallinas a galpones.cant_actual en la misma transacción.
+CREATE TABLE IF NOT EXISTS ingreso_gallinas (
+    id_ingreso        INT  AUTO_INCREMENT PRIMARY KEY,
+    id_galpon         INT  NOT NULL,
+    fecha             DATE NOT NULL,
+    id_tipo_gallina   INT  NOT NULL,
+    cantidad_gallinas INT  NOT NULL,
+    FOREIGN KEY (id_galpon) REFERENCES galpones (id_galpon),
+    FOREIGN KEY (id_tipo_gallina) REFERENCES tipo_gallinas (id_tipo_gallinas)
+);
+
+-- Paginación por clave (fecha, id_ingreso) y filtros por rango de fechas
+CREATE INDEX idx_ingreso_gallinas_fecha_id ON ingreso_gallinas (fecha, id_ingreso);
+
+INSERT IGNORE INTO versiones_cache (nombre, version) VALUES ('ingreso_gallinas', 0);
@@ -0,0 +1,17 @@
+-- Refresh tokens emitidos en el login (app/crud/refresh_tokens.py).
+-- El token es un JWT firmado; aquí solo se guarda su identificador (jti) para poder rotarlo
+-- y revocarlo. Todos los tokens obtenidos a partir de un mismo login comparten `familia`.
+CREATE TABLE IF NOT EXISTS refresh_tokens (
+    jti             CHAR(32) PRIMARY KEY,
+    id_usuario      INT      NOT NULL,
+    familia         CHAR(32) NOT NULL,
+    expira_en       DATETIME NOT NULL,
+    revocado        BOOLEAN  NOT NULL DEFAULT 0,
+    reemplazado_por CHAR(32) NULL,
+    FOREIGN KEY (id_usuario) REFERENCES usuarios (id_usuario)
+);
+
+-- Revocación de todas las sesiones de un usuario y limpieza de sus tokens vencidos
+CREATE INDEX idx_refresh_tokens_usuario ON refresh_tokens (id_usuario, expira_en);
+-- Revocación de una familia completa (logout o reutilización detectada)
+CREATE INDEX idx_refresh_tokens_familia ON refresh_tokens (familia);
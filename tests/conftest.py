@@ -0,0 +1,46 @@
+import os
+import sqlite3
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# La configuración se lee al importar core.config: las variables deben existir antes de importar
+# cualquier módulo de la aplicación. Primaria y réplica son dos archivos SQLite locales.
+_tmp = tempfile.mkdtemp(prefix="avisena-tests-")
+PRIMARY_PATH = os.path.join(_tmp, "primaria.db")
+REPLICA_PATH = os.path.join(_tmp, "replica.db")
+
+os.environ["DATABASE_URL"] = f"sqlite:///{PRIMARY_PATH}"
+os.environ["ASYNC_DATABASE_URL"] = ""
+os.environ["DATABASE_REPLICA_URLS"] = f"sqlite:///{REPLICA_PATH}"
+os.environ.setdefault("JWT_SECRET", "secreto-de-pruebas")
+
+ROOT = Path(__file__).resolve().parent.parent
+PASSWORD = "pruebas123"
+
+
+@pytest.fixture(scope="session")
+def esquema():
+    # Mismo esquema que el benchmark (scripts/bench_schema.sql + sql/*.sql) sobre el archivo primario
+    from passlib.context import CryptContext
+    from scripts.bench_http import apply_migrations
+
+    conn = sqlite3.connect(PRIMARY_PATH)
+    conn.executescript((ROOT / "scripts" / "bench_schema.sql").read_text())
+    conn.executemany("INSERT INTO roles VALUES (?, ?)", [(1, "superadmin"), (3, "operario")])
+    conn.executemany("INSERT INTO permisos VALUES (1, ?, 1, 1, 1, 1)", [(modulo,) for modulo in range(1, 10)])
+    conn.execute(
+        "INSERT INTO usuarios (nombre, id_rol, email, telefono, documento, pass_hash, estado) "
+        "VALUES ('Administrador', 1, 'admin@avisena.com', '3000000000', '100000000', ?, 1)",
+        (CryptContext(schemes=["bcrypt"]).hash(PASSWORD),)
+    )
+    conn.execute("INSERT INTO fincas (nombre, longitud, latitud, estado) VALUES ('Finca 1', -74, 4, 1)")
+    conn.execute(
+        "INSERT INTO galpones (id_finca, nombre, capacidad, cant_actual, estado) VALUES (1, 'Galpon 1', 1000, 500, 1)"
+    )
+    conn.execute("INSERT INTO tipo_gallinas (raza, descripcion) VALUES ('Lohmann Brown', 'Ponedora')")
+    apply_migrations(conn)
+    conn.commit()
+    conn.close()
+    yield
@@ -0,0 +1,121 @@
+import asyncio
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+import fastapi.dependencies.utils
+import fastapi.routing
+from app.crud import rescue_async, sheds_async
+from app.schemas.rescue import RescueCreate, RescueUpdate
+from app.schemas.sheds import ShedUpdate
+from core import database
+from core.database import async_engine, get_async_db
+from tests.conftest import PASSWORD
+
+pytestmark = pytest.mark.usefixtures("esquema")
+
+
+def _run(funcion):
+    """Ejecuta `funcion(db)` con la sesión de get_async_db, como lo haría FastAPI."""
+    async def principal():
+        dependencia = get_async_db()
+        db = await anext(dependencia)
+        try:
+            return await funcion(db)
+        finally:
+            await dependencia.aclose()
+            await async_engine.dispose()
+    return asyncio.run(principal())
+
+
+def test_motor_async_usa_aiosqlite():
+    assert async_engine.dialect.driver == "aiosqlite"
+
+
+def test_crud_async_de_salvamentos():
+    async def escenario(db):
+        inicial = (await sheds_async.get_shed_by_id(db, 1))["cant_actual"]
+        await rescue_async.create_rescue(
+            db, RescueCreate(id_galpon=1, fecha=date(2024, 5, 1), id_tipo_gallina=1, cantidad_gallinas=3)
+        )
+        id_salvamento = (await db.execute(text("SELECT MAX(id_salvamento) FROM salvamento"))).scalar()
+        creado = await rescue_async.get_rescue_by_id(db, id_salvamento)
+
+        await rescue_async.update_rescue_by_id(db, id_salvamento, RescueUpdate(cantidad_gallinas=5))
+        actualizado = await rescue_async.get_rescue_by_id(db, id_salvamento)
+        ocupacion = (await sheds_async.get_shed_by_id(db, 1))["cant_actual"]
+
+        await rescue_async.delete_rescue_by_id(db, id_salvamento)
+        borrado = await rescue_async.get_rescue_by_id(db, id_salvamento)
+        ocupacion_final = (await sheds_async.get_shed_by_id(db, 1))["cant_actual"]
+        return inicial, creado, actualizado, ocupacion, borrado, ocupacion_final
+
+    inicial, creado, actualizado, ocupacion, borrado, ocupacion_final = _run(escenario)
+    assert creado["cantidad_gallinas"] == 3
+    assert actualizado["cantidad_gallinas"] == 5
+    assert ocupacion == inicial - 5
+    assert borrado is None
+    assert ocupacion_final == inicial
+
+
+def test_crud_async_de_galpones():
+    async def escenario(db):
+        await sheds_async.update_shed_by_id(db, 1, ShedUpdate(nombre="Galpon A"))
+        return await sheds_async.get_all_sheds(db)
+
+    galpones = _run(escenario)
+    assert [(g["id_galpon"], g["nombre"]) for g in galpones] == [(1, "Galpon A")]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    from main import app
+
+    # Las lecturas de estos endpoints van a la primaria: la réplica de pruebas no tiene el esquema
+    monkeypatch.setattr(database, "replicas", [])
+    return TestClient(app)
+
+
+@pytest.fixture
+def hilos(monkeypatch):
+    """Cuenta lo que FastAPI envía al threadpool (dependencias y endpoints síncronos)."""
+    llamadas = []
+
+    def contar(original):
+        def envoltura(func, *args, **kwargs):
+            llamadas.append(getattr(func, "__name__", repr(func)))
+            return original(func, *args, **kwargs)
+        return envoltura
+
+    for modulo, nombre in (
+        (fastapi.dependencies.utils, "run_in_threadpool"),
+        (fastapi.dependencies.utils, "contextmanager_in_threadpool"),
+        (fastapi.routing, "run_in_threadpool"),
+    ):
+        monkeypatch.setattr(modulo, nombre, contar(getattr(modulo, nombre)))
+    return llamadas
+
+
+def test_endpoints_async_no_usan_el_threadpool(client, hilos):
+    respuesta = client.post("/access/token", data={"username": "admin@avisena.com", "password": PASSWORD})
+    assert respuesta.status_code == 200, respuesta.text
+    encabezados = {"Authorization": f"Bearer {respuesta.json()['access_token']}"}
+    hilos.clear()
+
+    assert client.get("/sheds/by-id/1", headers=encabezados).status_code == 200
+    assert client.get("/sheds/all", headers=encabezados).status_code == 200
+    assert client.get("/rescue/all-cursor", headers=encabezados).status_code == 200
+    assert hilos == []
+
+
+def test_login_y_refresh_con_sesion_async(client):
+    respuesta = client.post("/access/token", data={"username": "admin@avisena.com", "password": PASSWORD})
+    assert respuesta.status_code == 200, respuesta.text
+
+    renovado = client.post("/access/refresh", json={"refresh_token": respuesta.json()["refresh_token"]})
+    assert renovado.status_code == 200, renovado.text
+    # El refresh token rotado ya no sirve
+    repetido = client.post("/access/refresh", json={"refresh_token": respuesta.json()["refresh_token"]})
+    assert repetido.status_code == 401
@@ -0,0 +1,71 @@
+import sqlite3
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.crud import cache_versions
+from app.crud.cache_versions import bump_version, bump_versions_after_commit, get_tables_etag, get_version
+from core.database import SessionLocal
+from tests.conftest import ROOT
+
+pytestmark = pytest.mark.usefixtures("esquema")
+
+
+@pytest.fixture
+def db():
+    sesion = SessionLocal()
+    yield sesion
+    sesion.close()
+    cache_versions._bumps_pendientes.clear()
+
+
+def _falla_veces(monkeypatch, veces: int):
+    original = cache_versions.bump_version
+    restantes = [veces]
+
+    def bump_version(db, nombre):
+        if restantes[0] > 0:
+            restantes[0] -= 1
+            raise OperationalError("UPDATE versiones_cache", {}, Exception("bloqueo"))
+        original(db, nombre)
+
+    monkeypatch.setattr(cache_versions, "bump_version", bump_version)
+
+
+def test_un_fallo_se_reintenta(db, monkeypatch):
+    antes = get_version(db, "salvamento")
+    _falla_veces(monkeypatch, 1)
+    bump_versions_after_commit(db, "salvamento")
+    assert get_version(db, "salvamento") == antes + 1
+    assert get_tables_etag(db, ["salvamento"]) is not None
+
+
+def test_sin_incremento_no_hay_etag_hasta_el_siguiente(db, monkeypatch):
+    etag = get_tables_etag(db, ["salvamento", "galpones"])
+    _falla_veces(monkeypatch, 2)
+    bump_versions_after_commit(db, "salvamento")
+
+    # El ETag viejo ya no describe los datos: no se emite ninguno para listados con esa tabla
+    assert get_tables_etag(db, ["salvamento", "galpones"]) is None
+    assert get_tables_etag(db, ["galpones"]) is not None
+
+    bump_versions_after_commit(db, "salvamento")
+    nuevo = get_tables_etag(db, ["salvamento", "galpones"])
+    assert nuevo is not None and nuevo != etag
+
+
+def test_semillas_de_versiones_se_pueden_reaplicar():
+    conn = sqlite3.connect(":memory:")
+    for _ in range(2):
+        for archivo in ("001_versiones_cache.sql", "004_versiones_tablas.sql"):
+            script = (ROOT / "sql" / archivo).read_text()
+            conn.executescript(script.replace("INSERT IGNORE INTO", "INSERT OR IGNORE INTO"))
+    assert conn.execute("SELECT COUNT(*) FROM versiones_cache").fetchone()[0] == 4
+
+
+def test_bump_version_crea_la_fila_que_falta(db):
+    assert get_version(db, "sin_semilla") == 0
+    bump_version(db, "sin_semilla")
+    bump_version(db, "sin_semilla")
+    db.commit()
+    assert get_version(db, "sin_semilla") == 2
@@ -0,0 +1,133 @@
+import sqlite3
+import time
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
+
+from core import database
+from core.database import (
+    ESCRITURA_COOKIE, ESCRITURA_HEADER, ReadYourWritesMiddleware,
+    get_async_db, get_async_read_db, get_db, get_read_db,
+)
+from tests.conftest import PRIMARY_PATH, REPLICA_PATH
+
+
+def _crear_tabla(path: str, valor: str) -> None:
+    conexion = sqlite3.connect(path)
+    conexion.executescript(f"""
+        DROP TABLE IF EXISTS origen;
+        CREATE TABLE origen (id INTEGER PRIMARY KEY, valor TEXT NOT NULL);
+        INSERT INTO origen (id, valor) VALUES (1, '{valor}');
+    """)
+    conexion.commit()
+    conexion.close()
+
+
+app = FastAPI()
+app.add_middleware(ReadYourWritesMiddleware)
+
+
+@app.get("/origen")
+def leer(db: Session = Depends(get_read_db)):
+    return {"valor": db.execute(text("SELECT valor FROM origen WHERE id = 1")).scalar()}
+
+
+@app.get("/origen-async")
+async def leer_async(db: AsyncSession = Depends(get_async_read_db)):
+    return {"valor": (await db.execute(text("SELECT valor FROM origen WHERE id = 1"))).scalar()}
+
+
+@app.post("/origen")
+def escribir(db: Session = Depends(get_db)):
+    db.execute(text("UPDATE origen SET valor = 'primaria' WHERE id = 1"))
+    db.commit()
+    return {"ok": True}
+
+
+@app.post("/origen-async")
+async def escribir_async(db: AsyncSession = Depends(get_async_db)):
+    await db.execute(text("UPDATE origen SET valor = 'primaria' WHERE id = 1"))
+    await db.commit()
+    return {"ok": True}
+
+
+@app.get("/sin-escritura")
+def sin_escritura(db: Session = Depends(get_db)):
+    return {"valor": db.execute(text("SELECT valor FROM origen WHERE id = 1")).scalar()}
+
+
+@pytest.fixture(autouse=True)
+def bases():
+    # La réplica "atrasada" conserva un valor distinto al de la primaria
+    _crear_tabla(PRIMARY_PATH, "primaria")
+    _crear_tabla(REPLICA_PATH, "replica")
+    for replica in database.replicas:
+        replica.caida_hasta = 0.0
+    yield
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def test_hay_una_replica_configurada():
+    assert len(database.replicas) == 1
+
+
+@pytest.mark.parametrize("ruta", ["/origen", "/origen-async"])
+def test_lectura_sin_escrituras_va_a_la_replica(client, ruta):
+    assert client.get(ruta).json() == {"valor": "replica"}
+
+
+def test_respuesta_sin_commit_no_lleva_marca(client):
+    respuesta = client.get("/sin-escritura")
+    assert ESCRITURA_HEADER not in respuesta.headers
+    assert ESCRITURA_COOKIE not in respuesta.cookies
+
+
+@pytest.mark.parametrize("escritura", ["/origen", "/origen-async"])
+@pytest.mark.parametrize("ruta", ["/origen", "/origen-async"])
+def test_lectura_tras_escritura_va_a_la_primaria(client, escritura, ruta):
+    respuesta = client.post(escritura)
+    assert respuesta.status_code == 200
+    assert ESCRITURA_HEADER in respuesta.headers
+    assert ESCRITURA_COOKIE in respuesta.cookies
+
+    # La cookie vuelve sola con el mismo cliente
+    assert client.get(ruta).json() == {"valor": "primaria"}
+
+
+def test_marca_en_encabezado_sirve_en_otro_worker(client):
+    marca = client.post("/origen").headers[ESCRITURA_HEADER]
+
+    # Un cliente sin la cookie que reenvía el encabezado: ningún estado del proceso interviene
+    otro = TestClient(app)
+    assert otro.get("/origen", headers={ESCRITURA_HEADER: marca}).json() == {"valor": "primaria"}
+    assert otro.get("/origen").json() == {"valor": "replica"}
+
+
+@pytest.mark.parametrize("marca", [str(time.time() - 3600), "no-es-un-numero"])
+def test_marca_vencida_o_invalida_se_ignora(client, marca):
+    assert client.get("/origen", headers={ESCRITURA_HEADER: marca}).json() == {"valor": "replica"}
+
+
+def test_replica_caida_cae_a_la_primaria(client, monkeypatch):
+    replica = database.replicas[0]
+    # Motor que no puede abrir su archivo, como una réplica que no responde
+    caida = create_engine("sqlite:////directorio-inexistente/replica.db")
+    monkeypatch.setattr(replica, "session_factory", sessionmaker(bind=caida))
+
+    assert client.get("/origen").json() == {"valor": "primaria"}
+    assert not replica.disponible()
+
+    # Mientras está marcada como caída ni siquiera se intenta
+    monkeypatch.undo()
+    assert client.get("/origen").json() == {"valor": "primaria"}
+
+    replica.caida_hasta = 0.0
+    assert client.get("/origen").json() == {"valor": "replica"}
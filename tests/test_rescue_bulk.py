@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.router.rescue import _iter_lines
+from core import database
+from core.config import settings
+from tests.conftest import PASSWORD
+
+pytestmark = pytest.mark.usefixtures("esquema")
+
+
+class _Cuerpo:
+    def __init__(self, *chunks: bytes):
+        self.chunks = chunks
+
+    async def stream(self):
+        for chunk in self.chunks:
+            yield chunk
+
+
+def _lineas(*chunks: bytes, max_bytes: int = 10):
+    async def leer():
+        return [linea async for linea in _iter_lines(_Cuerpo(*chunks), max_bytes)]
+    return asyncio.run(leer())
+
+
+def test_lineas_repartidas_entre_bloques():
+    assert _lineas(b"ab", b"c\nde", b"\n\nf") == [b"abc", b"de", b"", b"f"]
+
+
+def test_linea_larga_se_descarta_sin_acumularla():
+    assert _lineas(b"ok\n" + b"x" * 25 + b"\nfin") == [b"ok", None, b"fin"]
+    # La línea larga llega en varios bloques: se entrega un solo None
+    assert _lineas(b"ok\nxxxxxx", b"xxxxxxxx", b"xxxx\nfin\n") == [b"ok", None, b"fin"]
+    assert _lineas(b"x" * 11) == [None]
+    assert _lineas(b"x" * 10) == [b"x" * 10]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    from main import app
+
+    monkeypatch.setattr(database, "replicas", [])
+    client = TestClient(app)
+    token = client.post("/access/token", data={"username": "admin@avisena.com", "password": PASSWORD})
+    client.headers["Authorization"] = f"Bearer {token.json()['access_token']}"
+    return client
+
+
+def test_importacion_informa_la_linea_larga(client, monkeypatch):
+    monkeypatch.setattr(settings, "BULK_MAX_LINE_BYTES", 100)
+    cuerpo = (
+        "id_galpon,fecha,id_tipo_gallina,cantidad_gallinas\n"
+        "1,2024-05-01,1,2\n"
+        f"1,2024-05-02,1,{'9' * 200}\n"
+        "1,2024-05-03,1,1\n"
+    )
+    respuesta = client.post("/rescue/bulk?formato=csv", content=cuerpo.encode())
+    assert respuesta.status_code == 200, respuesta.text
+    resultado = respuesta.json()
+    assert (resultado["received"], resultado["inserted"], resultado["failed"]) == (3, 2, 1)
+    assert resultado["errors"] == [{"line": 3, "error": "La línea supera 100 bytes"}]
+
+
+def test_encabezado_largo_responde_413(client, monkeypatch):
+    monkeypatch.setattr(settings, "BULK_MAX_LINE_BYTES", 10)
+    respuesta = client.post("/rescue/bulk?formato=csv", content=b"id_galpon,fecha,id_tipo_gallina\n1,2,3\n")
+    assert respuesta.status_code == 413
@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import text
+
+from app.crud import users
+from app.crud.cache_versions import VersionedCache
+from core.cache import TTLCache
+from core.database import SessionLocal
+
+pytestmark = pytest.mark.usefixtures("esquema")
+
+
+@pytest.fixture
+def db():
+    sesion = SessionLocal()
+    yield sesion
+    sesion.execute(text("UPDATE usuarios SET estado = 1"))
+    sesion.commit()
+    sesion.close()
+
+
+def _worker():
+    """Cachés de estado de un worker nuevo, revisando la versión compartida en cada consulta."""
+    return {
+        "_usuarios_inactivos": TTLCache(ttl=1800, max_size=100),
+        "_inactivos_compartidos": VersionedCache(users._ESTADO_VERSION, users._load_inactive_ids, 0),
+    }
+
+
+def _usar(monkeypatch, worker):
+    for nombre, valor in worker.items():
+        monkeypatch.setattr(users, nombre, valor)
+
+
+def test_desactivar_y_reactivar_entre_workers(db, monkeypatch):
+    worker_a, worker_b = _worker(), _worker()
+
+    _usar(monkeypatch, worker_a)
+    users.change_user_status(db, 1, False)
+    assert users.is_user_deactivated(db, 1)
+
+    _usar(monkeypatch, worker_b)
+    assert users.is_user_deactivated(db, 1)
+    users.change_user_status(db, 1, True)
+    assert not users.is_user_deactivated(db, 1)
+
+    # A recuerda la desactivación que hizo, pero la lista compartida ya tiene la reactivación
+    _usar(monkeypatch, worker_a)
+    assert 1 in worker_a["_usuarios_inactivos"]
+    assert not users.is_user_deactivated(db, 1)
+    assert 1 not in worker_a["_usuarios_inactivos"]
+
+
+def test_sin_bd_se_usa_la_revocacion_local(db, monkeypatch):
+    worker = _worker()
+    _usar(monkeypatch, worker)
+    users.change_user_status(db, 1, False)
+
+    def sin_bd(_db):
+        raise users.SQLAlchemyError("sin conexión")
+
+    monkeypatch.setattr(worker["_inactivos_compartidos"], "get", sin_bd)
+    assert users.is_user_deactivated(db, 1)
+    assert not users.is_user_deactivated(db, 2)